@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from .models import OutgoingEmail, Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'queue', 'status', 'attempts', 'run_at',
+                    'finished')
+    list_filter = ('status', 'queue', 'name')
+    search_fields = ('name', 'idempotency_key')
+    readonly_fields = ('created', 'finished', 'locked_until', 'last_error')
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'subject', 'status', 'attempts', 'created', 'sent')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    readonly_fields = ('created', 'sent', 'locked_until', 'last_error')
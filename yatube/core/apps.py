@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import db  # noqa: F401
+        from .sampling_profiler import install_signal_handler
+        install_signal_handler()
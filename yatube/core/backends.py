@@ -0,0 +1,59 @@
+from django.core.cache.backends import locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from .metrics import count_cache_read, template_timer
+from .tracing import span
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """
+    Считает попадания и промахи чтения из кэша для метрик запроса
+    и пишет спаны трассировки (core.tracing) на чтение и запись.
+    get_many базового класса читает через get, поэтому учитывается тоже.
+    """
+    def get(self, key, default=None, version=None):
+        with span('cache.get', 'cache', key=key) as current:
+            value = super().get(key, _missing, version=version)
+            if current is not None:
+                current.attributes['hit'] = value is not _missing
+        count_cache_read(value is not _missing)
+
+        return default if value is _missing else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with span('cache.set', 'cache', key=key):
+            return super().set(key, value, timeout, version)
+
+    def delete(self, key, version=None):
+        with span('cache.delete', 'cache', key=key):
+            return super().delete(key, version)
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with template_timer(), span('template', 'template',
+                                    template=self.template.name):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    Шаблоны Django с замером времени рендеринга (core.metrics)
+    и спанами трассировки (core.tracing).
+    """
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
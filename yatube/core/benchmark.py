@@ -0,0 +1,293 @@
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+import requests
+from django.conf import settings
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+
+from .slow_queries import percentile
+
+QUERIES_HEADER = 'X-Benchmark-Queries'
+# Сколько ждать, пока uvicorn начнёт принимать соединения.
+ASGI_START_SECONDS = 30
+
+
+class Scenario:
+    """
+    Сценарий нагрузки на одну view. make_request(rng) возвращает
+    (path, data): data - тело POST или None для GET.
+    """
+    def __init__(self, name, make_request, user=None):
+        self.name = name
+        self.make_request = make_request
+        self.user = user
+
+
+class QueryCounter:
+    """execute_wrapper: считает запросы к БД в текущем потоке."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+
+        return execute(sql, params, many, context)
+
+
+def count_queries(func):
+    """Вызывает func() и возвращает (результат, число запросов к БД)."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        result = func()
+
+    return result, counter.count
+
+
+class InProcessRunner:
+    """Гоняет view через django.test.Client, без сети и сервера."""
+    name = 'inprocess'
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+    def client(self, user):
+        clients = getattr(self.local, 'clients', None)
+        if clients is None:
+            clients = self.local.clients = {}
+        if user not in clients:
+            client = Client(HTTP_HOST='localhost')
+            if user is not None:
+                client.force_login(user)
+            clients[user] = client
+
+        return clients[user]
+
+    def send(self, scenario, path, data):
+        client = self.client(scenario.user)
+        if data is None:
+            response, queries = count_queries(lambda: client.get(path))
+        else:
+            response, queries = count_queries(
+                lambda: client.post(path, data))
+
+        return response.status_code, queries
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def counting_application(application):
+    """WSGI-обёртка: число запросов к БД уходит в заголовок ответа."""
+    def wrapper(environ, start_response):
+        def start(status, headers, exc_info=None):
+            headers.append((QUERIES_HEADER, str(counter.count)))
+            return start_response(status, headers, exc_info)
+
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            return list(application(environ, start))
+
+    return wrapper
+
+
+class HttpRunner:
+    """
+    Гоняет view по HTTP через локальный сервер: wsgi - многопоточный
+    сервер Django в этом процессе, asgi - uvicorn (если установлен)
+    в отдельном процессе. Настройки этого процесса уже загружены
+    без ASGI и ASYNC_VIEWS, поэтому асинхронные views и SSE доступны
+    только в процессе, запущенном через yatube/asgi.py. Переменные env
+    добавляются к окружению этого процесса; запросы к БД под asgi
+    не считаются.
+    """
+    def __init__(self, server='wsgi', env=None):
+        self.name = server
+        self.env = env or {}
+        self.local = threading.local()
+        self.sessions = {}
+
+    def __enter__(self):
+        if self.name == 'asgi':
+            self.start_asgi()
+        else:
+            self.start_wsgi()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start_wsgi(self):
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0),
+                                         QuietRequestHandler)
+        self.server.set_app(counting_application(get_wsgi_application()))
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.stop = self.server.shutdown
+
+    def start_asgi(self):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise RuntimeError('Для --server asgi нужен uvicorn.')
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'yatube.asgi:application',
+             '--host', '127.0.0.1', '--port', str(port),
+             '--log-level', 'warning', '--lifespan', 'off'],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, **self.env,
+                 'ASGI': 'True', 'ASYNC_VIEWS': 'True'},
+        )
+
+        def stop():
+            process.terminate()
+            process.wait()
+
+        self.stop = stop
+        deadline = time.monotonic() + ASGI_START_SECONDS
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError('uvicorn завершился при запуске.')
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    stop()
+                    raise RuntimeError('uvicorn не запустился за '
+                                       f'{ASGI_START_SECONDS} с.')
+                time.sleep(0.05)
+        self.url = f'http://127.0.0.1:{port}'
+
+    def session_cookies(self, user):
+        """Куки сессии и CSRF пользователя, общие для всех потоков."""
+        if user not in self.sessions:
+            client = Client()
+            cookies = {}
+            if user is not None:
+                client.force_login(user)
+                cookies[settings.SESSION_COOKIE_NAME] = client.cookies[
+                    settings.SESSION_COOKIE_NAME].value
+            self.sessions[user] = cookies
+
+        return self.sessions[user]
+
+    def session(self, user):
+        sessions = getattr(self.local, 'sessions', None)
+        if sessions is None:
+            sessions = self.local.sessions = {}
+        if user not in sessions:
+            session = requests.Session()
+            session.cookies.update(self.session_cookies(user))
+            token = 'benchmarkcsrftoken'.ljust(32, '0')
+            session.cookies.set(settings.CSRF_COOKIE_NAME, token)
+            session.headers['X-CSRFToken'] = token
+            sessions[user] = session
+
+        return sessions[user]
+
+    def send(self, scenario, path, data):
+        session = self.session(scenario.user)
+        if data is None:
+            response = session.get(self.url + path, allow_redirects=False)
+        else:
+            response = session.post(self.url + path, data=data,
+                                    allow_redirects=False)
+        response.content
+        queries = response.headers.get(QUERIES_HEADER)
+
+        return (response.status_code,
+                int(queries) if queries is not None else None)
+
+
+def run_scenario(runner, scenario, number, concurrency, warmup=0,
+                 seed=0):
+    """
+    Прогоняет сценарий: warmup запросов без замеров, затем number
+    запросов в concurrency потоков. Возвращает перцентили времени
+    ответа в мс, пропускную способность, среднее число запросов к БД
+    и число ошибок (ответы 4xx/5xx).
+    """
+    rng = random.Random(seed)
+    plan = [scenario.make_request(rng) for _ in range(warmup + number)]
+    for path, data in plan[:warmup]:
+        runner.send(scenario, path, data)
+
+    def timed(request):
+        started = time.perf_counter()
+        status, queries = runner.send(scenario, *request)
+
+        return time.perf_counter() - started, status, queries
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        results = [timed(request) for request in plan[warmup:]]
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(timed, plan[warmup:]))
+    elapsed = time.perf_counter() - started
+    latencies = [duration * 1000 for duration, _, _ in results]
+    queries = [count for _, _, count in results if count is not None]
+
+    return {
+        'requests': number,
+        'concurrency': concurrency,
+        'p50_ms': round(percentile(latencies, 0.5), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'rps': round(number / elapsed, 1),
+        'queries': (round(sum(queries) / len(queries), 2)
+                    if queries else None),
+        'errors': sum(status >= 400 for _, status, _ in results),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Сравнивает результаты с базовыми: регрессия - p95 или среднее число
+    запросов к БД больше базового на долю threshold.
+    Возвращает список описаний регрессий.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            regressions.append(
+                f'{name}: p95 {result["p95_ms"]:.1f} мс против '
+                f'{base["p95_ms"]:.1f} мс')
+        if (result['queries'] is not None and base['queries'] is not None
+                and result['queries'] > base['queries'] * (1 + threshold)):
+            regressions.append(
+                f'{name}: {result["queries"]} запросов к БД против '
+                f'{base["queries"]}')
+
+    return regressions
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Настраивает новое подключение к SQLite прагмами из SQLITE_PRAGMAS:
+    WAL-журнал, режим synchronous, mmap, busy_timeout и размер кэша.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    cursor = connection.connection.cursor()
+    try:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+    finally:
+        cursor.close()
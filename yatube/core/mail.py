@@ -0,0 +1,172 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+from .tasks import backoff, task
+
+
+def get_delivery_connection(**kwargs):
+    """Подключение к бэкенду, который действительно отправляет письма."""
+    return get_connection(settings.EMAIL_DELIVERY_BACKEND, **kwargs)
+
+
+def from_message(message):
+    return OutgoingEmail(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email,
+        to=message.to,
+        cc=message.cc,
+        bcc=message.bcc,
+        reply_to=message.reply_to,
+        headers=message.extra_headers,
+        alternatives=[list(alternative) for alternative in
+                      getattr(message, 'alternatives', [])],
+    )
+
+
+def to_message(email):
+    return EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        cc=email.cc,
+        bcc=email.bcc,
+        reply_to=email.reply_to,
+        headers=email.headers,
+        alternatives=[tuple(alternative) for alternative in
+                      email.alternatives],
+    )
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Почтовый бэкенд, который не ждёт SMTP в запросе.
+    Письма сохраняются в OutgoingEmail в текущей транзакции,
+    доставку выполняет фоновая задача deliver_emails через
+    EMAIL_DELIVERY_BACKEND. Задача всегда ставится в очередь,
+    даже при TASKS_ALWAYS_EAGER. Письма с вложениями в БД
+    не сохраняются и отправляются сразу.
+    """
+    def send_messages(self, email_messages):
+        queued = [from_message(message) for message in email_messages
+                  if not message.attachments]
+        direct = [message for message in email_messages
+                  if message.attachments]
+        if queued:
+            with transaction.atomic():
+                OutgoingEmail.objects.bulk_create(queued)
+                deliver_emails.enqueue(eager=False)
+        sent = len(queued)
+        if direct:
+            connection = get_delivery_connection(
+                fail_silently=self.fail_silently)
+            sent += connection.send_messages(direct) or 0
+
+        return sent
+
+
+def claim_emails(limit):
+    """
+    Забирает до limit писем, готовых к отправке.
+    Письмо достаётся тому воркеру, чей UPDATE изменил строку;
+    письма упавшего воркера забираются после истечения блокировки.
+    """
+    now = timezone.now()
+    ready = (Q(status=OutgoingEmail.QUEUED, run_at__lte=now)
+             | Q(status=OutgoingEmail.SENDING, locked_until__lt=now))
+    candidates = list(
+        OutgoingEmail.objects.filter(ready)
+        .order_by('run_at', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    claimed = [
+        email_id for email_id in candidates
+        if OutgoingEmail.objects.filter(ready, pk=email_id).update(
+            status=OutgoingEmail.SENDING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.TASK_LOCK_SECONDS),
+        )
+    ]
+
+    return list(OutgoingEmail.objects.filter(pk__in=claimed)
+                .order_by('run_at', 'id'))
+
+
+def release(email, error):
+    """Откладывает письмо до следующей попытки или помечает failed."""
+    updates = {'last_error': error, 'locked_until': None}
+    if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        updates['status'] = OutgoingEmail.FAILED
+    else:
+        updates.update(status=OutgoingEmail.QUEUED,
+                       run_at=timezone.now() + backoff(email.attempts))
+    OutgoingEmail.objects.filter(pk=email.pk).update(**updates)
+
+    return updates['status']
+
+
+def deliver_batch(limit):
+    """
+    Отправляет до limit писем через одно подключение
+    к EMAIL_DELIVERY_BACKEND, не чаще EMAIL_RATE_LIMIT писем
+    в секунду. Возвращает счётчик статусов.
+    """
+    emails = claim_emails(limit)
+    stats = Counter()
+    if not emails:
+        return stats
+    connection = get_delivery_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            release(email, repr(error))
+        raise
+    rate = settings.EMAIL_RATE_LIMIT
+    interval = 1 / rate if rate else 0
+    next_send = time.monotonic()
+    sent = []
+    try:
+        for email in emails:
+            time.sleep(max(0, next_send - time.monotonic()))
+            next_send = time.monotonic() + interval
+            try:
+                connection.send_messages([to_message(email)])
+            except Exception as error:
+                stats[release(email, repr(error))] += 1
+            else:
+                sent.append(email.pk)
+    finally:
+        connection.close()
+        OutgoingEmail.objects.filter(pk__in=sent).update(
+            status=OutgoingEmail.SENT, sent=timezone.now(), locked_until=None)
+    stats[OutgoingEmail.SENT] += len(sent)
+
+    return stats
+
+
+@task(queue='email')
+def deliver_emails():
+    """
+    Доставляет очередь писем пачками по EMAIL_BATCH_SIZE.
+    Если письма остались, ставит себя в очередь снова:
+    сразу или к сроку ближайшей повторной попытки.
+    """
+    deliver_batch(settings.EMAIL_BATCH_SIZE)
+    next_run = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.QUEUED).aggregate(Min('run_at'))['run_at__min']
+    if next_run is None:
+        return
+    countdown = max(0, (next_run - timezone.now()).total_seconds())
+    deliver_emails.enqueue(countdown=countdown, eager=False,
+                           key=f'deliver_emails:{next_run.isoformat()}')
@@ -0,0 +1,87 @@
+import json
+import os
+import signal
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sampling_profiler import REQUEST_FILE, clamp_seconds
+
+# Запас времени воркерам на запись результата после профилирования.
+GRACE_SECONDS = 2
+
+
+class Command(BaseCommand):
+    help = (
+        'Профилирует работающие воркеры: шлёт им SIGUSR2, ждёт результат '
+        'в PROFILER_DIR и выводит общие свёрнутые стеки по view.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'pids', nargs='+', type=int,
+            help='PID процессов-воркеров (например, из pgrep).')
+        parser.add_argument(
+            '--seconds', type=float, default=10,
+            help='Сколько секунд профилировать.')
+        parser.add_argument(
+            '--interval-ms', type=float,
+            default=settings.PROFILER_INTERVAL_MS,
+            help='Шаг выборки, миллисекунд.')
+        parser.add_argument(
+            '--mode', choices=['cpu', 'wall'], default='cpu',
+            help='cpu - по процессорному времени (SIGPROF), '
+                 'wall - по настенным часам.')
+        parser.add_argument(
+            '--output',
+            help='Файл для результата, по умолчанию stdout.')
+
+    def merge(self, results):
+        """Складывает свёрнутые стеки всех воркеров."""
+        stacks = Counter()
+        for pid, path in results.items():
+            if not path.exists():
+                self.stderr.write(f'Процесс {pid} не прислал профиль.')
+                continue
+            for line in path.read_text().splitlines():
+                stack, _, count = line.rpartition(' ')
+                stacks[stack] += int(count)
+
+        return stacks
+
+    def handle(self, *args, **options):
+        if not settings.PROFILER_DIR:
+            raise CommandError('Не задан PROFILER_DIR.')
+        directory = Path(settings.PROFILER_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        seconds = clamp_seconds(options['seconds'])
+        results = {pid: directory / f'{pid}.collapsed'
+                   for pid in options['pids']}
+        for path in results.values():
+            path.unlink(missing_ok=True)
+        (directory / REQUEST_FILE).write_text(json.dumps({
+            'seconds': seconds,
+            'interval_ms': options['interval_ms'],
+            'mode': options['mode'],
+        }))
+        for pid in options['pids']:
+            try:
+                os.kill(pid, signal.SIGUSR2)
+            except ProcessLookupError:
+                raise CommandError(f'Нет процесса {pid}.')
+        deadline = time.monotonic() + seconds + GRACE_SECONDS
+        while (time.monotonic() < deadline
+               and not all(path.exists() for path in results.values())):
+            time.sleep(0.1)
+        stacks = self.merge(results)
+        collapsed = ''.join(f'{stack} {count}\n'
+                            for stack, count in stacks.most_common())
+        if options['output']:
+            Path(options['output']).write_text(collapsed)
+            self.stdout.write(self.style.SUCCESS(
+                f'Записано стеков: {len(stacks)}'))
+        else:
+            self.stdout.write(collapsed, ending='')
@@ -0,0 +1,64 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import autodiscover_modules
+
+from core.tasks import Worker
+
+
+def parse_queue(value):
+    name, _, concurrency = value.partition(':')
+    if not concurrency:
+        return name, settings.TASK_QUEUES.get(name, 1)
+    try:
+        return name, int(concurrency)
+    except ValueError:
+        raise CommandError(f'Неверное число потоков: {value}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из БД. У каждой очереди свой пул '
+        'потоков; процессов run_workers можно запустить несколько.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='queues',
+            metavar='NAME[:THREADS]',
+            help='Очередь и число потоков, по умолчанию все из TASK_QUEUES.',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=settings.TASK_POLL_SECONDS,
+            help='Пауза между опросами пустой очереди, секунд.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['queues']:
+            queues = dict(map(parse_queue, options['queues']))
+        else:
+            queues = settings.TASK_QUEUES
+        autodiscover_modules('tasks')
+        worker = Worker(queues, options['poll'])
+        signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+        self.stdout.write('Очереди: ' + ', '.join(
+            f'{name} ({concurrency})' for name, concurrency in queues.items()))
+        try:
+            stats = worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            worker.stop()
+            stats = worker.stats
+        summary = ', '.join(
+            f'{status} {count}' for status, count in stats.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {summary or "задач не было"}.'))
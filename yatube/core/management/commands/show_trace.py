@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.tracing import read_trace, span_tree
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит трассу деревом спанов со временем каждого и сводку '
+        'по видам: БД, кэш, шаблоны, задачи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'trace_id',
+            help='Id трассы, например из заголовка X-Trace-Id.')
+        parser.add_argument(
+            '--file', action='append', dest='files',
+            help='Файл спанов, можно несколько раз (например, '
+                 'веб-процессов и воркеров). По умолчанию TRACE_FILE.')
+
+    def handle(self, *args, **options):
+        files = options['files'] or [settings.TRACE_FILE]
+        if not all(files):
+            raise CommandError('Файл не задан: TRACE_FILE или --file.')
+        spans = []
+        try:
+            for path in files:
+                spans.extend(read_trace(path, options['trace_id']))
+        except OSError as exc:
+            raise CommandError(f'Не удалось прочитать файл: {exc}')
+        if not spans:
+            raise CommandError(f'Трасса {options["trace_id"]} не найдена.')
+        started = min(span['start'] for span in spans)
+        totals = defaultdict(lambda: [0, 0.0])
+        kinds = []
+        for depth, span in span_tree(spans):
+            offset = (span['start'] - started) * 1000
+            self.stdout.write(
+                f'{offset:9.1f} мс {span["duration_ms"]:9.1f} мс  '
+                f'{"  " * depth}{self.describe(span)}')
+            kinds[depth:] = [span['kind']]
+            totals[span['kind']][0] += 1
+            # Время вложенных спанов того же вида уже входит во внешний.
+            if span['kind'] not in kinds[:depth]:
+                totals[span['kind']][1] += span['duration_ms']
+        self.stdout.write('')
+        for kind, (count, duration) in sorted(totals.items()):
+            self.stdout.write(f'{kind}: {count} спанов, {duration:.1f} мс')
+
+    def describe(self, span):
+        label = span['kind']
+        if span['name'] != span['kind']:
+            label += f': {span["name"]}'
+        attributes = span['attributes']
+        detail = (attributes.get('sql') or attributes.get('key')
+                  or attributes.get('template'))
+        if detail:
+            label += f'  {detail[:100]}'
+
+        return label
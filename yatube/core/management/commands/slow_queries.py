@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slow_queries import aggregate, read_log
+
+SORT_KEYS = {
+    'total': 'total_ms',
+    'count': 'count',
+    'p95': 'p95_ms',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит самые затратные медленные запросы из SLOW_QUERY_LOG, '
+        'сгруппированные по отпечатку SQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', default=settings.SLOW_QUERY_LOG,
+            help='Файл лога, по умолчанию SLOW_QUERY_LOG.')
+        parser.add_argument(
+            '--sort', choices=SORT_KEYS, default='total',
+            help='Порядок: суммарное время, число запросов или p95.')
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Сколько отпечатков вывести.')
+
+    def handle(self, *args, **options):
+        if not options['file']:
+            raise CommandError('Лог не задан: SLOW_QUERY_LOG или --file.')
+        try:
+            groups = aggregate(read_log(options['file']))
+        except OSError as exc:
+            raise CommandError(f'Не удалось прочитать лог: {exc}')
+        key = SORT_KEYS[options['sort']]
+        groups.sort(key=lambda group: group[key], reverse=True)
+        for group in groups[:options['limit']]:
+            self.stdout.write(self.style.WARNING(
+                f'{group["fingerprint"]}  {group["count"]} раз, '
+                f'всего {group["total_ms"]:.1f} мс, '
+                f'p95 {group["p95_ms"]:.1f} мс, '
+                f'макс. {group["max_ms"]:.1f} мс'))
+            self.stdout.write(f'  view: {group["view"]}')
+            self.stdout.write(f'  откуда: {group["origin"]}')
+            self.stdout.write(f'  {group["sql"]}')
+        if not groups:
+            self.stdout.write('Медленных запросов нет.')
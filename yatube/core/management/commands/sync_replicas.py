@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует primary-базу SQLite в файлы реплик из DB_REPLICAS. '
+        'Нужна для локальной проверки маршрутизации чтения на реплики.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Команда работает только с SQLite, '
+                'реплики PostgreSQL настраиваются средствами СУБД.')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не заданы (DB_REPLICAS).')
+        source = sqlite3.connect(primary.settings_dict['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                name = connections[alias].settings_dict['NAME']
+                target = sqlite3.connect(name)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(
+                    self.style.SUCCESS(f'{alias}: скопировано в {name}'))
+        finally:
+            source.close()
@@ -0,0 +1,273 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+# Границы корзин гистограмм: время ответа в секундах и число запросов к БД.
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+HELP = {
+    'yatube_requests_total': 'Обработанные запросы.',
+    'yatube_request_duration_seconds': 'Время ответа view.',
+    'yatube_request_db_queries': 'Число запросов к БД на один ответ.',
+    'yatube_db_query_seconds_total': 'Суммарное время запросов к БД.',
+    'yatube_template_render_seconds_total': 'Суммарное время рендеринга '
+                                            'шаблонов.',
+    'yatube_cache_requests_total': 'Чтения из кэша: result=hit|miss.',
+    'yatube_template_node_calls_total': 'Вызовы шаблонов, тегов и фильтров '
+                                        '(профилируемые запросы).',
+    'yatube_template_node_seconds_total': 'Время шаблонов, тегов и фильтров '
+                                          '(профилируемые запросы).',
+}
+
+
+class RequestStats:
+    """Счётчики одного запроса: БД, шаблоны и кэш."""
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+_stats = ContextVar('request_stats', default=None)
+
+
+def get_stats():
+    return _stats.get()
+
+
+def set_stats(stats):
+    return _stats.set(stats)
+
+
+def reset_stats(token):
+    _stats.reset(token)
+
+
+def count_query(execute, sql, params, many, context):
+    """execute_wrapper: считает запросы к БД и их время."""
+    stats = get_stats()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+@contextmanager
+def template_timer():
+    """
+    Меряет рендеринг шаблона. Вложенный рендеринг (render_to_string
+    внутри шаблона) уже входит во внешний и отдельно не считается.
+    """
+    stats = get_stats()
+    if stats is None:
+        yield
+        return
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_seconds += time.perf_counter() - started
+
+
+def count_cache_read(hit):
+    stats = get_stats()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+class Registry:
+    """
+    Метрики процесса: счётчики и гистограммы с метками.
+    Если задан METRICS_DIR, каждый процесс сбрасывает свои значения
+    в файл METRICS_DIR/<pid>.json, а /metrics складывает файлы всех
+    процессов, так что gunicorn с несколькими воркерами отдаёт общую
+    картину.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed = 0.0
+
+    def check_fork(self):
+        # После fork дочерний процесс начинает со своих, пустых метрик.
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.check_fork()
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=SECONDS_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.check_fork()
+            histogram = self.histograms.setdefault(key, {
+                'buckets': list(buckets),
+                'counts': [0] * (len(buckets) + 1),
+                'sum': 0,
+            })
+            histogram['counts'][bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+
+    def record_request(self, view, method, status, duration, stats):
+        labels = {'view': view}
+        self.inc('yatube_requests_total',
+                 {**labels, 'method': method, 'status': str(status)})
+        self.observe('yatube_request_duration_seconds', labels, duration)
+        self.observe('yatube_request_db_queries', labels, stats.queries,
+                     QUERIES_BUCKETS)
+        self.inc('yatube_db_query_seconds_total', labels,
+                 stats.query_seconds)
+        self.inc('yatube_template_render_seconds_total', labels,
+                 stats.template_seconds)
+        if stats.cache_hits:
+            self.inc('yatube_cache_requests_total',
+                     {**labels, 'result': 'hit'}, stats.cache_hits)
+        if stats.cache_misses:
+            self.inc('yatube_cache_requests_total',
+                     {**labels, 'result': 'miss'}, stats.cache_misses)
+
+    def snapshot(self):
+        with self.lock:
+            self.check_fork()
+            return {
+                'counters': [[name, labels, value] for (name, labels), value
+                             in self.counters.items()],
+                'histograms': [[name, labels,
+                                dict(histogram,
+                                     counts=list(histogram['counts']))]
+                               for (name, labels), histogram
+                               in self.histograms.items()],
+            }
+
+    def flush(self, force=False):
+        """
+        Пишет метрики процесса в его файл, не чаще раза
+        в METRICS_FLUSH_SECONDS. Запись атомарна: сборщик не увидит
+        наполовину записанный файл. Потоки процесса пишут по очереди;
+        пока один пишет, остальные без force сброс пропускают.
+        """
+        if not settings.METRICS_DIR:
+            return
+        if not self.flush_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if (not force
+                    and now - self.flushed < settings.METRICS_FLUSH_SECONDS):
+                return
+            self.flushed = now
+            directory = Path(settings.METRICS_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f'{os.getpid()}.json'
+            temporary = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            temporary.write_text(json.dumps(self.snapshot()))
+            os.replace(temporary, path)
+        finally:
+            self.flush_lock.release()
+
+
+registry = Registry()
+
+
+def snapshots():
+    if not settings.METRICS_DIR:
+        yield registry.snapshot()
+        return
+    for path in sorted(Path(settings.METRICS_DIR).glob('*.json')):
+        try:
+            yield json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+
+
+def collect():
+    """Складывает метрики всех процессов."""
+    counters = {}
+    histograms = {}
+    for data in snapshots():
+        for name, labels, value in data['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, histogram in data['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, {
+                'buckets': histogram['buckets'],
+                'counts': [0] * len(histogram['counts']),
+                'sum': 0,
+            })
+            total['counts'] = [a + b for a, b in
+                               zip(total['counts'], histogram['counts'])]
+            total['sum'] += histogram['sum']
+
+    return counters, histograms
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in labels
+    )
+
+    return '{' + ','.join(f'{name}="{value}"'
+                          for name, value in escaped) + '}'
+
+
+def render(counters, histograms):
+    """Формирует текстовый формат Prometheus (version 0.0.4)."""
+    lines = []
+    described = set()
+
+    def describe(name, kind):
+        if name not in described:
+            described.add(name)
+            lines.append(f'# HELP {name} {HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), value in sorted(counters.items()):
+        describe(name, 'counter')
+        lines.append(f'{name}{format_labels(labels)} {value}')
+    for (name, labels), histogram in sorted(histograms.items()):
+        describe(name, 'histogram')
+        cumulative = 0
+        bounds = [*histogram['buckets'], '+Inf']
+        for bound, count in zip(bounds, histogram['counts']):
+            cumulative += count
+            bucket_labels = format_labels((*labels, ('le', bound)))
+            lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(labels)} {histogram["sum"]}')
+        lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+
+    return '\n'.join(lines) + '\n'
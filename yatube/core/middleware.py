@@ -0,0 +1,265 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.db import connections
+
+from .metrics import (RequestStats, count_query, registry, reset_stats,
+                      set_stats)
+from .routers import RoutingState, reset_state, set_state
+from .sampling_profiler import register_request, unregister_request
+from .slow_queries import SlowQueryLogger
+from .template_profiler import report, start, stop
+from .tracing import trace, traced_queries
+
+
+@contextmanager
+def query_wrappers(make_wrapper):
+    """
+    Ставит execute_wrapper make_wrapper(connection) на все
+    подключения к БД текущего потока.
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(make_wrapper(connection)))
+        yield
+
+
+async def aenter(context_manager):
+    """
+    Входит в context_manager в потоке, где под ASGI идут запросы
+    к БД этого запроса: подключения и их execute_wrapper у каждого
+    потока свои. Возвращает корутину-функцию выхода.
+    """
+    stack = ExitStack()
+    await sync_to_async(stack.enter_context)(context_manager)
+
+    return sync_to_async(stack.close)
+
+
+class AsyncCapableMiddleware:
+    """
+    Основа middleware, которые работают и под WSGI, и под ASGI.
+    Под ASGI Django передаёт асинхронный get_response, и вызов идёт
+    в acall без переключения цепочки в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+
+        return self.call(request)
+
+
+class ReplicaPinMiddleware(AsyncCapableMiddleware):
+    """
+    Обеспечивает read-your-writes: после записи в БД ставит cookie,
+    и пока она жива, все чтения этого юзера идут в primary.
+    """
+    def call(self, request):
+        state = RoutingState(
+            pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        token = set_state(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_state(token)
+
+        return self.pin(state, response)
+
+    async def acall(self, request):
+        state = RoutingState(
+            pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        token = set_state(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_state(token)
+
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+
+        return response
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Собирает метрики по имени view: время ответа, число и время запросов
+    к БД, время рендеринга шаблонов и попадания в кэш (core.metrics).
+    """
+    def call(self, request):
+        stats = RequestStats()
+        token = set_stats(stats)
+        started = time.perf_counter()
+        try:
+            with query_wrappers(lambda connection: count_query):
+                response = self.get_response(request)
+        finally:
+            reset_stats(token)
+        self.record(request, response, started, stats)
+        registry.flush()
+
+        return response
+
+    async def acall(self, request):
+        stats = RequestStats()
+        token = set_stats(stats)
+        started = time.perf_counter()
+        try:
+            close = await aenter(
+                query_wrappers(lambda connection: count_query))
+            try:
+                response = await self.get_response(request)
+            finally:
+                await close()
+        finally:
+            reset_stats(token)
+        self.record(request, response, started, stats)
+        await sync_to_async(registry.flush)()
+
+        return response
+
+    def record(self, request, response, started, stats):
+        match = request.resolver_match
+        registry.record_request(
+            match.view_name if match else 'unresolved',
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            stats,
+        )
+
+
+class SlowQueryMiddleware(AsyncCapableMiddleware):
+    """Пишет в лог медленные запросы к БД (core.slow_queries)."""
+    def loggers(self, request):
+        return query_wrappers(
+            lambda connection: SlowQueryLogger(request, connection.alias))
+
+    def call(self, request):
+        with self.loggers(request):
+            return self.get_response(request)
+
+    async def acall(self, request):
+        close = await aenter(self.loggers(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            await close()
+
+
+class TemplateProfilerMiddleware(AsyncCapableMiddleware):
+    """
+    Профилирует рендеринг шаблонов у доли запросов
+    TEMPLATE_PROFILE_RATE (core.template_profiler).
+    """
+    def call(self, request):
+        started = start()
+        if started is None:
+            return self.get_response(request)
+        profile, token = started
+        try:
+            response = self.get_response(request)
+        finally:
+            stop(token)
+        report(request, response, profile)
+
+        return response
+
+    async def acall(self, request):
+        started = start()
+        if started is None:
+            return await self.get_response(request)
+        profile, token = started
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop(token)
+        await sync_to_async(report)(request, response, profile)
+
+        return response
+
+
+class SamplingProfilerMiddleware(AsyncCapableMiddleware):
+    """
+    Отмечает, какой запрос обрабатывает поток, чтобы сэмплирующий
+    профилировщик (core.sampling_profiler) подписывал стеки именем view.
+    Под ASGI отмечается поток, где идут синхронные части запроса:
+    event loop общий для всех запросов.
+    """
+    def call(self, request):
+        register_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            unregister_request()
+
+    async def acall(self, request):
+        await sync_to_async(register_request)(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(unregister_request)()
+
+
+class TracingMiddleware(AsyncCapableMiddleware):
+    """
+    Трассирует запрос (core.tracing): корневой спан с именем view,
+    спаны запросов к БД, кэша и шаблонов. С TRACE_TRUST_TRACEPARENT
+    продолжает трассу из заголовка traceparent. Id трассы возвращает
+    в заголовке X-Trace-Id.
+    """
+    def root_span(self, request):
+        traceparent = (request.headers.get('traceparent')
+                       if settings.TRACE_TRUST_TRACEPARENT else '')
+
+        return trace('request', 'request', traceparent,
+                     method=request.method, path=request.path)
+
+    def call(self, request):
+        with self.root_span(request) as root:
+            if root is None:
+                return self.get_response(request)
+            with traced_queries():
+                response = self.get_response(request)
+
+            return self.finish(request, response, root)
+
+    async def acall(self, request):
+        with self.root_span(request) as root:
+            if root is None:
+                return await self.get_response(request)
+            close = await aenter(traced_queries())
+            try:
+                response = await self.get_response(request)
+            finally:
+                await close()
+
+            return self.finish(request, response, root)
+
+    def finish(self, request, response, root):
+        match = request.resolver_match
+        root.name = match.view_name if match else 'unresolved'
+        root.attributes['status'] = response.status_code
+        response['X-Trace-Id'] = root.trace_id
+
+        return response
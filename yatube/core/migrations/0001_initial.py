@@ -0,0 +1,39 @@
+# Generated by Django 4.2.8 on 2026-10-19 10:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('name', models.CharField(max_length=200, verbose_name='задача')),
+                ('queue', models.CharField(default='default', max_length=50, verbose_name='очередь')),
+                ('args', models.JSONField(default=list, verbose_name='аргументы')),
+                ('kwargs', models.JSONField(default=dict, verbose_name='именованные аргументы')),
+                ('status', models.CharField(choices=[('queued', 'в очереди'), ('running', 'выполняется'), ('done', 'выполнена'), ('failed', 'ошибка')], default='queued', max_length=10, verbose_name='статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5, verbose_name='максимум попыток')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='запуск не раньше')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='занята до')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='завершена')),
+                ('idempotency_key', models.CharField(blank=True, max_length=255, null=True, unique=True, verbose_name='ключ идемпотентности')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'задача',
+                'verbose_name_plural': 'задачи',
+                'indexes': [models.Index(fields=['queue', 'status', 'run_at'], name='task_queue_status_run_at_idx')],
+            },
+        ),
+    ]
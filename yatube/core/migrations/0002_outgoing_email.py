@@ -0,0 +1,41 @@
+# Generated by Django 4.2.8 on 2026-10-19 10:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('subject', models.TextField(verbose_name='тема')),
+                ('body', models.TextField(verbose_name='текст')),
+                ('from_email', models.CharField(max_length=254, verbose_name='отправитель')),
+                ('to', models.JSONField(default=list, verbose_name='кому')),
+                ('cc', models.JSONField(default=list, verbose_name='копия')),
+                ('bcc', models.JSONField(default=list, verbose_name='скрытая копия')),
+                ('reply_to', models.JSONField(default=list, verbose_name='ответить')),
+                ('headers', models.JSONField(default=dict, verbose_name='заголовки')),
+                ('alternatives', models.JSONField(default=list, verbose_name='альтернативы')),
+                ('status', models.CharField(choices=[('queued', 'в очереди'), ('sending', 'отправляется'), ('sent', 'отправлено'), ('failed', 'ошибка')], default='queued', max_length=10, verbose_name='статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попыток')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='отправить не раньше')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='занято до')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='отправлено')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'исходящее письмо',
+                'verbose_name_plural': 'исходящие письма',
+                'indexes': [models.Index(fields=['status', 'run_at'], name='outgoing_email_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='traceparent',
+            field=models.CharField(blank=True, max_length=55, verbose_name='контекст трассировки'),
+        ),
+    ]
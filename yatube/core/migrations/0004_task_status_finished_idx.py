@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-19 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_task_traceparent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'finished'], name='task_status_finished_idx'),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from contextlib import contextmanager
+
 from django.db import models
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -10,3 +13,139 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+@contextmanager
+def explicit_created(*models):
+    """
+    Отключает auto_now_add у поля created переданных моделей,
+    чтобы при массовой загрузке сохранить исходные даты создания.
+    """
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Task(CreatedModel):
+    """
+    Отложенная задача фоновой очереди (см. core.tasks).
+    Хранится в БД, выполняется командой run_workers.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'в очереди'),
+        (RUNNING, 'выполняется'),
+        (DONE, 'выполнена'),
+        (FAILED, 'ошибка'),
+    ]
+
+    name = models.CharField('задача', max_length=200)
+    queue = models.CharField('очередь', max_length=50, default='default')
+    args = models.JSONField('аргументы', default=list)
+    kwargs = models.JSONField('именованные аргументы', default=dict)
+    status = models.CharField(
+        'статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'максимум попыток',
+        default=5
+    )
+    run_at = models.DateTimeField('запуск не раньше', default=timezone.now)
+    locked_until = models.DateTimeField(
+        'занята до',
+        blank=True,
+        null=True
+    )
+    finished = models.DateTimeField('завершена', blank=True, null=True)
+    idempotency_key = models.CharField(
+        'ключ идемпотентности',
+        max_length=255,
+        unique=True,
+        blank=True,
+        null=True
+    )
+    last_error = models.TextField('последняя ошибка', blank=True)
+    traceparent = models.CharField(
+        'контекст трассировки',
+        max_length=55,
+        blank=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_at'],
+                         name='task_queue_status_run_at_idx'),
+            models.Index(fields=['status', 'finished'],
+                         name='task_status_finished_idx'),
+        ]
+        verbose_name = 'задача'
+        verbose_name_plural = 'задачи'
+
+    def __str__(self) -> str:
+
+        return f'{self.name} ({self.get_status_display()})'
+
+
+class OutgoingEmail(CreatedModel):
+    """
+    Письмо в очереди отправки QueuedEmailBackend (см. core.mail).
+    """
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'в очереди'),
+        (SENDING, 'отправляется'),
+        (SENT, 'отправлено'),
+        (FAILED, 'ошибка'),
+    ]
+
+    subject = models.TextField('тема')
+    body = models.TextField('текст')
+    from_email = models.CharField('отправитель', max_length=254)
+    to = models.JSONField('кому', default=list)
+    cc = models.JSONField('копия', default=list)
+    bcc = models.JSONField('скрытая копия', default=list)
+    reply_to = models.JSONField('ответить', default=list)
+    headers = models.JSONField('заголовки', default=dict)
+    alternatives = models.JSONField('альтернативы', default=list)
+    status = models.CharField(
+        'статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('попыток', default=0)
+    run_at = models.DateTimeField('отправить не раньше', default=timezone.now)
+    locked_until = models.DateTimeField(
+        'занято до',
+        blank=True,
+        null=True
+    )
+    sent = models.DateTimeField('отправлено', blank=True, null=True)
+    last_error = models.TextField('последняя ошибка', blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='outgoing_email_status_idx'),
+        ]
+        verbose_name = 'исходящее письмо'
+        verbose_name_plural = 'исходящие письма'
+
+    def __str__(self) -> str:
+
+        return f'{self.subject} → {", ".join(self.to)}'
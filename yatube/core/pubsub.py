@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+QUEUE_SIZE = 100
+# Предельный размер одного сообщения между процессами.
+MESSAGE_SIZE = 64 * 1024
+
+
+class Broker:
+    """
+    pub/sub для SSE.
+    Подписчики - asyncio-очереди SSE-соединений; publish() можно звать
+    из любого потока (сигналы синхронных view), сообщение кладётся
+    в очередь через loop.call_soon_threadsafe. Одна публикация доходит
+    до всех подписчиков темы без опросов БД. Медленному клиенту
+    с переполненной очередью новые сообщения не доставляются.
+
+    Без PUBSUB_DIR брокер работает внутри одного процесса. С ним каждый
+    процесс, где есть подписчики, слушает Unix-сокет PUBSUB_DIR/<pid>.sock,
+    а publish() рассылает сообщение во все сокеты каталога, так что
+    событие из любого процесса (веб-воркера, воркера задач, команды)
+    доходит до подписчиков всех процессов.
+    """
+    def __init__(self, queue_size=QUEUE_SIZE, directory=None):
+        self.queue_size = queue_size
+        self._directory = directory
+        self.topics = {}
+        self.lock = threading.Lock()
+        self.listener = None
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            return settings.PUBSUB_DIR
+
+        return self._directory
+
+    def publish(self, topic, event, data):
+        if not self.directory:
+            self.deliver(topic, event, data)
+            return
+        message = json.dumps([topic, event, data],
+                             ensure_ascii=False).encode()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            sender.setblocking(False)
+            for path in Path(self.directory).glob('*.sock'):
+                try:
+                    sender.sendto(message, str(path))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Процесс, слушавший сокет, завершился.
+                    path.unlink(missing_ok=True)
+                except OSError:
+                    # Очередь сокета переполнена или сообщение велико.
+                    pass
+
+    def deliver(self, topic, event, data):
+        """Раздаёт сообщение подписчикам темы в этом процессе."""
+        with self.lock:
+            subscribers = list(self.topics.get(topic, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event, data)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт.
+                pass
+
+    @staticmethod
+    def _deliver(queue, event, data):
+        try:
+            queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            pass
+
+    def subscribers_count(self, topic):
+        """Число подписчиков темы в этом процессе."""
+        with self.lock:
+            return len(self.topics.get(topic, ()))
+
+    def has_subscribers(self, topic):
+        """
+        Может ли у темы быть подписчик. Подписчиков других процессов
+        не видно, поэтому с PUBSUB_DIR достаточно одного слушающего сокета.
+        """
+        if not self.directory:
+            return bool(self.subscribers_count(topic))
+
+        return any(Path(self.directory).glob('*.sock'))
+
+    def listen(self):
+        """
+        Начинает слушать сокет процесса в PUBSUB_DIR, если ещё не слушает.
+        После fork дочерний процесс открывает свой сокет.
+        """
+        if not self.directory:
+            return
+        with self.lock:
+            if self.listener is not None and self.listener[0] == os.getpid():
+                return
+            directory = Path(self.directory)
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f'{os.getpid()}.sock'
+            path.unlink(missing_ok=True)
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(str(path))
+            self.listener = (os.getpid(), receiver)
+        threading.Thread(target=self.receive, args=(receiver,),
+                         name='pubsub', daemon=True).start()
+
+    def receive(self, receiver):
+        while True:
+            message = receiver.recv(MESSAGE_SIZE)
+            try:
+                topic, event, data = json.loads(message)
+            except ValueError:
+                continue
+            self.deliver(topic, event, data)
+
+    @asynccontextmanager
+    async def subscribe(self, *topics):
+        """Подписывает одну очередь на темы на время блока with."""
+        self.listen()
+        subscriber = (asyncio.get_running_loop(),
+                      asyncio.Queue(self.queue_size))
+        with self.lock:
+            for topic in topics:
+                self.topics.setdefault(topic, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self.lock:
+                for topic in topics:
+                    subscribers = self.topics.get(topic)
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self.topics[topic]
+
+
+broker = Broker()
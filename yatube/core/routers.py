@@ -0,0 +1,120 @@
+import asyncio
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY = 'default'
+# Приложения, которые всегда читают из primary: отставание реплики
+# не должно разлогинивать только что вошедшего юзера.
+PRIMARY_APPS = {'auth', 'sessions'}
+
+
+class RoutingState:
+    """
+    Состояние маршрутизации запросов к БД в рамках одного HTTP-запроса.
+    pinned - юзер недавно писал в БД, читаем только с primary;
+    use_replicas - view разрешила читать с реплик;
+    wrote - в этом запросе уже была запись.
+    """
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.use_replicas = False
+        self.wrote = False
+
+    @property
+    def can_use_replicas(self):
+        return self.use_replicas and not self.pinned and not self.wrote
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def get_state():
+    return _state.get()
+
+
+def set_state(state):
+    return _state.set(state)
+
+
+def reset_state(token):
+    _state.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Отправляет запись в primary (default), а чтение внутри view,
+    обёрнутых replica_reads, - в случайную реплику из DATABASE_REPLICAS.
+    Сессии и пользователи (PRIMARY_APPS) всегда читаются из primary.
+    """
+    def db_for_read(self, model, **hints):
+        state = get_state()
+        replicas = settings.DATABASE_REPLICAS
+        if model._meta.app_label in PRIMARY_APPS:
+            return PRIMARY
+        if replicas and state is not None and state.can_use_replicas:
+            return random.choice(replicas)
+
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = get_state()
+        if state is not None:
+            state.wrote = True
+
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def replica_reads(view):
+    """
+    Разрешает view читать с реплик. Если юзер недавно писал в БД
+    (см. core.middleware.ReplicaPinMiddleware), чтение остаётся на primary.
+    """
+    def enter():
+        state = get_state()
+        token = None
+        if state is None:
+            state = RoutingState()
+            token = set_state(state)
+        previous = state.use_replicas
+        state.use_replicas = True
+
+        return state, previous, token
+
+    def leave(state, previous, token):
+        state.use_replicas = previous
+        if token is not None:
+            reset_state(token)
+
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            state, previous, token = enter()
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                leave(state, previous, token)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state, previous, token = enter()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            leave(state, previous, token)
+
+    return wrapper
@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_FILE = 'request.json'
+
+# Запросы, которые сейчас обрабатываются: id потока -> request.
+_requests = {}
+_lock = threading.Lock()
+_active = None
+
+
+class ProfilerBusy(Exception):
+    """Профилировщик в этом процессе уже запущен."""
+
+
+def register_request(request):
+    _requests[threading.get_ident()] = request
+
+
+def unregister_request():
+    _requests.pop(threading.get_ident(), None)
+
+
+def frame_label(frame):
+    module = frame.f_globals.get('__name__', '?')
+
+    return f'{module}:{frame.f_code.co_name}'
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+
+    return match.view_name if match else request.path
+
+
+class Sampler:
+    """
+    Статистический профилировщик: раз в interval секунд снимает стеки
+    потоков, обрабатывающих запросы, и считает одинаковые стеки.
+    Корень каждого стека - имя view, так что результат сразу делится
+    по страницам.
+
+    В режиме cpu выборки делает обработчик SIGPROF (таймер процессорного
+    времени, только из главного потока), в режиме wall - отдельный поток
+    по настенным часам; он же используется, если сигналы недоступны.
+    """
+    def __init__(self, interval, exclude=()):
+        self.interval = interval
+        self.exclude = set(exclude)
+        self.stacks = Counter()
+        self.samples = 0
+        self.mode = None
+        self.stopped = threading.Event()
+
+    def sample(self):
+        self.samples += 1
+        frames = sys._current_frames()
+        for ident, request in list(_requests.items()):
+            frame = frames.get(ident)
+            if frame is None or ident in self.exclude:
+                continue
+            # В режиме cpu главный поток снят внутри обработчика сигнала.
+            while (frame is not None
+                   and frame.f_globals.get('__name__') == __name__):
+                frame = frame.f_back
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stack.append(view_label(request))
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def handle_signal(self, signum, frame):
+        self.sample()
+
+    def run_thread(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def start(self, mode='wall'):
+        global _active
+        with _lock:
+            if _active is not None:
+                raise ProfilerBusy('Профилировщик уже запущен.')
+            _active = self
+        main_thread = threading.current_thread() is threading.main_thread()
+        can_signal = hasattr(signal, 'setitimer') and main_thread
+        if mode == 'cpu' and can_signal:
+            self.mode = 'cpu'
+            signal.signal(signal.SIGPROF, self.handle_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self.mode = 'wall'
+            threading.Thread(target=self.run_thread, daemon=True,
+                             name='sampling-profiler').start()
+
+    def stop(self):
+        global _active
+        if self.mode == 'cpu':
+            signal.setitimer(signal.ITIMER_PROF, 0)
+        self.stopped.set()
+        with _lock:
+            _active = None
+
+    def collapsed(self):
+        """Свёрнутые стеки: «view;модуль:функция;... число» построчно."""
+        return ''.join(f'{stack} {count}\n'
+                       for stack, count in self.stacks.most_common())
+
+
+def profile_for(seconds, interval, mode='wall', exclude=()):
+    """Профилирует процесс seconds секунд и возвращает Sampler."""
+    sampler = Sampler(interval, exclude)
+    sampler.start(mode)
+    try:
+        time.sleep(seconds)
+    finally:
+        sampler.stop()
+
+    return sampler
+
+
+def clamp_seconds(seconds):
+    return max(0.0, min(float(seconds), settings.PROFILER_MAX_SECONDS))
+
+
+def handle_profile_signal(signum, frame):
+    """
+    Обработчик SIGUSR2: читает параметры из PROFILER_DIR/request.json,
+    профилирует процесс в фоне и пишет PROFILER_DIR/<pid>.collapsed.
+    """
+    directory = Path(settings.PROFILER_DIR)
+    try:
+        options = json.loads((directory / REQUEST_FILE).read_text())
+    except (OSError, ValueError):
+        options = {}
+    seconds = clamp_seconds(options.get('seconds', 10))
+    interval = options.get('interval_ms', settings.PROFILER_INTERVAL_MS)
+    sampler = Sampler(interval / 1000)
+    try:
+        sampler.start(options.get('mode', 'cpu'))
+    except ProfilerBusy:
+        logger.warning('Профилировщик уже запущен, сигнал пропущен.')
+        return
+
+    def finish():
+        time.sleep(seconds)
+        sampler.stop()
+        path = directory / f'{os.getpid()}.collapsed'
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(sampler.collapsed())
+        os.replace(temporary, path)
+
+    threading.Thread(target=finish, daemon=True,
+                     name='sampling-profiler-timer').start()
+
+
+def install_signal_handler():
+    """Включает профилирование по SIGUSR2, если задан PROFILER_DIR."""
+    if not settings.PROFILER_DIR or not hasattr(signal, 'SIGUSR2'):
+        return
+    try:
+        signal.signal(signal.SIGUSR2, handle_profile_signal)
+    except ValueError:
+        # Не главный поток: сигналы здесь не настроить.
+        return
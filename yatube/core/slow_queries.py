@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import math
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template.base import Node
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_write_lock = threading.Lock()
+
+# Обёртки запросов, шаблонов и кэша: сами они источником запроса не бывают.
+_INSTRUMENTATION = {
+    str(Path(__file__).with_name(name))
+    for name in ('backends.py', 'metrics.py', 'middleware.py',
+                 'slow_queries.py', 'tracing.py')
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMETER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN \(\?(?:, \?)*\)', re.IGNORECASE)
+_ROWS = re.compile(r'(\(\?(?:, \?)*\))(?:, \1)+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """
+    Приводит SQL к отпечатку: литералы и параметры заменяются на ?,
+    списки IN и строки VALUES любой длины - на одинаковую запись.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PARAMETER.sub('?', sql)
+    sql = _SPACES.sub(' ', sql).strip()
+    sql = _IN_LIST.sub('IN (...)', sql)
+
+    return _ROWS.sub(r'\1, ...', sql)
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:12]
+
+
+def find_origin(frame):
+    """
+    Ищет в стеке, откуда пришёл запрос: ближайший узел шаблона
+    (шаблон, строка и тег или переменная) и ближайшую строку кода проекта.
+    Стек разбирается только для медленных запросов.
+    """
+    template = caller = None
+    base_dir = str(settings.BASE_DIR)
+    while frame is not None and (template is None or caller is None):
+        code = frame.f_code
+        node = frame.f_locals.get('self')
+        if (template is None and code.co_name == 'render_annotated'
+                and isinstance(node, Node) and node.origin is not None):
+            token = getattr(node, 'token', None)
+            template = {
+                'name': node.origin.template_name or node.origin.name,
+                'line': token.lineno if token else None,
+                'node': token.contents if token else type(node).__name__,
+            }
+        filename = code.co_filename
+        if (caller is None and filename.startswith(base_dir)
+                and filename not in _INSTRUMENTATION):
+            caller = f'{Path(filename).relative_to(base_dir)}:{frame.f_lineno}'
+        frame = frame.f_back
+
+    return template, caller
+
+
+def write_entry(entry):
+    path = settings.SLOW_QUERY_LOG
+    if not path:
+        return
+    line = json.dumps(entry, ensure_ascii=False) + '\n'
+    with _write_lock, open(path, 'a', encoding='utf-8') as log:
+        log.write(line)
+
+
+class SlowQueryLogger:
+    """
+    execute_wrapper: запросы дольше SLOW_QUERY_MS пишутся в лог
+    с view, шаблоном и строкой кода, вызвавшими запрос.
+    """
+    def __init__(self, request, alias):
+        self.request = request
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= settings.SLOW_QUERY_MS:
+                self.log(sql, duration)
+
+    def log(self, sql, duration):
+        normalized = normalize(sql)
+        template, caller = find_origin(sys._getframe(2))
+        match = getattr(self.request, 'resolver_match', None)
+        entry = {
+            'time': timezone.now().isoformat(),
+            'fingerprint': fingerprint(normalized),
+            'duration_ms': round(duration, 3),
+            'sql': normalized,
+            'database': self.alias,
+            'view': match.view_name if match else None,
+            'path': self.request.path,
+            'template': template,
+            'caller': caller,
+        }
+        logger.warning('Медленный запрос %.1f мс в %s: %s', duration,
+                       entry['view'] or entry['path'], normalized)
+        write_entry(entry)
+
+
+def read_log(path):
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+
+    return ordered[max(0, math.ceil(len(ordered) * share) - 1)]
+
+
+def aggregate(entries):
+    """
+    Сводка по отпечаткам: число запросов, суммарное, p95 и максимальное
+    время, а также самые частые view и место в шаблоне или коде.
+    """
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'sql': entry['sql'],
+            'durations': [],
+            'views': {},
+            'origins': {},
+        })
+        group['durations'].append(entry['duration_ms'])
+        view = entry.get('view') or entry.get('path')
+        group['views'][view] = group['views'].get(view, 0) + 1
+        template = entry.get('template')
+        origin = (f'{template["name"]}:{template["line"]} {template["node"]}'
+                  if template else entry.get('caller'))
+        group['origins'][origin] = group['origins'].get(origin, 0) + 1
+    for group in groups.values():
+        durations = group.pop('durations')
+        group['count'] = len(durations)
+        group['total_ms'] = round(sum(durations), 3)
+        group['p95_ms'] = percentile(durations, 0.95)
+        group['max_ms'] = max(durations)
+        group['view'] = max(group.pop('views').items(),
+                            key=lambda item: item[1])[0]
+        group['origin'] = max(group.pop('origins').items(),
+                              key=lambda item: item[1])[0]
+
+    return list(groups.values())
@@ -0,0 +1,288 @@
+import logging
+import random
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import suppress
+from datetime import timedelta
+from functools import partial
+from importlib import import_module
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+from .tracing import current_traceparent, span, trace, traced_queries
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+# Сколько завершённых задач удалять одним запросом.
+PURGE_BATCH_SIZE = 1000
+
+
+class TaskDefinition:
+    """
+    Функция, зарегистрированная как фоновая задача.
+    Вызов напрямую выполняет её сразу, delay() и enqueue() ставят
+    в очередь. При TASKS_ALWAYS_EAGER задача выполняется в этом же
+    процессе после коммита текущей транзакции, без записи в БД.
+    """
+    def __init__(self, func, name, queue, max_attempts):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, key=None, countdown=0,
+                eager=None):
+        """
+        Ставит задачу в очередь. Запись создаётся в текущей транзакции,
+        поэтому воркер увидит задачу только вместе с её данными.
+        Повторная постановка с тем же key ничего не делает.
+        Задача запоминает текущую трассу и продолжит её в воркере.
+        eager=False ставит задачу в очередь и при TASKS_ALWAYS_EAGER.
+        """
+        kwargs = kwargs or {}
+        if settings.TASKS_ALWAYS_EAGER if eager is None else eager:
+            transaction.on_commit(partial(self.run_eager, args, kwargs))
+            return None
+        task = Task(
+            name=self.name,
+            queue=self.queue,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+            idempotency_key=key,
+            traceparent=current_traceparent(),
+        )
+        if key is None:
+            task.save()
+            return task
+        try:
+            with transaction.atomic():
+                task.save()
+        except IntegrityError:
+            return Task.objects.get(idempotency_key=key)
+
+        return task
+
+    def run_eager(self, args, kwargs):
+        with span(self.name, 'task', queue=self.queue, eager=True):
+            self.func(*args, **kwargs)
+
+
+def task(name=None, queue='default', max_attempts=5):
+    """Регистрирует функцию как фоновую задачу."""
+    def decorator(func):
+        definition = TaskDefinition(
+            func,
+            name or f'{func.__module__}.{func.__name__}',
+            queue,
+            max_attempts,
+        )
+        registry[definition.name] = definition
+
+        return definition
+
+    return decorator
+
+
+def get_definition(name):
+    """
+    Находит задачу по имени. Если её модуль ещё не импортирован,
+    импортирует модули tasks всех приложений и модуль из имени задачи.
+    """
+    if name not in registry:
+        autodiscover_modules('tasks')
+        with suppress(ImportError):
+            import_module(name.rpartition('.')[0])
+
+    return registry[name]
+
+
+def backoff(attempts):
+    """Экспоненциальная пауза перед повтором, с разбросом до 10%."""
+    delay = min(settings.TASK_BACKOFF_SECONDS * 2 ** (attempts - 1),
+                settings.TASK_BACKOFF_MAX_SECONDS)
+
+    return timedelta(seconds=delay * random.uniform(1, 1.1))
+
+
+def claim(queue, limit):
+    """
+    Забирает до limit готовых задач очереди.
+    Задача достаётся тому воркеру, чей UPDATE со статусом-условием
+    изменил строку, поэтому несколько процессов run_workers
+    не выполнят одну задачу дважды. Зависшие задачи упавших воркеров
+    (истёк locked_until) забираются заново.
+    """
+    now = timezone.now()
+    ready = (Q(status=Task.QUEUED, run_at__lte=now)
+             | Q(status=Task.RUNNING, locked_until__lt=now))
+    candidates = list(
+        Task.objects.filter(ready, queue=queue)
+        .order_by('run_at', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    claimed = []
+    for task_id in candidates:
+        updated = Task.objects.filter(ready, pk=task_id).update(
+            status=Task.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.TASK_LOCK_SECONDS),
+        )
+        if updated:
+            claimed.append(task_id)
+
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_at', 'id'))
+
+
+def execute(task):
+    """
+    Выполняет задачу и записывает результат.
+    Упавшая задача откладывается с экспоненциальной паузой,
+    после max_attempts попыток получает статус failed.
+    Если задачу поставили внутри трассы, выполнение попадает в неё же.
+    """
+    try:
+        with trace(task.name, 'task', task.traceparent, task_id=task.pk,
+                   queue=task.queue, attempt=task.attempts):
+            with traced_queries():
+                get_definition(task.name).func(*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Задача %s #%s упала:\n%s', task.name, task.pk, error)
+        updates = {'last_error': error, 'locked_until': None}
+        if task.attempts >= task.max_attempts:
+            updates.update(status=Task.FAILED, finished=timezone.now())
+        else:
+            updates.update(status=Task.QUEUED,
+                           run_at=timezone.now() + backoff(task.attempts))
+    else:
+        updates = {'status': Task.DONE, 'finished': timezone.now(),
+                   'locked_until': None}
+    Task.objects.filter(pk=task.pk).update(**updates)
+
+    return updates['status']
+
+
+def purge_finished(before):
+    """
+    Удаляет выполненные и упавшие задачи, завершённые раньше before,
+    пачками по PURGE_BATCH_SIZE, чтобы не держать долгую блокировку.
+    Возвращает число удалённых задач.
+    """
+    finished = Task.objects.filter(status__in=[Task.DONE, Task.FAILED],
+                                   finished__lt=before)
+    deleted = 0
+    while True:
+        batch = list(finished.values_list('id', flat=True)
+                     [:PURGE_BATCH_SIZE])
+        if not batch:
+            return deleted
+        deleted += Task.objects.filter(pk__in=batch).delete()[0]
+
+
+def run_task(task):
+    """Выполняет задачу в потоке воркера со своим подключением к БД."""
+    close_old_connections()
+    try:
+        return execute(task)
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """
+    Пул воркеров run_workers.
+    У каждой очереди свой ThreadPoolExecutor на queues[name] потоков:
+    это и есть лимит параллельности очереди, медленная очередь
+    не занимает потоки остальных. Новые задачи забираются только
+    в свободные слоты. Раз в TASK_PURGE_SECONDS воркер удаляет задачи,
+    завершённые больше TASK_RETENTION_DAYS дней назад.
+    """
+    def __init__(self, queues, poll=1.0):
+        self.queues = queues
+        self.poll = poll
+        self.executors = {
+            name: ThreadPoolExecutor(concurrency,
+                                     thread_name_prefix=f'tasks-{name}')
+            for name, concurrency in queues.items()
+        }
+        self.running = {name: set() for name in queues}
+        self.stats = Counter()
+        self.stopping = threading.Event()
+        self.purged = None
+
+    def collect(self):
+        for running in self.running.values():
+            for future in [future for future in running if future.done()]:
+                running.discard(future)
+                if future.exception() is not None:
+                    logger.error('Сбой воркера: %r', future.exception())
+                    self.stats['error'] += 1
+                else:
+                    self.stats[future.result()] += 1
+
+    def fill(self):
+        """Забирает задачи в свободные слоты всех очередей."""
+        self.collect()
+        for name, concurrency in self.queues.items():
+            free = concurrency - len(self.running[name])
+            if free <= 0:
+                continue
+            for task in claim(name, free):
+                self.running[name].add(
+                    self.executors[name].submit(run_task, task))
+
+    def purge(self):
+        now = time.monotonic()
+        if (self.purged is not None
+                and now - self.purged < settings.TASK_PURGE_SECONDS):
+            return
+        self.purged = now
+        before = timezone.now() - timedelta(
+            days=settings.TASK_RETENTION_DAYS)
+        purged = purge_finished(before)
+        if purged:
+            self.stats['purged'] += purged
+
+    def run(self, once=False):
+        """
+        Крутит цикл до stop(). С once=True выходит,
+        когда готовых к запуску задач не осталось.
+        """
+        try:
+            while not self.stopping.is_set():
+                self.purge()
+                self.fill()
+                running = set().union(*self.running.values())
+                if not running:
+                    if once:
+                        break
+                    self.stopping.wait(self.poll)
+                    continue
+                wait(running, timeout=self.poll, return_when=FIRST_COMPLETED)
+        finally:
+            for executor in self.executors.values():
+                executor.shutdown(wait=True)
+            self.collect()
+
+        return self.stats
+
+    def stop(self):
+        self.stopping.set()
@@ -0,0 +1,141 @@
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.base import Node, Template, VariableNode
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_profile = ContextVar('template_profile', default=None)
+_original = {}
+_install_lock = threading.Lock()
+_installed = False
+
+
+class TemplateProfile:
+    """Время шаблонов, тегов и фильтров за один запрос."""
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, label, seconds):
+        entry = self.entries.setdefault(label, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    def top(self, limit):
+        """[(метка, вызовы, всего, максимум)] по убыванию общего времени."""
+        rows = [(label, *entry) for label, entry in self.entries.items()]
+
+        return sorted(rows, key=lambda row: row[2], reverse=True)[:limit]
+
+
+def node_label(node):
+    """
+    Метка узла: tag:<имя тега> или filter:<фильтры> для переменных
+    с фильтрами. Переменные без фильтров отдельно не меряются,
+    их время входит в объемлющий тег или шаблон.
+    """
+    if isinstance(node, VariableNode):
+        filters = [getattr(func, '_filter_name', func.__name__)
+                   for func, args in node.filter_expression.filters]
+
+        return 'filter:' + '|'.join(filters) if filters else None
+    token = getattr(node, 'token', None)
+    if token is None or not token.contents:
+        return f'tag:{type(node).__name__}'
+
+    return f'tag:{token.split_contents()[0]}'
+
+
+def timed(label, render, *args):
+    profile = _profile.get()
+    if profile is None or label is None:
+        return render(*args)
+    started = time.perf_counter()
+    try:
+        return render(*args)
+    finally:
+        profile.add(label, time.perf_counter() - started)
+
+
+def render_annotated(self, context):
+    if _profile.get() is None:
+        return _original['node'](self, context)
+    try:
+        label = self._profile_label
+    except AttributeError:
+        label = self._profile_label = node_label(self)
+
+    return timed(label, _original['node'], self, context)
+
+
+def template_render(self, context):
+    if _profile.get() is None:
+        return _original['template'](self, context)
+    name = self.origin.template_name or self.name
+
+    return timed(f'template:{name}', _original['template'], self, context)
+
+
+def install():
+    """
+    Подменяет рендеринг узлов и шаблонов. Вызывается при первом
+    профилируемом запросе; пока профиль не включён, подмена стоит
+    одну проверку ContextVar на узел. Первые профилируемые запросы
+    могут прийти в нескольких потоках сразу, поэтому подмена идёт
+    под блокировкой: иначе второй поток запомнил бы уже подменённые
+    методы как исходные и рендеринг ушёл бы в бесконечную рекурсию.
+    """
+    global _installed
+    if _installed:
+        return
+    with _install_lock:
+        if _installed:
+            return
+        _original['node'] = Node.render_annotated
+        _original['template'] = Template._render
+        Node.render_annotated = render_annotated
+        Template._render = template_render
+        _installed = True
+
+
+def start():
+    """Включает профиль запроса с вероятностью TEMPLATE_PROFILE_RATE."""
+    if random.random() >= settings.TEMPLATE_PROFILE_RATE:
+        return None
+    install()
+    profile = TemplateProfile()
+
+    return profile, _profile.set(profile)
+
+
+def stop(token):
+    _profile.reset(token)
+
+
+def report(request, response, profile):
+    """Отдаёт профиль в Server-Timing, лог и метрики."""
+    if not profile.entries:
+        return
+    match = request.resolver_match
+    view = match.view_name if match else 'unresolved'
+    top = profile.top(settings.TEMPLATE_PROFILE_TOP)
+    response['Server-Timing'] = ', '.join(
+        f'tpl{number};dur={total * 1000:.2f};desc="{label} x{calls}"'
+        for number, (label, calls, total, longest) in enumerate(top, 1)
+    )
+    logger.info('Шаблоны %s: %s', view, '; '.join(
+        f'{label} {calls}x {total * 1000:.1f} мс '
+        f'(макс. {longest * 1000:.1f} мс)'
+        for label, calls, total, longest in top
+    ))
+    for label, (calls, total, longest) in profile.entries.items():
+        labels = {'view': view, 'node': label}
+        registry.inc('yatube_template_node_calls_total', labels, calls)
+        registry.inc('yatube_template_node_seconds_total', labels, total)
@@ -0,0 +1,23 @@
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TempMediaRunner(DiscoverRunner):
+    """
+    Запускает тесты с MEDIA_ROOT во временном каталоге: загруженные
+    картинки и миниатюры не попадают в media проекта и удаляются
+    после прогона.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.media_root = tempfile.mkdtemp(prefix='yatube-media-')
+        self.media_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.media_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,4 +1,47 @@
-from django.test import TestCase
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template.base import Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from posts.models import Post
+from .benchmark import (HttpRunner, InProcessRunner, Scenario, compare,
+                        run_scenario)
+from .mail import deliver_emails
+from .metrics import registry
+from .models import OutgoingEmail, Task
+from .routers import (ReplicaRouter, RoutingState, replica_reads,
+                      reset_state, set_state)
+from .sampling_profiler import (Sampler, handle_profile_signal,
+                                register_request, unregister_request)
+from .slow_queries import normalize, read_log
+from .template_profiler import (TemplateProfile, install,
+                                template_render)
+from .tasks import Worker, claim, execute, purge_finished, task
+from .tracing import read_trace, span_tree, trace
+
+User = get_user_model()
 
 
 class TestErrors(TestCase):
@@ -7,3 +50,743 @@ class TestErrors(TestCase):
         response = self.client.get('/unexisting_page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class TestSqlitePragmas(TestCase):
+    def test_pragmas_applied(self):
+        """Проверяет, что подключение к SQLite настроено прагмами."""
+        pragmas_and_expected = {
+            'busy_timeout': 5000,
+            'synchronous': 1,
+            'cache_size': -65536,
+            'temp_store': 2,
+        }
+        with connection.cursor() as cursor:
+            for pragma, expected in pragmas_and_expected.items():
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class TestReplicaRouter(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.router = ReplicaRouter()
+
+    def read_db_in_view(self, state=None):
+        @replica_reads
+        def view(request):
+            return self.router.db_for_read(Post)
+
+        if state is None:
+            return view(None)
+        token = set_state(state)
+        try:
+            return view(None)
+        finally:
+            reset_state(token)
+
+    def test_reads_outside_views_go_to_primary(self):
+        """Чтение вне view с replica_reads идёт в primary."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_view_reads_go_to_replica(self):
+        """Чтение внутри view с replica_reads идёт в реплику."""
+        self.assertEqual(self.read_db_in_view(), 'replica')
+        self.assertEqual(self.read_db_in_view(RoutingState()), 'replica')
+
+    def test_sessions_and_users_read_from_primary(self):
+        """Сессии и юзеры читаются из primary даже внутри view."""
+        @replica_reads
+        def view(request):
+            return [self.router.db_for_read(model)
+                    for model in (User, Session)]
+
+        self.assertEqual(view(None), ['default', 'default'])
+
+    def test_pinned_reads_go_to_primary(self):
+        """После недавней записи юзера чтение идёт в primary."""
+        self.assertEqual(self.read_db_in_view(RoutingState(pinned=True)),
+                         'default')
+
+    def test_reads_after_write_go_to_primary(self):
+        """Чтение после записи в том же запросе идёт в primary."""
+        state = RoutingState()
+        token = set_state(state)
+        try:
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+        finally:
+            reset_state(token)
+        self.assertEqual(self.read_db_in_view(state), 'default')
+
+
+class TestReplicaPinMiddleware(TestCase):
+    def test_write_sets_pin_cookie(self):
+        """После записи в БД ответ ставит cookie привязки к primary."""
+        user = User.objects.create_user(username='writer')
+        self.client.force_login(user)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Новый пост'})
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+
+calls = []
+
+
+@task(name='core.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='core.tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('сбой')
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class TestTaskQueue(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_eager_mode_runs_after_commit(self):
+        """
+        В режиме TASKS_ALWAYS_EAGER задача выполняется без записи в БД,
+        но только после коммита транзакции, которая её поставила.
+        """
+        with self.settings(TASKS_ALWAYS_EAGER=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertIsNone(record.delay(1))
+                self.assertEqual(calls, [])
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_purge_finished(self):
+        """Удаляются только давно завершённые задачи."""
+        now = timezone.now()
+        old = now - timedelta(days=settings.TASK_RETENTION_DAYS + 1)
+        done, failed, recent, queued = [record.delay(value)
+                                        for value in range(4)]
+        Task.objects.filter(pk=done.pk).update(status=Task.DONE, finished=old)
+        Task.objects.filter(pk=failed.pk).update(status=Task.FAILED,
+                                                 finished=old)
+        Task.objects.filter(pk=recent.pk).update(status=Task.DONE,
+                                                 finished=now)
+        before = now - timedelta(days=settings.TASK_RETENTION_DAYS)
+        self.assertEqual(purge_finished(before), 2)
+        self.assertEqual(set(Task.objects.values_list('pk', flat=True)),
+                         {recent.pk, queued.pk})
+
+    def test_idempotency_key(self):
+        """Повторная постановка с тем же ключом не создаёт задачу."""
+        first = record.enqueue([1], key='record:1')
+        second = record.enqueue([1], key='record:1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_claim_respects_limit_and_run_at(self):
+        """Забираются только готовые задачи и не больше лимита."""
+        for value in range(3):
+            record.delay(value)
+        record.enqueue([3], countdown=60)
+        claimed = claim('default', 2)
+        self.assertEqual([task.args for task in claimed], [[0], [1]])
+        self.assertTrue(all(task.status == Task.RUNNING
+                            and task.attempts == 1 for task in claimed))
+        self.assertEqual(len(claim('default', 10)), 1)
+
+    def test_stale_running_task_reclaimed(self):
+        """Задача упавшего воркера забирается после истечения блокировки."""
+        stale = record.delay(1)
+        claim('default', 1)
+        self.assertEqual(claim('default', 1), [])
+        Task.objects.filter(pk=stale.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim('default', 1)[0].attempts, 2)
+
+    def test_retry_with_backoff_then_fail(self):
+        """Упавшая задача откладывается, после max_attempts - failed."""
+        failing = fail.delay()
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(execute(claim('default', 1)[0]), Task.QUEUED)
+        failing.refresh_from_db()
+        self.assertIn('сбой', failing.last_error)
+        self.assertGreaterEqual(
+            failing.run_at - timezone.now(),
+            timedelta(seconds=settings.TASK_BACKOFF_SECONDS - 1))
+        Task.objects.filter(pk=failing.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(execute(claim('default', 1)[0]), Task.FAILED)
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class TestWorker(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_run_once_drains_queues(self):
+        """Воркер выполняет готовые задачи всех очередей и выходит."""
+        for value in range(5):
+            record.delay(value)
+        stats = Worker({'default': 2}, poll=0.01).run(once=True)
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertEqual(stats[Task.DONE], 5)
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
+
+
+class CountingBackend(EmailBackend):
+    """Тестовый бэкенд доставки: считает открытые подключения."""
+    opened = 0
+    broken = False
+
+    def open(self):
+        type(self).opened += 1
+
+    def send_messages(self, messages):
+        if self.broken:
+            raise ConnectionError('SMTP недоступен')
+
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+                   EMAIL_DELIVERY_BACKEND='core.tests.CountingBackend',
+                   EMAIL_RATE_LIMIT=0,
+                   TASKS_ALWAYS_EAGER=False)
+class TestQueuedEmail(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+        CountingBackend.broken = False
+
+    def run_delivery(self):
+        for queued in claim('email', 10):
+            execute(queued)
+
+    def test_send_only_queues(self):
+        """Отправка в запросе только сохраняет письма и ставит задачу."""
+        for number in range(3):
+            mail.send_mail(f'Тема {number}', 'Текст', 'from@yatube.ru',
+                           ['to@yatube.ru'])
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutgoingEmail.objects.count(), 3)
+        self.assertTrue(Task.objects.filter(
+            name=deliver_emails.name, queue='email').exists())
+
+    def test_batch_over_one_connection(self):
+        """Все письма очереди уходят через одно подключение."""
+        for number in range(3):
+            mail.send_mail(f'Тема {number}', 'Текст', 'from@yatube.ru',
+                           ['to@yatube.ru'], html_message='<b>Текст</b>')
+        self.run_delivery()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(mail.outbox[0].alternatives,
+                         [('<b>Текст</b>', 'text/html')])
+        self.assertFalse(OutgoingEmail.objects.exclude(
+            status=OutgoingEmail.SENT).exists())
+
+    def test_failed_delivery_retried(self):
+        """Недоставленное письмо откладывается на повтор."""
+        CountingBackend.broken = True
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        self.run_delivery()
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.QUEUED)
+        self.assertIn('SMTP недоступен', email.last_error)
+        self.assertGreater(email.run_at, timezone.now())
+        self.assertTrue(Task.objects.filter(
+            status=Task.QUEUED, run_at__gt=timezone.now()).exists())
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_view_never_calls_delivery_backend(self):
+        """
+        Письмо из view уходит в очередь и при TASKS_ALWAYS_EAGER:
+        бэкенд доставки в запросе не вызывается.
+        """
+        User.objects.create_user('reset', 'reset@yatube.ru', 'password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('users:password_reset'),
+                             {'email': 'reset@yatube.ru'})
+        self.assertEqual(CountingBackend.opened, 0)
+        self.assertEqual(mail.outbox, [])
+        self.assertTrue(Task.objects.filter(
+            name=deliver_emails.name, status=Task.QUEUED).exists())
+
+    def test_password_reset_does_not_wait_for_mail(self):
+        """Сброс пароля ставит письмо в очередь, а не отправляет его."""
+        User.objects.create_user('reset', 'reset@yatube.ru', 'password')
+        self.client.post(reverse('users:password_reset'),
+                         {'email': 'reset@yatube.ru'})
+        self.assertEqual(mail.outbox, [])
+        self.run_delivery()
+        self.assertEqual(mail.outbox[0].to, ['reset@yatube.ru'])
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        registry.reset()
+
+    def get_metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+
+        return response.content.decode()
+
+    def test_view_metrics(self):
+        """Время ответа, запросы к БД, шаблоны и кэш учитываются по view."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        metrics = self.get_metrics()
+        view = 'view="posts:index"'
+        expected = [
+            f'yatube_requests_total{{method="GET",status="200",{view}}} 2',
+            f'yatube_request_duration_seconds_count{{{view}}} 2',
+            f'yatube_request_db_queries_count{{{view}}} 2',
+            f'yatube_db_query_seconds_total{{{view}}}',
+            f'yatube_template_render_seconds_total{{{view}}}',
+            f'yatube_cache_requests_total{{result="hit",{view}}}',
+            f'yatube_cache_requests_total{{result="miss",{view}}}',
+            '# TYPE yatube_request_duration_seconds histogram',
+        ]
+        for line in expected:
+            with self.subTest(line=line):
+                self.assertIn(line, metrics)
+
+    def test_unresolved_urls_share_label(self):
+        """Несуществующие адреса не плодят метки."""
+        self.client.get('/unexisting_page/')
+        self.assertIn('status="404",view="unresolved"', self.get_metrics())
+
+    def test_processes_aggregated(self):
+        """Метрики из файлов разных процессов складываются."""
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(METRICS_DIR=directory):
+                self.client.get(reverse('posts:index'))
+                registry.flush(force=True)
+                own = next(Path(directory).glob('*.json'))
+                (Path(directory) / 'other.json').write_text(
+                    own.read_text())
+                metrics = self.get_metrics()
+        self.assertIn('yatube_requests_total{method="GET",status="200",'
+                      'view="posts:index"} 2', metrics)
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="posts:index"} 2', metrics)
+
+    def test_concurrent_flushes(self):
+        """Одновременный сброс из нескольких потоков не ломает файл."""
+        registry.inc('yatube_requests_total', {'view': 'test'})
+        errors = []
+
+        def flush():
+            try:
+                for _ in range(20):
+                    registry.flush(force=True)
+            except OSError as exc:
+                errors.append(exc)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(METRICS_DIR=directory):
+                threads = [threading.Thread(target=flush) for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                files = [path.name for path in Path(directory).iterdir()]
+                metrics = self.get_metrics()
+        self.assertEqual(errors, [])
+        self.assertEqual(files, [f'{os.getpid()}.json'])
+        self.assertIn('yatube_requests_total{view="test"} 1', metrics)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_restricted(self):
+        """/metrics доступен только с разрешённых адресов."""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+
+class TestAsyncMiddleware(TestCase):
+    def test_middleware_async_capable(self):
+        """Под ASGI middleware из core не переключают цепочку в поток."""
+        async def get_response(request):
+            return HttpResponse()
+
+        for path in settings.MIDDLEWARE:
+            if path.startswith('core.'):
+                with self.subTest(middleware=path):
+                    middleware = import_string(path)(get_response)
+                    self.assertTrue(iscoroutinefunction(middleware))
+
+    async def test_queries_counted_under_asgi(self):
+        """
+        Запросы к БД из потока, где под ASGI работает ORM, попадают
+        в метрики и в трассу.
+        """
+        cache.clear()
+        registry.reset()
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / 'trace.jsonl')
+            with self.settings(TRACE_FILE=path):
+                response = await self.async_client.get(
+                    reverse('posts:index'))
+            spans = read_trace(path, response['X-Trace-Id'])
+        self.assertEqual(response.status_code, 200)
+        queries = registry.histograms[
+            'yatube_request_db_queries', (('view', 'posts:index'),)]
+        self.assertGreater(queries['sum'], 0)
+        self.assertIn('db', {span['kind'] for span in spans})
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class TestSlowQueries(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = Path(directory.name) / 'slow.jsonl'
+        user = User.objects.create_user(username='writer')
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=user, text='Пост #медленно')
+        # Страница тега синхронная в обоих режимах: посты из ленивого
+        # queryset читаются уже при рендеринге шаблона.
+        self.url = reverse('posts:tag_posts', args=['медленно'])
+
+    def test_normalize(self):
+        """Отпечаток не зависит от значений и длины списков."""
+        self.assertEqual(
+            normalize('SELECT * FROM t WHERE id IN (%s, %s, %s) '
+                      "AND name = 'x'  LIMIT 21"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?')
+        self.assertEqual(
+            normalize('INSERT INTO t VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            'INSERT INTO t VALUES (?, ?), ...')
+
+    def test_queries_attributed_to_view_and_template(self):
+        """Запрос в логе несёт view, шаблон и строку кода."""
+        with self.settings(SLOW_QUERY_MS=0, SLOW_QUERY_LOG=str(self.log)):
+            with self.assertLogs('core.slow_queries', 'WARNING'):
+                self.client.get(self.url)
+        entries = list(read_log(self.log))
+        self.assertTrue(entries)
+        self.assertEqual({entry['view'] for entry in entries},
+                         {'posts:tag_posts'})
+        self.assertTrue(any(entry['template'] for entry in entries))
+        self.assertTrue(any(entry['caller'] for entry in entries))
+
+    def test_fast_queries_not_logged(self):
+        with self.settings(SLOW_QUERY_LOG=str(self.log)):
+            self.client.get(self.url)
+        self.assertFalse(self.log.exists())
+
+    def test_top_offenders_command(self):
+        """Команда выводит отпечатки с числом запросов и p95."""
+        with self.settings(SLOW_QUERY_MS=0, SLOW_QUERY_LOG=str(self.log)):
+            with self.assertLogs('core.slow_queries', 'WARNING'):
+                self.client.get(self.url)
+                self.client.get(self.url)
+        out = StringIO()
+        call_command('slow_queries', file=str(self.log), sort='count',
+                     stdout=out)
+        self.assertIn('2 раз', out.getvalue())
+        self.assertIn('p95', out.getvalue())
+        self.assertIn('view: posts:tag_posts', out.getvalue())
+
+
+class TestTemplateProfiler(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        registry.reset()
+
+    @override_settings(TEMPLATE_PROFILE_RATE=1)
+    def test_profile_reported(self):
+        """Шаблоны, теги и фильтры попадают в Server-Timing, лог и метрики."""
+        self.client.force_login(self.user)
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        with self.assertLogs('core.template_profiler', 'INFO') as logs:
+            response = self.client.get(url)
+        timing = response['Server-Timing']
+        self.assertIn('desc="template:posts/post_detail.html x1"', timing)
+        self.assertIn('dur=', timing)
+        self.assertIn('posts:post_detail', logs.output[0])
+        metrics = self.client.get(reverse('metrics')).content.decode()
+        for node in ('template:includes/header.html', 'tag:include',
+                     'filter:addclass'):
+            with self.subTest(node=node):
+                self.assertIn(
+                    f'yatube_template_node_seconds_total{{node="{node}",'
+                    f'view="posts:post_detail"}}', metrics)
+
+    @override_settings(TEMPLATE_PROFILE_RATE=1)
+    def test_concurrent_install(self):
+        """
+        Одновременная установка из нескольких потоков подменяет
+        рендеринг один раз, и профилируемый запрос отдаётся.
+        """
+        threads = [threading.Thread(target=install) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIs(Template._render, template_render)
+        with self.assertLogs('core.template_profiler', 'INFO'):
+            response = self.client.get(reverse('posts:index'))
+        self.assertIn('template:posts/index.html', response['Server-Timing'])
+
+    @override_settings(TEMPLATE_PROFILE_RATE=0)
+    def test_disabled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_top_sorted_by_total_time(self):
+        profile = TemplateProfile()
+        profile.add('tag:for', 0.01)
+        profile.add('tag:if', 0.002)
+        profile.add('tag:if', 0.003)
+        self.assertEqual(profile.top(2), [('tag:for', 1, 0.01, 0.01),
+                                          ('tag:if', 2, 0.005, 0.003)])
+
+
+def busy_view():
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        sum(range(1000))
+
+
+class FakeRequest:
+    path = '/busy/'
+    resolver_match = None
+
+
+class TestSamplingProfiler(TestCase):
+    def start_busy_request(self):
+        """Поток, который полсекунды «обрабатывает запрос»."""
+        started = threading.Event()
+
+        def run():
+            register_request(FakeRequest())
+            started.set()
+            try:
+                busy_view()
+            finally:
+                unregister_request()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join)
+        started.wait()
+
+    def test_sampler_collapses_stacks_by_view(self):
+        """Стеки начинаются с view и содержат функции запроса."""
+        self.start_busy_request()
+        sampler = Sampler(0.001)
+        sampler.start('wall')
+        time.sleep(0.1)
+        sampler.stop()
+        self.assertEqual(sampler.mode, 'wall')
+        self.assertGreater(sampler.samples, 0)
+        stack, count = sampler.collapsed().splitlines()[0].rsplit(' ', 1)
+        self.assertTrue(stack.startswith('/busy/;'))
+        self.assertIn('core.tests:busy_view', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_endpoint_for_staff_only(self):
+        url = reverse('sampling_profile') + '?seconds=0.1&interval_ms=1'
+        user = User.objects.create_user(username='user')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        user.is_staff = True
+        user.save()
+        self.start_busy_request()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Profile-Mode'], 'wall')
+        self.assertIn('core.tests:busy_view', response.content.decode())
+        response = self.client.get(reverse('sampling_profile')
+                                   + '?interval_ms=x')
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_profiles_workers_by_signal(self):
+        """Команда шлёт SIGUSR2 и собирает профиль процесса по SIGPROF."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        previous = signal.signal(signal.SIGUSR2, handle_profile_signal)
+        self.addCleanup(signal.signal, signal.SIGUSR2, previous)
+        self.start_busy_request()
+        out = StringIO()
+        with self.settings(PROFILER_DIR=directory.name):
+            call_command('profile_workers', os.getpid(), seconds=0.3,
+                         interval_ms=1, stdout=out)
+        self.assertIn('/busy/;', out.getvalue())
+        self.assertIn('core.tests:busy_view', out.getvalue())
+
+
+class TestBenchmark(TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(username='writer')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.scenario = Scenario(
+            'post_detail',
+            lambda rng: (reverse('posts:post_detail', args=[self.post.pk]),
+                         None))
+
+    def check_result(self, result):
+        self.assertEqual(result['requests'], 6)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['queries'], 0)
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_in_process(self):
+        with InProcessRunner() as runner:
+            self.check_result(run_scenario(runner, self.scenario, 6, 2))
+
+    def test_wsgi_server(self):
+        """Запросы идут по HTTP, число запросов к БД - из заголовка."""
+        with HttpRunner('wsgi') as runner:
+            self.check_result(run_scenario(runner, self.scenario, 6, 2))
+
+    def test_asgi_server_serves_async_views(self):
+        """
+        uvicorn запускается отдельным процессом с ASGI и ASYNC_VIEWS:
+        лента отдаётся асинхронной view с потоком SSE.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        env = {'SQLITE_PATH': str(Path(directory.name) / 'db.sqlite3')}
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v0'],
+                       cwd=settings.BASE_DIR, env={**os.environ, **env},
+                       check=True)
+        with HttpRunner('asgi', env=env) as runner:
+            response = runner.session(None).get(
+                runner.url + reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('data-events-url="/events/"', response.text)
+        self.assertNotIn('djDebug', response.text)
+
+    def test_compare(self):
+        base = {'p95_ms': 10, 'queries': 4}
+        baseline = {'index': base, 'profile': base}
+        results = {'index': {'p95_ms': 11, 'queries': 4},
+                   'profile': {'p95_ms': 13, 'queries': 6},
+                   'new': {'p95_ms': 100, 'queries': 100}}
+        regressions = compare(results, baseline, 0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(line.startswith('profile:')
+                            for line in regressions))
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False, TRACE_RATE=1)
+class TestTracing(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.file = str(Path(directory.name) / 'trace.jsonl')
+        settings_override = self.settings(TRACE_FILE=self.file)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='writer')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+
+    def test_request_spans(self):
+        """Запрос, БД, кэш и шаблоны попадают в одну трассу деревом."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        spans = read_trace(self.file, response['X-Trace-Id'])
+        tree = span_tree(spans)
+        self.assertEqual(len(tree), len(spans))
+        depth, root = tree[0]
+        self.assertEqual((depth, root['name']), (0, 'posts:post_detail'))
+        self.assertEqual(root['attributes']['status'], 200)
+        self.assertEqual({span['kind'] for span in spans},
+                         {'request', 'db', 'template'})
+        self.assertTrue(all(depth > 0 for depth, _ in tree[1:]))
+
+    def test_cache_spans(self):
+        with trace('request', 'request') as root:
+            cache.set('key', 1)
+            cache.get('key')
+            cache.get('missing')
+        spans = read_trace(self.file, root.trace_id)
+        self.assertEqual(
+            [(span['name'], span['attributes'].get('hit')) for span in spans
+             if span['kind'] == 'cache'],
+            [('cache.set', None), ('cache.get', True),
+             ('cache.get', False)])
+
+    @override_settings(TRACE_TRUST_TRACEPARENT=True)
+    def test_traceparent_continued(self):
+        trace_id = 'a' * 32
+        response = self.client.get(
+            reverse('posts:index'),
+            HTTP_TRACEPARENT=f'00-{trace_id}-{"b" * 16}-01')
+        self.assertEqual(response['X-Trace-Id'], trace_id)
+        root = read_trace(self.file, trace_id)[0]
+        self.assertEqual(root['parent_id'], 'b' * 16)
+
+    @override_settings(TRACE_RATE=0)
+    def test_untrusted_traceparent_ignored(self):
+        """Без TRACE_TRUST_TRACEPARENT клиент не обходит TRACE_RATE."""
+        response = self.client.get(
+            reverse('posts:index'),
+            HTTP_TRACEPARENT=f'00-{"a" * 32}-{"b" * 16}-01')
+        self.assertNotIn('X-Trace-Id', response)
+
+    @override_settings(TRACE_TRUST_TRACEPARENT=True)
+    def test_traceparent_flags_and_zero_ids(self):
+        """
+        Трасса со снятым флагом sampled не записывается, а заголовок
+        с нулевыми id считается отсутствующим.
+        """
+        url = reverse('posts:index')
+        response = self.client.get(
+            url, HTTP_TRACEPARENT=f'00-{"a" * 32}-{"b" * 16}-00')
+        self.assertNotIn('X-Trace-Id', response)
+        for traceparent in (f'00-{"0" * 32}-{"b" * 16}-01',
+                            f'00-{"a" * 32}-{"0" * 16}-01'):
+            with self.subTest(traceparent=traceparent):
+                response = self.client.get(url, HTTP_TRACEPARENT=traceparent)
+                self.assertNotIn(response['X-Trace-Id'], ('0' * 32, 'a' * 32))
+
+    def test_task_continues_request_trace(self):
+        """Задача из очереди выполняется внутри трассы запроса."""
+        with trace('request', 'request') as root:
+            queued = record.delay(1)
+        self.assertEqual(queued.traceparent, root.traceparent())
+        execute(queued)
+        spans = read_trace(self.file, root.trace_id)
+        task_span = next(span for span in spans if span['kind'] == 'task')
+        self.assertEqual(task_span['parent_id'], root.span_id)
+        self.assertEqual(task_span['name'], 'core.tests.record')
+        self.assertEqual(task_span['attributes']['task_id'], queued.pk)
+
+    def test_show_trace(self):
+        response = self.client.get(reverse('posts:index'))
+        out = StringIO()
+        call_command('show_trace', response['X-Trace-Id'], file=[self.file],
+                     stdout=out)
+        self.assertIn('request: posts:index', out.getvalue())
+        self.assertIn('template  posts/index.html', out.getvalue())
+        self.assertIn('db: ', out.getvalue())
+
+    def test_disabled(self):
+        with self.settings(TRACE_FILE=''):
+            response = self.client.get(reverse('posts:index'))
+            with trace('request', 'request') as root:
+                queued = record.delay(1)
+        self.assertNotIn('X-Trace-Id', response)
+        self.assertIsNone(root)
+        self.assertEqual(queued.traceparent, '')
@@ -0,0 +1,206 @@
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+# Длина SQL в атрибутах спана.
+SQL_LIMIT = 1000
+
+_TRACEPARENT = re.compile(
+    r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+# Флаг trace-flags: вызывающая сторона записывает эту трассу.
+_SAMPLED = 0x01
+
+_span = ContextVar('trace_span', default=None)
+_write_lock = threading.Lock()
+
+
+class Span:
+    """
+    Отрезок работы внутри трассы: запрос, запрос к БД, чтение кэша,
+    рендеринг шаблона, задача. Законченные спаны копятся в корневом
+    спане трассы и пишутся в файл одним куском, когда он закончится.
+    """
+    def __init__(self, name, kind, trace_id, parent_id=None, root=None,
+                 attributes=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.root = root or self
+        self.attributes = attributes or {}
+        self.finished = []
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def child(self, name, kind, attributes=None):
+        return Span(name, kind, self.trace_id, self.span_id, self.root,
+                    attributes)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        self.root.finished.append(self)
+        if self.root is self:
+            export(self.finished)
+
+    def traceparent(self):
+        """Контекст в формате заголовка traceparent (W3C Trace Context)."""
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def as_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start': self.start,
+            'duration_ms': round(self.duration * 1000, 3),
+            'pid': os.getpid(),
+            'attributes': self.attributes,
+        }
+
+
+def current_span():
+    return _span.get()
+
+
+def current_traceparent():
+    """traceparent текущего спана или пустая строка вне трассы."""
+    span = current_span()
+
+    return span.traceparent() if span is not None else ''
+
+
+def parse_traceparent(value):
+    """
+    Возвращает (trace_id, parent_id, sampled) из traceparent или None,
+    если заголовок некорректен. Нулевые id по W3C Trace Context
+    недопустимы.
+    """
+    match = _TRACEPARENT.match(value or '')
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if not int(trace_id, 16) or not int(parent_id, 16):
+        return None
+
+    return trace_id, parent_id, bool(int(flags, 16) & _SAMPLED)
+
+
+@contextmanager
+def activate(span):
+    token = _span.set(span)
+    try:
+        yield span
+    except Exception as exc:
+        span.attributes['error'] = repr(exc)
+        raise
+    finally:
+        _span.reset(token)
+        span.finish()
+
+
+@contextmanager
+def trace(name, kind, traceparent='', **attributes):
+    """
+    Корневой спан: продолжает трассу из traceparent или начинает новую
+    у доли TRACE_RATE запросов. Трасса, которую вызывающая сторона
+    не записывает (флаг sampled снят), не записывается и здесь.
+    Без TRACE_FILE ничего не делает.
+    """
+    parent = parse_traceparent(traceparent)
+    if parent is None:
+        trace_id, parent_id = secrets.token_hex(16), None
+        sampled = random.random() < settings.TRACE_RATE
+    else:
+        trace_id, parent_id, sampled = parent
+    if not settings.TRACE_FILE or not sampled:
+        yield None
+        return
+    with activate(Span(name, kind, trace_id, parent_id,
+                       attributes=attributes)) as span:
+        yield span
+
+
+@contextmanager
+def span(name, kind='internal', **attributes):
+    """Дочерний спан текущего; вне трассы ничего не делает."""
+    parent = current_span()
+    if parent is None:
+        yield None
+        return
+    with activate(parent.child(name, kind, attributes)) as child:
+        yield child
+
+
+def trace_query(execute, sql, params, many, context):
+    """execute_wrapper: спан на каждый запрос к БД."""
+    if current_span() is None:
+        return execute(sql, params, many, context)
+    with span('db', 'db', sql=sql[:SQL_LIMIT],
+              alias=context['connection'].alias, many=many):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def traced_queries():
+    """Включает trace_query на всех подключениях к БД."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(trace_query))
+        yield
+
+
+def export(spans):
+    """Дописывает спаны трассы в TRACE_FILE JSON-строками."""
+    lines = ''.join(json.dumps(span.as_dict(), ensure_ascii=False,
+                               default=str) + '\n'
+                    for span in spans)
+    with _write_lock:
+        with open(settings.TRACE_FILE, 'a', encoding='utf-8') as file:
+            file.write(lines)
+
+
+def read_trace(path, trace_id):
+    """Спаны трассы trace_id из файла, по времени начала."""
+    spans = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry['trace_id'] == trace_id:
+                spans.append(entry)
+
+    return sorted(spans, key=lambda entry: entry['start'])
+
+
+def span_tree(spans):
+    """
+    Обходит спаны деревом: пары (глубина, спан). Спаны, чей родитель
+    не записан (например, HTTP-клиент снаружи), считаются корнями.
+    """
+    ids = {entry['span_id'] for entry in spans}
+    children = {}
+    for entry in spans:
+        parent = entry['parent_id'] if entry['parent_id'] in ids else None
+        children.setdefault(parent, []).append(entry)
+
+    def walk(parent, depth):
+        for entry in children.get(parent, []):
+            yield depth, entry
+            yield from walk(entry['span_id'], depth + 1)
+
+    return list(walk(None, 0))
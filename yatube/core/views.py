@@ -1,5 +1,13 @@
+import threading
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render
 
+from .metrics import collect, registry, render as render_metrics
+from .sampling_profiler import ProfilerBusy, clamp_seconds, profile_for
+
 
 def page_not_found(request, exception):
 
@@ -19,3 +27,41 @@ def server_error(request):
 def permission_denied(request, exception):
 
     return render(request, 'core/403.html', status=403)
+
+
+def metrics(request):
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return permission_denied(request, None)
+    registry.flush(force=True)
+
+    return HttpResponse(render_metrics(*collect()),
+                        content_type='text/plain; version=0.0.4')
+
+
+@staff_member_required
+def sampling_profile(request):
+    """
+    Профилирует процесс, обработавший запрос, seconds секунд и отдаёт
+    свёрнутые стеки по view (для flamegraph.pl или speedscope).
+    """
+    try:
+        seconds = clamp_seconds(request.GET.get('seconds', 10))
+        interval = float(request.GET.get(
+            'interval_ms', settings.PROFILER_INTERVAL_MS)) / 1000
+    except ValueError:
+        return HttpResponseBadRequest('Неверные seconds или interval_ms.')
+    if interval <= 0:
+        return HttpResponseBadRequest('interval_ms должен быть больше 0.')
+    try:
+        sampler = profile_for(seconds, interval,
+                              request.GET.get('mode', 'wall'),
+                              exclude=[threading.get_ident()])
+    except ProfilerBusy as exc:
+        return HttpResponse(str(exc), status=409)
+    response = HttpResponse(sampler.collapsed(),
+                            content_type='text/plain; charset=utf-8')
+    response['X-Profile-Samples'] = sampler.samples
+    response['X-Profile-Mode'] = sampler.mode
+
+    return response
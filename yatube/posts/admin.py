@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
 
-from .models import Comment, Follow, Group, Post
+from .deletion import schedule_group_deletion, schedule_user_deletion
+from .models import (ArchivedPost, Comment, Follow, Group, PendingDeletion,
+                     Post, Tag, User)
 
 
 @admin.register(Post)
@@ -29,5 +32,59 @@ class CommentAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+@admin.register(ArchivedPost)
+class ArchivedPostAdmin(admin.ModelAdmin):
+    """
+    Отображает в админке архивные посты,
+    позволяет искать по тексту, фильтровать по дате публикации.
+    """
+    list_display = ('pk', 'text', 'created', 'author', 'group', 'archived')
+    search_fields = ('text',)
+    list_filter = ('created',)
+    empty_value_display = '-пусто-'
+
+
+class SoftDeleteAdminMixin:
+    """
+    Вместо каскадного удаления в запросе админки помечает объекты
+    на удаление (schedule_deletion). Сами записи удаляет
+    фоновая задача purge_deletion пачками.
+    """
+    schedule_deletion = None
+
+    def delete_model(self, request, obj):
+        self.schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.schedule_deletion(obj)
+
+    def get_deleted_objects(self, objs, request):
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+
+        return [str(obj) for obj in objs], {}, perms_needed, []
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class SoftDeleteUserAdmin(SoftDeleteAdminMixin, UserAdmin):
+    schedule_deletion = staticmethod(schedule_user_deletion)
+
+
+@admin.register(Group)
+class GroupAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    schedule_deletion = staticmethod(schedule_group_deletion)
+
+
+@admin.register(PendingDeletion)
+class PendingDeletionAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'group', 'created')
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Follow)
-admin.site.register(Group)
+admin.site.register(Tag)
@@ -0,0 +1,266 @@
+import base64
+import binascii
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, JsonResponse, QueryDict
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+
+from core.routers import replica_reads
+from .constants import API_BATCH_LIMIT, API_MAX_LIMIT, POSTS_LIMIT
+from .models import ArchivedComment, Comment, Group, Post, User
+from .post_cache import CACHED_FIELDS, get_posts
+
+# Поле ответа: путь поля для values_list.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+# Поля поста из кэша постов: те же и миниатюра.
+DETAIL_FIELDS = CACHED_FIELDS | {'thumbnail': None}
+# Порядок совпадает с индексами (author|group, -created) и (-created, id).
+ORDERING = ('-created', 'id')
+
+
+class ApiError(Exception):
+    pass
+
+
+def api_response(data, status=200):
+    """JSON без пробелов и \\u-экранирования кириллицы."""
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False},
+    )
+
+
+def api_view(view):
+    """Отвечает на ApiError кодом 400, на Http404 - кодом 404."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return api_response({'error': str(error)}, status=400)
+        except Http404 as error:
+            return api_response({'error': str(error)}, status=404)
+
+    return replica_reads(wrapper)
+
+
+def encode_cursor(row):
+    raw = f'{row["created"].isoformat()}|{row["id"]}'
+
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Курсор - позиция (created, id) последней записи страницы."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created, pk = raw.decode().split('|')
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        created = None
+    if created is None:
+        raise ApiError('Неверный курсор.')
+
+    return created, pk
+
+
+def get_fields(request, fields):
+    """
+    Разбирает параметр fields= и возвращает словарь
+    {поле ответа: путь поля}; по умолчанию отдаются все поля.
+    """
+    requested = [name for name in request.GET.get('fields', '').split(',')
+                 if name]
+    unknown = set(requested) - set(fields)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}.')
+
+    return {name: fields[name] for name in requested or fields}
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', POSTS_LIMIT))
+    except ValueError:
+        raise ApiError('Неверный limit.')
+
+    return max(1, min(limit, API_MAX_LIMIT))
+
+
+def fetch_rows(queryset, fields, limit, cursor=None):
+    """
+    Читает до limit строк через values_list, без создания моделей.
+    id и created читаются всегда - по ним строится курсор.
+    Условие created <= курсора вынесено отдельно, чтобы БД начала
+    чтение индекса с позиции курсора, а не с начала ленты.
+    """
+    if cursor is not None:
+        created, pk = cursor
+        queryset = queryset.filter(Q(created__lt=created) | Q(id__gt=pk),
+                                   created__lte=created)
+    lookups = {'id': 'id', 'created': 'created', **fields}
+    rows = (queryset.order_by(*ORDERING)
+            .values_list(*lookups.values())[:limit])
+
+    return [dict(zip(lookups, row)) for row in rows]
+
+
+def serialize(row, fields):
+    if row.get('image') is not None:
+        row['image'] = (settings.MEDIA_URL + row['image']
+                        if row['image'] else None)
+
+    return {name: row[name] for name in fields}
+
+
+def cursor_page(request, querysets, fields, path=None):
+    """
+    Страница ленты по курсору. querysets читаются по очереди,
+    пока не наберётся страница: так профиль продолжается архивом,
+    все архивные посты старше живых. Если задан path, это первая
+    страница вложенного списка, а ссылка next ведёт на path.
+    """
+    limit = get_limit(request)
+    cursor = request.GET.get('cursor') if path is None else None
+    cursor = decode_cursor(cursor) if cursor else None
+    rows = []
+    for queryset in querysets:
+        if len(rows) > limit:
+            break
+        rows += fetch_rows(queryset, fields, limit + 1 - len(rows), cursor)
+    page = rows[:limit]
+    next_url = None
+    if len(rows) > limit:
+        params = (request.GET.copy() if path is None
+                  else QueryDict(mutable=True))
+        params['cursor'] = encode_cursor(page[-1])
+        next_url = f'{path or request.path}?{params.urlencode()}'
+
+    return {
+        'results': [serialize(row, fields) for row in page],
+        'next': next_url,
+    }
+
+
+@api_view
+def index(request):
+    """Лента всех постов."""
+    fields = get_fields(request, POST_FIELDS)
+
+    return api_response(
+        cursor_page(request, [Post.objects.visible()], fields))
+
+
+@api_view
+def group_posts(request, slug):
+    """Лента постов группы."""
+    group = get_object_or_404(
+        Group.objects.filter(pending_deletion__isnull=True), slug=slug)
+    fields = get_fields(request, POST_FIELDS)
+
+    return api_response(
+        cursor_page(request, [group.posts.visible()], fields))
+
+
+@api_view
+def profile(request, username):
+    """Посты автора, включая архив."""
+    author = get_object_or_404(
+        User.objects.filter(pending_deletion__isnull=True),
+        username=username)
+    fields = get_fields(request, POST_FIELDS)
+    querysets = [author.posts.all(), author.archived_posts.all()]
+
+    return api_response(cursor_page(request, querysets, fields))
+
+
+@api_view
+def follow_index(request):
+    """Лента подписок. Без авторизации - 401."""
+    if not request.user.is_authenticated:
+        return api_response({'error': 'Нужна авторизация.'}, status=401)
+    fields = get_fields(request, POST_FIELDS)
+    posts = Post.objects.visible().filter(
+        author__following__user=request.user)
+
+    return api_response(cursor_page(request, [posts], fields))
+
+
+@api_view
+def post_detail(request, post_id):
+    """
+    Пост из кэша постов и первая страница комментариев
+    (fields= - поля поста). Дальше комментарии листаются
+    через post_comments.
+    """
+    fields = get_fields(request, DETAIL_FIELDS)
+    post = get_posts([post_id]).get(post_id)
+    if post is None:
+        raise Http404('Пост не найден.')
+    post = {name: post[name] for name in fields}
+    post['comments'] = cursor_page(
+        request, comments_querysets(post_id), COMMENT_FIELDS,
+        path=reverse('posts:api_post_comments', args=[post_id]))
+
+    return api_response(post)
+
+
+def comments_querysets(post_id):
+    return [Comment.objects.visible().filter(post_id=post_id),
+            ArchivedComment.objects.visible().filter(post_id=post_id)]
+
+
+@api_view
+def post_comments(request, post_id):
+    """Комментарии поста по курсору."""
+    fields = get_fields(request, COMMENT_FIELDS)
+
+    return api_response(
+        cursor_page(request, comments_querysets(post_id), fields))
+
+
+@api_view
+def posts_batch(request):
+    """
+    Несколько постов по id (ids=1,2,3, не больше API_BATCH_LIMIT)
+    в порядке запроса. Посты берутся из кэша постов, промахи
+    дочитываются из БД фиксированным числом запросов.
+    Ненайденные id перечисляются в missing.
+    """
+    try:
+        post_ids = [int(post_id) for post_id in
+                    request.GET.get('ids', '').split(',') if post_id]
+    except ValueError:
+        raise ApiError('Неверный список ids.')
+    post_ids = list(dict.fromkeys(post_ids))
+    if not post_ids or len(post_ids) > API_BATCH_LIMIT:
+        raise ApiError(f'Нужно от 1 до {API_BATCH_LIMIT} ids.')
+    fields = get_fields(request, DETAIL_FIELDS)
+    posts = get_posts(post_ids)
+
+    return api_response({
+        'results': [{name: posts[post_id][name] for name in fields}
+                    for post_id in post_ids if post_id in posts],
+        'missing': [post_id for post_id in post_ids if post_id not in posts],
+    })
@@ -0,0 +1,137 @@
+import asyncio
+
+from django.db import transaction
+from django.db.models import Subquery
+from django.http import Http404
+
+from .constants import ARCHIVE_BATCH_SIZE
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+POST_FIELDS = ('id', 'text', 'author_id', 'group_id', 'image', 'thumbnail',
+               'created')
+COMMENT_FIELDS = ('id', 'text', 'post_id', 'author_id', 'created')
+
+
+def archive_posts(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Переносит посты старше cutoff вместе с комментариями
+    в ArchivedPost и ArchivedComment пачками по batch_size постов.
+    Каждая пачка переносится в своей транзакции.
+    Пост с наибольшим id в архив не переносится: ArchivedPost хранит
+    исходный id, и освободившийся максимальный id не должен достаться
+    новому посту, иначе старый адрес откроет чужой пост. Django создаёт
+    таблицу Post в SQLite с AUTOINCREMENT, а в PostgreSQL id выдаёт
+    последовательность, так что это страховка от сброшенного счётчика.
+    Возвращает генератор пар (число постов, число комментариев).
+    """
+    newest = Subquery(Post.objects.order_by('-pk').values('pk')[:1])
+    while True:
+        with transaction.atomic():
+            posts = list(Post.objects.filter(created__lt=cutoff)
+                         .exclude(pk=newest)
+                         .order_by('created')
+                         .values(*POST_FIELDS)[:batch_size])
+            if not posts:
+                return
+            ids = [post['id'] for post in posts]
+            comments = list(Comment.objects.filter(post_id__in=ids)
+                            .values(*COMMENT_FIELDS))
+            ArchivedPost.objects.bulk_create(
+                [ArchivedPost(**post) for post in posts])
+            ArchivedComment.objects.bulk_create(
+                [ArchivedComment(**comment) for comment in comments])
+            Comment.objects.filter(post_id__in=ids).delete()
+            Post.objects.filter(id__in=ids).delete()
+
+        yield len(posts), len(comments)
+
+
+def get_post_or_archived(post_id, queryset=None):
+    """
+    Возвращает пару (пост, is_archived): пост ищется сначала в Post,
+    затем в архиве. Посты авторов, ожидающих удаления, не возвращаются.
+    Если поста нет нигде - Http404.
+    """
+    if queryset is None:
+        queryset = Post.objects.visible().select_related('author', 'group')
+    post = queryset.filter(pk=post_id).first()
+    if post is not None:
+        return post, False
+    post = (ArchivedPost.objects.visible().select_related('author', 'group')
+            .filter(pk=post_id).first())
+    if post is None:
+        raise Http404('Пост не найден.')
+
+    return post, True
+
+
+async def aget_post_or_archived(post_id):
+    """Асинхронный аналог get_post_or_archived."""
+    post = await (Post.objects.visible().select_related('author', 'group')
+                  .filter(pk=post_id).afirst())
+    if post is not None:
+        return post, False
+    post = await (ArchivedPost.objects.visible()
+                  .select_related('author', 'group')
+                  .filter(pk=post_id).afirst())
+    if post is None:
+        raise Http404('Пост не найден.')
+
+    return post, True
+
+
+class ChainedPosts:
+    """
+    Последовательность для Paginator из нескольких queryset:
+    сначала посты из Post, затем из архива. Архивные посты всегда старше,
+    поэтому общий порядок по дате сохраняется.
+    """
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = None
+
+    @property
+    def counts(self):
+        if self._counts is None:
+            self._counts = [queryset.count() for queryset in self.querysets]
+
+        return self._counts
+
+    def count(self):
+        return sum(self.counts)
+
+    def __len__(self):
+        return self.count()
+
+    def _parts(self, start, stop):
+        for queryset, count in zip(self.querysets, self.counts):
+            if start < count and stop > 0:
+                yield queryset[max(start, 0):min(stop, count)]
+            start -= count
+            stop -= count
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        result = []
+        for part in self._parts(start, stop):
+            result.extend(part)
+
+        return result
+
+    async def acount(self):
+        """Считает записи всех queryset одновременно."""
+        if self._counts is None:
+            self._counts = list(await asyncio.gather(
+                *(queryset.acount() for queryset in self.querysets)))
+
+        return sum(self._counts)
+
+    async def aslice(self, start, stop):
+        """Асинхронный аналог self[start:stop]."""
+        await self.acount()
+
+        return [post for part in self._parts(start, stop)
+                async for post in part]
@@ -0,0 +1,214 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import render
+from django.urls import reverse
+
+from core.routers import replica_reads
+from .archive import ChainedPosts, aget_post_or_archived
+from .events import POSTS_TOPIC, comments_topic, event_stream
+from .forms import CommentForm
+from .models import Follow, Group, Post, User
+from .utils import acreate_page_obj
+
+arender = sync_to_async(render)
+
+
+async def aget_user(request):
+    """
+    Загружает request.user из сессии вне event loop
+    (в Django 4.2 ещё нет request.auser()).
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+
+    return request.user
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'{queryset.model._meta.verbose_name} не найден.')
+
+
+def alogin_required(view):
+    """Асинхронный аналог login_required."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def events_url(name, *args):
+    """Адрес потока SSE или None: под WSGI маршрутов SSE нет."""
+    return reverse(name, args=args) if settings.ASGI else None
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def acount_and_page(request, posts):
+    return await acreate_page_obj(request, posts, await posts.acount())
+
+
+@replica_reads
+async def index(request):
+    """Асинхронная версия posts.views.index."""
+    template = 'posts/index.html'
+    posts = Post.objects.visible().select_related('author', 'group')
+    page_obj, _ = await asyncio.gather(acount_and_page(request, posts),
+                                       aget_user(request))
+    context = {
+        'page_obj': page_obj,
+        'events_url': events_url('posts:events'),
+    }
+
+    return await arender(request, template, context)
+
+
+@replica_reads
+async def group_posts(request, slug):
+    """Асинхронная версия posts.views.group_posts."""
+    template = 'posts/group_list.html'
+    group = await aget_object_or_404(
+        Group.objects.filter(pending_deletion__isnull=True), slug=slug)
+    posts = group.posts.visible().select_related('author', 'group')
+    page_obj, _ = await asyncio.gather(acount_and_page(request, posts),
+                                       aget_user(request))
+    context = {
+        'group': group,
+        'page_obj': page_obj,
+    }
+
+    return await arender(request, template, context)
+
+
+async def afollowing(user, profile):
+    if not user.is_authenticated:
+        return False
+
+    return await Follow.objects.filter(user=user, author=profile).aexists()
+
+
+@replica_reads
+async def profile(request, username):
+    """
+    Асинхронная версия posts.views.profile.
+    Счётчики, флаг подписки и страница постов загружаются одновременно.
+    """
+    template = 'posts/profile.html'
+    profile, user = await asyncio.gather(
+        aget_object_or_404(User.objects.filter(pending_deletion__isnull=True),
+                           username=username),
+        aget_user(request),
+    )
+    posts = ChainedPosts(profile.posts.select_related('group'),
+                         profile.archived_posts.select_related('group'))
+    count, following, follows_count, followers_count = await asyncio.gather(
+        posts.acount(),
+        afollowing(user, profile),
+        profile.follower.acount(),
+        profile.following.acount(),
+    )
+    page_obj = await acreate_page_obj(request, posts, count)
+    context = {
+        'following': following,
+        'follows_count': follows_count,
+        'followers_count': followers_count,
+        'profile': profile,
+        'page_obj': page_obj,
+    }
+
+    return await arender(request, template, context)
+
+
+@replica_reads
+async def post_detail(request, post_id):
+    """
+    Асинхронная версия posts.views.post_detail.
+    Комментарии и счётчики постов автора загружаются одновременно.
+    """
+    template = 'posts/post_detail.html'
+    post, is_archived = await aget_post_or_archived(post_id)
+    comments = post.comments.visible().select_related('author')
+    comments, posts_count, archived_count, _ = await asyncio.gather(
+        alist(comments),
+        post.author.posts.acount(),
+        post.author.archived_posts.acount(),
+        aget_user(request),
+    )
+    context = {
+        'post': post,
+        'comments': comments,
+        'form': CommentForm(),
+        'is_archived': is_archived,
+        'posts_count': posts_count + archived_count,
+    }
+    if not is_archived:
+        context['events_url'] = events_url('posts:post_events', post.pk)
+
+    return await arender(request, template, context)
+
+
+@alogin_required
+@replica_reads
+async def follow_index(request):
+    """Асинхронная версия posts.views.follow_index."""
+    template = 'posts/follow.html'
+    posts = (Post.objects.visible()
+             .filter(author__following__user=request.user)
+             .select_related('author', 'group'))
+    page_obj = await acount_and_page(request, posts)
+    context = {
+        'page_obj': page_obj,
+        'events_url': events_url('posts:follow_events'),
+    }
+
+    return await arender(request, template, context)
+
+
+def event_stream_response(stream):
+    response = StreamingHttpResponse(stream,
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+
+    return response
+
+
+async def feed_events(request):
+    """SSE-поток новых постов для главной страницы."""
+    return event_stream_response(event_stream([POSTS_TOPIC]))
+
+
+@alogin_required
+async def follow_events(request):
+    """
+    SSE-поток новых постов авторов, на которых подписан юзер.
+    Подписки читаются один раз при подключении.
+    """
+    authors = {
+        author_id async for author_id in
+        Follow.objects.filter(user=request.user)
+        .values_list('author_id', flat=True)
+    }
+
+    return event_stream_response(event_stream(
+        [POSTS_TOPIC], accept=lambda data: data['author'] in authors))
+
+
+async def post_events(request, post_id):
+    """SSE-поток новых комментариев к посту."""
+    await aget_object_or_404(Post.objects.visible(), pk=post_id)
+
+    return event_stream_response(event_stream([comments_topic(post_id)]))
@@ -0,0 +1,162 @@
+from bisect import bisect_left, insort
+from itertools import chain
+from threading import RLock
+
+from .constants import (AUTOCOMPLETE_KEY_LENGTH, AUTOCOMPLETE_LIMIT,
+                        AUTOCOMPLETE_MAX_ENTRIES)
+from .models import Group, User
+
+USER = 'user'
+GROUP = 'group'
+
+
+def normalize(value):
+    """Приводит строку к виду, в котором она хранится в индексе."""
+    return ' '.join(value.lower().split())[:AUTOCOMPLETE_KEY_LENGTH]
+
+
+def normalize_keys(keys):
+    """Возвращает множество нормализованных непустых ключей."""
+    return {normalize(key) for key in keys if key and key.strip()}
+
+
+def user_entry(user):
+    """Аргументы PrefixIndex.put для пользователя."""
+    full_name = user.get_full_name()
+    return (USER, user.pk, user.username, full_name or user.username,
+            [user.username, full_name, user.last_name])
+
+
+def group_entry(group):
+    """Аргументы PrefixIndex.put для группы."""
+    return (GROUP, group.pk, group.slug, group.title,
+            [group.title, group.slug])
+
+
+class PrefixIndex:
+    """
+    Префиксный индекс в памяти процесса.
+    Ключи хранятся в отсортированном списке кортежей (ключ, тип, pk),
+    поиск по префиксу - бинарный (bisect) и не обращается к БД.
+    Объём индекса ограничен max_entries ключами.
+    """
+    def __init__(self, max_entries=AUTOCOMPLETE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = RLock()
+        self._keys = []
+        self._objects = {}
+        self.is_built = False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _remove(self, kind, pk):
+        entry = self._objects.pop((kind, pk), None)
+        if entry is None:
+            return
+        for key in entry['keys']:
+            position = bisect_left(self._keys, (key, kind, pk))
+            if (position < len(self._keys)
+                    and self._keys[position] == (key, kind, pk)):
+                del self._keys[position]
+
+    def _store(self, kind, pk, value, label, keys):
+        """Запоминает объект и возвращает кортежи для его ключей."""
+        self._objects[(kind, pk)] = {
+            'value': value,
+            'label': label,
+            'keys': keys,
+        }
+
+        return [(key, kind, pk) for key in keys]
+
+    def put(self, kind, pk, value, label, keys):
+        """
+        Добавляет объект в индекс или обновляет его ключи.
+        Если с новыми ключами индекс превысит max_entries,
+        возвращает False и оставляет прежнюю запись объекта.
+        """
+        keys = normalize_keys(keys)
+        with self._lock:
+            entry = self._objects.get((kind, pk))
+            freed = len(entry['keys']) if entry else 0
+            if len(self._keys) - freed + len(keys) > self.max_entries:
+                return False
+            self._remove(kind, pk)
+            for item in self._store(kind, pk, value, label, keys):
+                insort(self._keys, item)
+
+            return True
+
+    def discard(self, kind, pk):
+        """Удаляет объект из индекса."""
+        with self._lock:
+            self._remove(kind, pk)
+
+    def put_user(self, user):
+        return self.put(*user_entry(user))
+
+    def put_group(self, group):
+        return self.put(*group_entry(group))
+
+    def build(self):
+        """
+        Заполняет индекс пользователями и группами из БД,
+        кроме помеченных на удаление. Кортежи ключей собираются
+        в список и сортируются один раз, а не вставляются по одному.
+        """
+        users = User.objects.filter(pending_deletion__isnull=True).only(
+            'pk', 'username', 'first_name', 'last_name')
+        groups = Group.objects.filter(pending_deletion__isnull=True).only(
+            'pk', 'slug', 'title')
+        with self._lock:
+            self.clear()
+            items = []
+            entries = chain(map(user_entry, users.iterator()),
+                            map(group_entry, groups.iterator()))
+            for kind, pk, value, label, keys in entries:
+                keys = normalize_keys(keys)
+                if len(items) + len(keys) > self.max_entries:
+                    continue
+                items.extend(self._store(kind, pk, value, label, keys))
+            items.sort()
+            self._keys = items
+            self.is_built = True
+
+    def clear(self):
+        with self._lock:
+            self._keys = []
+            self._objects = {}
+            self.is_built = False
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Возвращает до limit объектов, у которых есть ключ,
+        начинающийся с prefix. Каждый объект возвращается один раз.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        with self._lock:
+            if not self.is_built:
+                self.build()
+            position = bisect_left(self._keys, (prefix,))
+            for key, kind, pk in self._keys[position:]:
+                if not key.startswith(prefix) or len(results) >= limit:
+                    break
+                if (kind, pk) in seen:
+                    continue
+                seen.add((kind, pk))
+                entry = self._objects[(kind, pk)]
+                results.append({
+                    'type': kind,
+                    'value': entry['value'],
+                    'label': entry['label'],
+                })
+
+        return results
+
+
+autocomplete_index = PrefixIndex()
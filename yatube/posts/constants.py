@@ -1,2 +1,25 @@
 POSTS_LIMIT = 10
 CHARS_LIMIT = 15
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_ENTRIES = 100_000
+AUTOCOMPLETE_KEY_LENGTH = 64
+TAG_MAX_LENGTH = 100
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 500
+IMPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BUFFER_SIZE = 64 * 1024
+DELETION_BATCH_SIZE = 500
+DELETION_PAUSE = 0.05
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+API_MAX_LIMIT = 100
+API_BATCH_LIMIT = 100
+POST_CACHE_SECONDS = 300
+FEED_ITEMS = 20
+FEED_TITLE_LENGTH = 50
+FEED_CACHE_SECONDS = 600
+SITEMAP_SEGMENT_SIZE = 5000
+SITEMAP_CACHE_SECONDS = 60 * 60 * 24
+SITEMAP_VERSIONS_SECONDS = 60 * 5
+LOAD_BATCH_SIZE = 5000
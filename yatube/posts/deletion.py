@@ -0,0 +1,142 @@
+import time
+
+from django.db import transaction
+from django.db.models import Q
+
+from core.tasks import task
+from .autocomplete import GROUP, USER, autocomplete_index
+from .constants import DELETION_BATCH_SIZE, DELETION_PAUSE
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Mention,
+                     PendingDeletion, Post)
+from .post_cache import invalidate_posts
+
+
+def enqueue_purge(deletion):
+    """
+    Ставит окончательное удаление в очередь задач. Удаление идёт
+    пачками с паузами, поэтому даже при TASKS_ALWAYS_EAGER оно
+    выполняется воркером, а не в процессе сайта.
+    """
+    purge_deletion.enqueue([deletion.pk], key=f'purge:{deletion.pk}',
+                           eager=False)
+
+
+def schedule_user_deletion(user):
+    """
+    Мягко удаляет пользователя: блокирует вход и сразу скрывает
+    его посты и комментарии. Записи удалит задача purge_deletion.
+    """
+    with transaction.atomic():
+        type(user).objects.filter(pk=user.pk).update(is_active=False)
+        user.is_active = False
+        deletion, _ = PendingDeletion.objects.get_or_create(user=user)
+        enqueue_purge(deletion)
+    autocomplete_index.discard(USER, user.pk)
+
+
+def schedule_group_deletion(group):
+    """Мягко удаляет группу: её страница сразу становится недоступна."""
+    with transaction.atomic():
+        deletion, _ = PendingDeletion.objects.get_or_create(group=group)
+        enqueue_purge(deletion)
+    autocomplete_index.discard(GROUP, group.pk)
+
+
+def delete_in_batches(queryset, batch_size, pause):
+    """
+    Удаляет записи queryset пачками по batch_size,
+    каждая пачка - в своей транзакции, с паузой pause между пачками.
+    Возвращает число удалённых записей.
+    """
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if ids:
+                queryset.model.objects.filter(pk__in=ids).delete()
+        if not ids:
+            return total
+        total += len(ids)
+        time.sleep(pause)
+
+
+def detach_in_batches(queryset, batch_size, pause):
+    """
+    Отвязывает посты queryset от группы пачками по batch_size
+    и сбрасывает их в кэше постов: update не шлёт сигналов.
+    """
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if ids:
+                queryset.model.objects.filter(pk__in=ids).update(group=None)
+        invalidate_posts(ids)
+        if not ids:
+            return total
+        total += len(ids)
+        time.sleep(pause)
+
+
+def delete_user_content(user, batch_size, pause):
+    querysets = [
+        Comment.objects.filter(author=user),
+        Comment.objects.filter(post__author=user),
+        Mention.objects.filter(Q(user=user) | Q(post__author=user)),
+        Post.objects.filter(author=user),
+        ArchivedComment.objects.filter(
+            Q(author=user) | Q(post__author=user)),
+        ArchivedPost.objects.filter(author=user),
+        Follow.objects.filter(Q(user=user) | Q(author=user)),
+    ]
+    total = sum(delete_in_batches(queryset, batch_size, pause)
+                for queryset in querysets)
+    user.delete()
+
+    return total + 1
+
+
+def delete_group_content(group, batch_size, pause):
+    total = sum(
+        detach_in_batches(queryset, batch_size, pause)
+        for queryset in (Post.objects.filter(group=group),
+                         ArchivedPost.objects.filter(group=group))
+    )
+    group.delete()
+
+    return total + 1
+
+
+def purge(deletion, batch_size=DELETION_BATCH_SIZE, pause=DELETION_PAUSE):
+    """
+    Окончательно удаляет помеченного пользователя или группу.
+    Возвращает число удалённых записей.
+    """
+    if deletion.user is not None:
+        return delete_user_content(deletion.user, batch_size, pause)
+
+    return delete_group_content(deletion.group, batch_size, pause)
+
+
+@task()
+def purge_deletion(deletion_id):
+    """
+    Удаляет помеченного пользователя или группу в фоне.
+    Если отметки уже нет (удалил process_deletions), ничего не делает;
+    прерванное удаление повтор задачи продолжит с места остановки.
+    """
+    deletion = (PendingDeletion.objects.select_related('user', 'group')
+                .filter(pk=deletion_id).first())
+    if deletion is not None:
+        purge(deletion)
+
+
+def process_deletions(batch_size=DELETION_BATCH_SIZE, pause=DELETION_PAUSE):
+    """
+    Окончательно удаляет всех помеченных пользователей и группы,
+    не дожидаясь задач purge_deletion.
+    Возвращает генератор пар (отметка об удалении, число записей).
+    """
+    pending = PendingDeletion.objects.select_related('user', 'group')
+    for deletion in pending.order_by('created'):
+        yield deletion, purge(deletion, batch_size, pause)
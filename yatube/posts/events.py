@@ -0,0 +1,74 @@
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from core.pubsub import broker
+
+POSTS_TOPIC = 'posts'
+POST_EVENT = 'post'
+COMMENT_EVENT = 'comment'
+
+
+def comments_topic(post_id):
+    return f'post:{post_id}'
+
+
+def publish_post(post):
+    """Сообщает лентам о новом посте."""
+    broker.publish(POSTS_TOPIC, POST_EVENT, {
+        'id': post.pk,
+        'author': post.author_id,
+        'group': post.group_id,
+    })
+
+
+def publish_comment(comment):
+    """
+    Рендерит фрагмент нового комментария один раз
+    и рассылает его всем открытым страницам поста.
+    """
+    topic = comments_topic(comment.post_id)
+    if not broker.has_subscribers(topic):
+        return
+    html = render_to_string('includes/posts/comment.html',
+                            {'comment': comment})
+    broker.publish(topic, COMMENT_EVENT, {
+        'id': comment.pk,
+        'html': html,
+    })
+
+
+def format_event(event, data):
+    return (f'event: {event}\n'
+            f'data: {json.dumps(data, ensure_ascii=False)}\n\n')
+
+
+async def event_stream(topics, accept=None):
+    """
+    Асинхронный генератор SSE-сообщений по темам topics.
+    accept(data) отбрасывает лишние события, раз в SSE_KEEPALIVE_SECONDS
+    отправляется комментарий-пинг, через SSE_MAX_SECONDS поток
+    закрывается, и браузер переподключается сам.
+    Отключение клиента замечается только при записи, так что подписка
+    умершего клиента живёт до SSE_KEEPALIVE_SECONDS. Открытый поток
+    держит корутину, очередь брокера и подписку, но не поток ОС:
+    под ASGI middleware и view асинхронные. Под WSGI каждый поток занимал
+    бы поток сервера на всё время жизни, поэтому там маршрутов SSE нет.
+    """
+    deadline = time.monotonic() + settings.SSE_MAX_SECONDS
+    async with broker.subscribe(*topics) as queue:
+        yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+        while (left := deadline - time.monotonic()) > 0:
+            try:
+                event, data = await asyncio.wait_for(
+                    queue.get(),
+                    min(settings.SSE_KEEPALIVE_SECONDS, left),
+                )
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if accept is None or accept(data):
+                yield format_event(event, data)
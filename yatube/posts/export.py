@@ -0,0 +1,146 @@
+import csv
+import zlib
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .constants import EXPORT_BUFFER_SIZE, EXPORT_CHUNK_SIZE
+from .models import Comment, Follow, Post
+
+# Тип записи: (модель, поля в файле, пути полей для values_list).
+# Поля совпадают с форматом команды import_content.
+KINDS = {
+    'post': (
+        Post,
+        ('id', 'author', 'group', 'text', 'image', 'created'),
+        ('id', 'author__username', 'group__slug', 'text', 'image',
+         'created'),
+    ),
+    'comment': (
+        Comment,
+        ('id', 'post', 'author', 'text', 'created'),
+        ('id', 'post_id', 'author__username', 'text', 'created'),
+    ),
+    'follow': (
+        Follow,
+        ('user', 'author'),
+        ('user__username', 'author__username'),
+    ),
+}
+FORMATS = ('jsonl', 'csv')
+
+
+class Echo:
+    """Объект с write(), возвращающий записанное, - для csv.writer."""
+    def write(self, value):
+        return value
+
+
+def parse_bound(value, end=False):
+    """Принимает дату или дату-время, возвращает aware datetime."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        moment = datetime.combine(day, time.max if end else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+
+    return moment
+
+
+def filter_queryset(kind, queryset, author=None, group=None,
+                    since=None, until=None):
+    """Применяет фильтры по автору, группе и диапазону дат."""
+    if author:
+        queryset = queryset.filter(author__username=author)
+    if group and kind == 'post':
+        queryset = queryset.filter(group__slug=group)
+    if group and kind == 'comment':
+        queryset = queryset.filter(post__group__slug=group)
+    if kind != 'follow':
+        if since:
+            queryset = queryset.filter(created__gte=since)
+        if until:
+            queryset = queryset.filter(created__lte=until)
+
+    return queryset
+
+
+def visible_queryset(kind):
+    """
+    Записи типа kind без контента пользователей, ожидающих удаления:
+    их постов и комментариев, комментариев к их постам и подписок.
+    """
+    model = KINDS[kind][0]
+    if kind == 'follow':
+        return model.objects.filter(user__pending_deletion__isnull=True,
+                                    author__pending_deletion__isnull=True)
+    queryset = model.objects.visible()
+    if kind == 'comment':
+        queryset = queryset.filter(
+            post__author__pending_deletion__isnull=True)
+
+    return queryset
+
+
+def export_rows(kind, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """
+    Генератор словарей видимых записей типа kind.
+    Записи читаются из БД кусками по chunk_size через iterator(),
+    поэтому память не зависит от размера таблицы.
+    """
+    _, fields, paths = KINDS[kind]
+    queryset = filter_queryset(kind, visible_queryset(kind), **filters)
+    rows = (queryset.order_by('pk').values_list(*paths)
+            .iterator(chunk_size=chunk_size))
+    for row in rows:
+        yield dict(zip(fields, row))
+
+
+def export_lines(kinds, file_format='jsonl', **filters):
+    """
+    Генератор строк выгрузки. JSON Lines может содержать несколько
+    типов записей (поле type), CSV - только один тип с заголовком.
+    """
+    if file_format == 'csv':
+        kind, = kinds
+        writer = csv.writer(Echo())
+        yield writer.writerow(KINDS[kind][1])
+        for row in export_rows(kind, **filters):
+            yield writer.writerow(row.values())
+        return
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for kind in kinds:
+        for row in export_rows(kind, **filters):
+            yield encoder.encode({'type': kind, **row}) + '\n'
+
+
+def buffered(lines, size=EXPORT_BUFFER_SIZE):
+    """Склеивает строки в куски примерно по size символов."""
+    buffer = []
+    length = 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def gzip_stream(chunks):
+    """Сжимает поток строк в gzip на лету."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
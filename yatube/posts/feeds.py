@@ -0,0 +1,154 @@
+from hashlib import md5
+
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import truncatechars
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.views.decorators.http import condition
+
+from .constants import FEED_CACHE_SECONDS, FEED_ITEMS, FEED_TITLE_LENGTH
+from .models import Group, Post, User
+
+
+class PostsFeed(Feed):
+    """Последние посты сайта в RSS или Atom."""
+    title = 'Yatube: последние записи'
+    description = 'Новые посты всех авторов.'
+
+    def __init__(self, feed_type=Rss201rev2Feed):
+        super().__init__()
+        self.feed_type = feed_type
+
+    def link(self):
+        return reverse('posts:index')
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+    def get_posts(self, obj):
+        return Post.objects.visible()
+
+    def items(self, obj):
+        return (self.get_posts(obj).select_related('author')
+                .order_by('-created', 'id')[:FEED_ITEMS])
+
+    def item_title(self, item):
+        return truncatechars(item.text, FEED_TITLE_LENGTH)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.created
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.get_username()
+
+
+class GroupFeed(PostsFeed):
+    """Последние посты группы."""
+    def get_object(self, request, slug):
+        return get_object_or_404(
+            Group.objects.filter(pending_deletion__isnull=True), slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def get_posts(self, obj):
+        return obj.posts.visible()
+
+
+class AuthorFeed(PostsFeed):
+    """Последние посты автора."""
+    def get_object(self, request, username):
+        return get_object_or_404(
+            User.objects.filter(pending_deletion__isnull=True),
+            username=username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.get_username()}'
+
+    def description(self, obj):
+        return f'Посты пользователя {obj.get_username()}.'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.get_username()])
+
+    def get_posts(self, obj):
+        return obj.posts.all()
+
+
+def feed_version(feed, request, kwargs):
+    """
+    Версия ленты по БД: id и время правки показываемых постов,
+    заголовок и описание ленты. Возвращает (объект ленты, хэш версии,
+    время последней правки или None). Считается один раз на запрос;
+    объект ленты ищется до всего остального, так что у неизвестной
+    группы или автора сразу 404.
+    """
+    if not hasattr(request, 'feed_version'):
+        obj = feed.get_object(request, **kwargs)
+        posts = list(feed.items(obj).values_list('pk', 'updated'))
+        state = (sorted(kwargs.items()),
+                 feed._get_dynamic_attr('title', obj),
+                 feed._get_dynamic_attr('description', obj),
+                 posts)
+        request.feed_version = (
+            obj,
+            md5(repr(state).encode()).hexdigest(),
+            max((updated for _, updated in posts), default=None),
+        )
+
+    return request.feed_version
+
+
+def cached_feed(feed, name):
+    """
+    View ленты с условными запросами и кэшем.
+    ETag и Last-Modified строятся из версии ленты одним запросом
+    к БД (у лент группы и автора - двумя), поэтому опрос без изменений
+    получает 304 в любом процессе. Отрендеренный фид кэшируется под
+    ключом с версией, так что любая правка постов ленты даёт новый ключ.
+    """
+    def etag(request, **kwargs):
+        return f'{name}-{feed_version(feed, request, kwargs)[1]}'
+
+    def last_modified(request, **kwargs):
+        return feed_version(feed, request, kwargs)[2]
+
+    @condition(etag_func=etag, last_modified_func=last_modified)
+    def view(request, **kwargs):
+        obj, version, _ = feed_version(feed, request, kwargs)
+        # Ссылки в фиде абсолютные, поэтому хост входит в ключ.
+        key = f'feed:{name}:{request.get_host()}:{version}'
+        cached = cache.get(key)
+        if cached is None:
+            generator = feed.get_feed(obj, request)
+            cached = (generator.writeString('utf-8'),
+                      generator.content_type)
+            cache.set(key, cached, FEED_CACHE_SECONDS)
+        content, content_type = cached
+
+        return HttpResponse(content, content_type=content_type)
+
+    return view
+
+
+site_rss = cached_feed(PostsFeed(), 'rss')
+site_atom = cached_feed(PostsFeed(Atom1Feed), 'atom')
+group_rss = cached_feed(GroupFeed(), 'rss')
+group_atom = cached_feed(GroupFeed(Atom1Feed), 'atom')
+author_rss = cached_feed(AuthorFeed(), 'rss')
+author_atom = cached_feed(AuthorFeed(Atom1Feed), 'atom')
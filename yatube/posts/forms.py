@@ -1,6 +1,6 @@
 from django.forms import ModelForm
 
-from .models import Comment, Post
+from .models import Comment, Group, Post
 
 
 class PostForm(ModelForm):
@@ -12,6 +12,11 @@ class PostForm(ModelForm):
         model = Post
         fields = ['text', 'group', 'image']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'].queryset = Group.objects.filter(
+            pending_deletion__isnull=True)
+
 
 class CommentForm(ModelForm):
     """Форма создания комментария. Имеет одно поле: текст(text)."""
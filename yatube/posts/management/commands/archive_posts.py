@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.archive import archive_posts
+from posts.constants import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты и их комментарии в архивные таблицы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=ARCHIVE_AFTER_DAYS,
+            help='Архивировать посты старше указанного числа дней.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+            help='Сколько постов переносить в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total_posts = total_comments = 0
+        for posts, comments in archive_posts(cutoff, options['batch_size']):
+            total_posts += posts
+            total_comments += comments
+            self.stdout.write(f'Перенесено постов: {total_posts}, '
+                              f'комментариев: {total_comments}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово. В архив перенесено постов: {total_posts}, '
+            f'комментариев: {total_comments}.'))
@@ -0,0 +1,157 @@
+import json
+import random
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.urls import reverse
+
+from core.benchmark import (HttpRunner, InProcessRunner, Scenario, compare,
+                            run_scenario)
+from posts.models import Group, Post, User
+
+# Сколько объектов каждого вида выбирать для сценариев.
+SAMPLE_SIZE = 200
+# Сколько первых страниц ленты открывать.
+PAGES = 5
+
+COLUMNS = ['p50_ms', 'p95_ms', 'p99_ms', 'rps', 'queries', 'errors']
+
+
+def sample(rng, queryset, field):
+    values = list(queryset.order_by('pk').values_list(field, flat=True))
+
+    return rng.sample(values, min(len(values), SAMPLE_SIZE))
+
+
+def build_scenarios(seed):
+    """
+    Сценарии по основным страницам. Объекты берутся случайной выборкой
+    из базы, вошедший пользователь - тот, у кого больше всего подписок.
+    """
+    rng = random.Random(seed)
+    slugs = sample(rng, Group.objects.filter(
+        pending_deletion__isnull=True), 'slug')
+    usernames = sample(rng, User.objects.filter(
+        pending_deletion__isnull=True, posts__isnull=False).distinct(),
+        'username')
+    post_ids = sample(rng, Post.objects.visible(), 'pk')
+    if not usernames or not post_ids:
+        raise CommandError('В базе нет постов, заполните её '
+                           'командой generate_load_data.')
+    reader = (User.objects.annotate(follows=Count('follower'))
+              .order_by('-follows', 'pk').first())
+
+    def page(rng):
+        return f'{reverse("posts:index")}?page={rng.randint(1, PAGES)}', None
+
+    def group(rng):
+        return reverse('posts:group_list', args=[rng.choice(slugs)]), None
+
+    def profile(rng):
+        return reverse('posts:profile', args=[rng.choice(usernames)]), None
+
+    def post(rng):
+        return reverse('posts:post_detail', args=[rng.choice(post_ids)]), None
+
+    def follow(rng):
+        return f'{reverse("posts:follow_index")}?page=1', None
+
+    def create(rng):
+        return reverse('posts:post_create'), {
+            'text': f'Пост для бенчмарка {rng.random()}'}
+
+    def comment(rng):
+        return reverse('posts:add_comment', args=[rng.choice(post_ids)]), {
+            'text': f'Комментарий для бенчмарка {rng.random()}'}
+
+    scenarios = [
+        Scenario('index', page),
+        Scenario('profile', profile),
+        Scenario('post_detail', post),
+        Scenario('follow_index', follow, reader),
+        Scenario('post_create', create, reader),
+        Scenario('add_comment', comment, reader),
+    ]
+    if slugs:
+        scenarios.insert(1, Scenario('group_posts', group))
+
+    return scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        'Сквозной бенчмарк основных страниц: время ответа (p50/p95/p99), '
+        'пропускная способность и число запросов к БД. Может сравнить '
+        'результат с сохранённым и упасть при регрессии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', choices=['inprocess', 'wsgi', 'asgi'],
+            default='inprocess',
+            help='inprocess - тестовый клиент Django, wsgi/asgi - HTTP '
+                 'к локальному серверу (для asgi нужен uvicorn).')
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на сценарий.')
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Одновременных запросов.')
+        parser.add_argument(
+            '--warmup', type=int, default=20,
+            help='Запросов на прогрев перед замером.')
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запустить только этот сценарий, можно несколько раз.')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно случайной выборки страниц.')
+        parser.add_argument(
+            '--json',
+            help='Сохранить результат в файл, пригодный для --baseline.')
+        parser.add_argument(
+            '--baseline',
+            help='Файл с прошлым результатом для сравнения.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95 относительно --baseline, доля.')
+
+    def handle(self, *args, **options):
+        scenarios = build_scenarios(options['seed'])
+        if options['scenarios']:
+            scenarios = [scenario for scenario in scenarios
+                         if scenario.name in options['scenarios']]
+        if options['server'] == 'inprocess':
+            runner = InProcessRunner()
+        else:
+            runner = HttpRunner(options['server'])
+        results = {}
+        try:
+            with runner:
+                for scenario in scenarios:
+                    results[scenario.name] = run_scenario(
+                        runner, scenario, options['requests'],
+                        options['concurrency'], options['warmup'],
+                        options['seed'])
+        except RuntimeError as error:
+            raise CommandError(error)
+        self.report(results)
+        if options['json']:
+            Path(options['json']).write_text(
+                json.dumps(results, indent=2, ensure_ascii=False))
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())
+            regressions = compare(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Регрессия производительности:\n'
+                                   + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def report(self, results):
+        self.stdout.write(f'{"view":<14}' + ''.join(
+            f'{column:>10}' for column in COLUMNS))
+        for name, result in results.items():
+            self.stdout.write(f'{name:<14}' + ''.join(
+                f'{"-" if result[column] is None else result[column]:>10}'
+                for column in COLUMNS))
@@ -0,0 +1,69 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (FORMATS, KINDS, buffered, export_lines,
+                          parse_bound)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии и подписки '
+        'в JSON Lines или CSV. Результат можно загрузить '
+        'командой import_content.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            action='append',
+            choices=KINDS,
+            help='Тип записей, можно указать несколько раз. '
+                 'По умолчанию - все типы.',
+        )
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--author', help='username автора.')
+        parser.add_argument('--group', help='slug группы.')
+        parser.add_argument('--since', help='Дата или дата-время начала.')
+        parser.add_argument('--until', help='Дата или дата-время конца.')
+        parser.add_argument(
+            '--output',
+            help='Файл для выгрузки, по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать выгрузку gzip.',
+        )
+
+    def handle(self, *args, **options):
+        kinds = options['kind'] or list(KINDS)
+        if options['format'] == 'csv' and len(kinds) != 1:
+            raise CommandError('Для CSV укажите ровно один --kind.')
+        try:
+            filters = {
+                'author': options['author'],
+                'group': options['group'],
+                'since': parse_bound(options['since']),
+                'until': parse_bound(options['until'], end=True),
+            }
+        except ValueError as error:
+            raise CommandError(error)
+        chunks = buffered(export_lines(kinds, options['format'], **filters))
+        output = options['output']
+        if options['gzip']:
+            target = (gzip.open(output, 'wt', encoding='utf-8') if output
+                      else gzip.open(sys.stdout.buffer, 'wt',
+                                     encoding='utf-8'))
+        elif output:
+            target = open(output, 'w', encoding='utf-8', newline='')
+        else:
+            target = None
+        if target is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with target:
+            for chunk in chunks:
+                target.write(chunk)
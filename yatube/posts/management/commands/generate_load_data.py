@@ -0,0 +1,329 @@
+import io
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_date
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from posts.autocomplete import autocomplete_index
+from posts.constants import LOAD_BATCH_SIZE
+from posts.models import (ArchivedPost, Comment, Follow, Group, Mention,
+                          Post, Tag, TaggedPost, User)
+
+USERNAME_PREFIX = 'load_'
+GROUP_PREFIX = 'load-'
+SENTENCE_POOL = 2000
+TAG_POOL = 500
+# Доли постов с группой, хэштегом и упоминанием.
+GROUP_SHARE = 0.7
+TAG_SHARE = 0.2
+MENTION_SHARE = 0.05
+# Среднее время от поста до комментария, секунд.
+COMMENT_DELAY = 6 * 60 * 60
+IMAGE_SIZE = (960, 540)
+
+
+def power_law(count, exponent):
+    """
+    Накопленные веса закона Ципфа для рангов 1..count:
+    элемент ранга r выбирается с вероятностью ~ 1 / r ** exponent.
+    """
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует нагрузочные данные: пользователей, группы, посты, '
+        'комментарии и подписки со степенным распределением подписчиков '
+        'и активности. Одинаковый --seed даёт одинаковые данные. '
+        'Запускайте на чистой базе, например SQLITE_PATH=/tmp/load.db.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=200_000)
+        parser.add_argument('--comments', type=int, default=500_000)
+        parser.add_argument('--follows', type=int, default=200_000)
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько разных картинок создать в MEDIA_ROOT.')
+        parser.add_argument(
+            '--image-share', type=float, default=0.1,
+            help='Доля постов с картинкой, если --images больше 0.')
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель степенного распределения.')
+        parser.add_argument(
+            '--days', type=int, default=730,
+            help='За сколько дней до --end распределить посты.')
+        parser.add_argument(
+            '--end',
+            help='Дата последнего поста ГГГГ-ММ-ДД, по умолчанию сегодня.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--password', default='load-password',
+            help='Пароль всех сгенерированных пользователей.')
+        parser.add_argument(
+            '--batch-size', type=int, default=LOAD_BATCH_SIZE,
+            help='Сколько записей сохранять одним запросом.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['posts'] < 1:
+            raise CommandError('Нужны хотя бы 2 пользователя и 1 пост.')
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError(
+                'Данные уже сгенерированы, запустите команду на чистой базе.')
+        end = (parse_date(options['end']) if options['end']
+               else datetime.now(timezone.utc).date())
+        if end is None:
+            raise CommandError('Неверная дата --end.')
+        self.end = datetime.combine(end, dt_time.min, tzinfo=timezone.utc)
+        self.start = self.end - timedelta(days=options['days'])
+        self.batch_size = options['batch_size']
+        self.exponent = options['exponent']
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.sentences = [self.fake.sentence(nb_words=10)
+                          for _ in range(SENTENCE_POOL)]
+
+        started = time.monotonic()
+        steps = [
+            ('users', lambda: self.create_users(
+                options['users'], options['password'])),
+            ('groups', lambda: self.create_groups(options['groups'])),
+            ('tags', lambda: self.create_tags(TAG_POOL)),
+            ('images', lambda: self.create_images(options['images'])),
+            ('posts', lambda: self.create_posts(
+                options['posts'], options['image_share'])),
+            ('comments', lambda: self.create_comments(options['comments'])),
+            ('follows', lambda: self.create_follows(options['follows'])),
+        ]
+        for name, step in steps:
+            step_started = time.monotonic()
+            count = step()
+            elapsed = time.monotonic() - step_started
+            self.stdout.write(
+                f'{name}: {count} за {elapsed:.1f} с '
+                f'({count / max(elapsed, 1e-9):.0f}/с)')
+        autocomplete_index.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с.'))
+
+    def batches(self, count):
+        for start in range(0, count, self.batch_size):
+            yield range(start, min(start + self.batch_size, count))
+
+    def pick(self, population, cum_weights, count):
+        """count элементов population по накопленным весам."""
+        return self.random.choices(population, cum_weights=cum_weights,
+                                   k=count)
+
+    def create_users(self, count, password):
+        password = make_password(password)
+        first_names = [self.fake.first_name() for _ in range(100)]
+        last_names = [self.fake.last_name() for _ in range(100)]
+        for batch in self.batches(count):
+            User.objects.bulk_create([
+                User(
+                    username=f'{USERNAME_PREFIX}{number:07d}',
+                    first_name=self.random.choice(first_names),
+                    last_name=self.random.choice(last_names),
+                    password=password,
+                    date_joined=self.start,
+                )
+                for number in batch
+            ])
+        self.users = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX)
+            .order_by('pk').values_list('pk', flat=True))
+        # Популярность (подписчики) и активность (посты, комментарии)
+        # распределены степенно, но у разных пользователей.
+        self.popular = self.random.sample(self.users, len(self.users))
+        self.active = self.random.sample(self.users, len(self.users))
+        self.user_weights = power_law(len(self.users), self.exponent)
+        # Упоминают самых активных: их юзернеймы нужны в тексте постов.
+        self.mentionable = list(
+            User.objects.filter(pk__in=self.active[:1000])
+            .order_by('pk').values_list('pk', 'username'))
+
+        return len(self.users)
+
+    def create_groups(self, count):
+        Group.objects.bulk_create([
+            Group(
+                title=self.fake.word().capitalize(),
+                slug=f'{GROUP_PREFIX}{number}',
+                description=self.random.choice(self.sentences),
+            )
+            for number in range(count)
+        ], batch_size=self.batch_size)
+        self.groups = list(
+            Group.objects.filter(slug__startswith=GROUP_PREFIX)
+            .order_by('pk').values_list('pk', flat=True))
+        self.group_weights = power_law(len(self.groups), self.exponent)
+
+        return len(self.groups)
+
+    def create_tags(self, count):
+        names = [f'{self.fake.word()}{number}' for number in range(count)]
+        Tag.objects.bulk_create([Tag(name=name) for name in names],
+                                ignore_conflicts=True)
+        self.tags = dict(Tag.objects.filter(name__in=names)
+                         .values_list('name', 'pk'))
+        self.tag_names = names
+        self.tag_weights = power_law(len(names), self.exponent)
+
+        return len(names)
+
+    def create_images(self, count):
+        """Картинки с цветными прямоугольниками, одни на все посты."""
+        self.images = []
+        for number in range(count):
+            image = Image.new('RGB', IMAGE_SIZE, self.random_color())
+            draw = ImageDraw.Draw(image)
+            for _ in range(8):
+                x, y = (self.random.randrange(size) for size in IMAGE_SIZE)
+                draw.rectangle((x, y, x + 200, y + 120),
+                               fill=self.random_color())
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=80)
+            self.images.append(default_storage.save(
+                f'posts/load/{number}.jpg', ContentFile(buffer.getvalue())))
+
+        return count
+
+    def random_color(self):
+        return tuple(self.random.randrange(256) for _ in range(3))
+
+    def post_text(self):
+        """Текст поста; возвращает текст, хэштеги и упомянутых."""
+        words = self.random.choices(self.sentences,
+                                    k=self.random.randint(1, 5))
+        tags = set()
+        mentions = set()
+        if self.random.random() < TAG_SHARE:
+            tags = set(self.pick(self.tag_names, self.tag_weights,
+                                 self.random.randint(1, 3)))
+            words += [f'#{tag}' for tag in sorted(tags)]
+        if self.random.random() < MENTION_SHARE:
+            user, username = self.random.choice(self.mentionable)
+            mentions.add(user)
+            words.append(f'@{username}')
+
+        return ' '.join(words), tags, mentions
+
+    def insert(self, model, fields, rows):
+        """
+        Вставляет строки одним executemany в обход ORM: на миллионах
+        записей сборка SQL в bulk_create стоит дороже самой вставки.
+        """
+        quote = connection.ops.quote_name
+        columns = [quote(model._meta.get_field(field).column)
+                   for field in fields]
+        sql = (f'INSERT INTO {quote(model._meta.db_table)} '
+               f'({", ".join(columns)}) '
+               f'VALUES ({", ".join(["%s"] * len(columns))})')
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def create_posts(self, count, image_share):
+        """
+        Посты идут по времени равномерно от --end - --days до --end,
+        так что порядок id совпадает с порядком дат, как в живой базе.
+        id назначаются заранее, после архива, который их тоже занимает.
+        """
+        span = (self.end - self.start) / count
+        first_id = max(Post.objects.aggregate(Max('pk'))['pk__max'] or 0,
+                       ArchivedPost.objects.aggregate(
+                           Max('pk'))['pk__max'] or 0) + 1
+        self.posts = range(first_id, first_id + count)
+        self.post_dates = [self.start + span * number
+                           for number in range(count)]
+        adapt = connection.ops.adapt_datetimefield_value
+        for batch in self.batches(count):
+            authors = self.pick(self.active, self.user_weights, len(batch))
+            posts = []
+            tagged = []
+            mentioned = []
+            for number, author in zip(batch, authors):
+                text, tags, mentions = self.post_text()
+                group = None
+                if self.groups and self.random.random() < GROUP_SHARE:
+                    group = self.pick(self.groups, self.group_weights, 1)[0]
+                image = ''
+                if self.images and self.random.random() < image_share:
+                    image = self.random.choice(self.images)
+                pk = self.posts[number]
+                created = adapt(self.post_dates[number])
+                # Миниатюры нарежет make_thumbnails при первом чтении.
+                posts.append(
+                    (pk, author, group, text, image, '', created, created))
+                tagged += [(self.tags[name], pk, created)
+                           for name in sorted(tags)]
+                mentioned += [(user, pk, created) for user in mentions]
+            with transaction.atomic():
+                self.insert(Post, ('id', 'author', 'group', 'text', 'image',
+                                   'thumbnail', 'created', 'updated'), posts)
+                self.insert(TaggedPost, ('tag', 'post', 'created'), tagged)
+                self.insert(Mention, ('user', 'post', 'created'), mentioned)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Post]):
+                cursor.execute(sql)
+
+        return count
+
+    def create_comments(self, count):
+        """Комментарии чаще достаются популярным постам и активным людям."""
+        order = self.random.sample(range(len(self.posts)), len(self.posts))
+        weights = power_law(len(order), self.exponent)
+        adapt = connection.ops.adapt_datetimefield_value
+        for batch in self.batches(count):
+            indexes = self.pick(order, weights, len(batch))
+            authors = self.pick(self.active, self.user_weights, len(batch))
+            comments = []
+            for index, author in zip(indexes, authors):
+                delay = timedelta(
+                    seconds=self.random.expovariate(1 / COMMENT_DELAY))
+                comments.append((
+                    self.posts[index],
+                    author,
+                    self.random.choice(self.sentences),
+                    adapt(min(self.post_dates[index] + delay, self.end)),
+                ))
+            with transaction.atomic():
+                self.insert(Comment, ('post', 'author', 'text', 'created'),
+                            comments)
+
+        return count
+
+    def create_follows(self, count):
+        """Подписчики - любые, авторы - по степенной популярности."""
+        count = min(count, len(self.users) * (len(self.users) - 1))
+        edges = set()
+        while len(edges) < count:
+            needed = min(self.batch_size, count - len(edges))
+            authors = self.pick(self.popular, self.user_weights, needed)
+            follows = []
+            for author in authors:
+                user = self.random.choice(self.users)
+                if user == author or (user, author) in edges:
+                    continue
+                edges.add((user, author))
+                follows.append((user, author))
+            with transaction.atomic():
+                self.insert(Follow, ('user', 'author'), follows)
+
+        return len(edges)
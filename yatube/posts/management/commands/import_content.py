@@ -0,0 +1,288 @@
+import csv
+import json
+import sys
+import time
+from collections import defaultdict
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import explicit_created
+from posts.autocomplete import autocomplete_index
+from posts.constants import IMPORT_BATCH_SIZE
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import sync_tags_and_mentions
+
+TYPES = ('user', 'group', 'post', 'comment', 'follow')
+DEPENDENCIES = {
+    'user': (),
+    'group': (),
+    'post': ('user', 'group'),
+    'comment': ('user', 'post'),
+    'follow': ('user',),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает пользователей, группы, посты, комментарии '
+        'и подписки из JSON Lines или CSV. В JSON Lines тип записи '
+        'задаётся полем "type", для CSV - опцией --type. '
+        'Авторы и группы указываются по username и slug, '
+        'посты в комментариях - по id поста из того же файла.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл JSON Lines или CSV, "-" - читать из stdin.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Формат файла, по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--type',
+            choices=TYPES,
+            help='Тип записей в CSV-файле.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Сколько записей сохранять одним запросом и транзакцией.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        if file_format == 'csv' and not options['type']:
+            raise CommandError('Для CSV-файла укажите --type.')
+        self.batch_size = options['batch_size']
+        self.buffers = defaultdict(list)
+        self.counts = defaultdict(int)
+        self.skipped = defaultdict(int)
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.posts = {}
+        self.imported_posts = []
+        self.unusable_password = make_password(None)
+
+        started = time.monotonic()
+        file = (sys.stdin if path == '-'
+                else open(path, encoding='utf-8', newline=''))
+        try:
+            with explicit_created(Post, Comment):
+                rows = self.read_rows(file, file_format, options['type'])
+                for kind, row in rows:
+                    self.buffers[kind].append(row)
+                    if len(self.buffers[kind]) >= self.batch_size:
+                        self.flush(kind)
+                for kind in TYPES:
+                    self.flush(kind)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        imported = time.monotonic() - started
+        self.rebuild_side_effects()
+        elapsed = time.monotonic() - started
+        self.report(imported, elapsed)
+
+    def read_rows(self, file, file_format, csv_type):
+        if file_format == 'csv':
+            for row in csv.DictReader(file):
+                yield csv_type, row
+            return
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise CommandError(f'Строка {number}: {error}')
+            kind = row.pop('type', None)
+            if kind not in TYPES:
+                raise CommandError(
+                    f'Строка {number}: неизвестный тип записи {kind!r}.')
+            yield kind, row
+
+    def flush(self, kind):
+        """
+        Сохраняет накопленные записи типа kind.
+        Перед этим сохраняет записи, на которые они ссылаются.
+        """
+        for dependency in DEPENDENCIES[kind]:
+            self.flush(dependency)
+        rows = self.buffers.pop(kind, None)
+        if not rows:
+            return
+        with transaction.atomic():
+            created = getattr(self, f'create_{kind}s')(rows)
+        self.counts[kind] += created
+        self.skipped[kind] += len(rows) - created
+
+    def parse_created(self, value):
+        created = parse_datetime(value) if value else None
+        if created is None:
+            return timezone.now()
+        if timezone.is_naive(created):
+            return timezone.make_aware(created)
+
+        return created
+
+    def create_users(self, rows):
+        users = []
+        for row in rows:
+            if row['username'] in self.users:
+                continue
+            self.users[row['username']] = None
+            users.append(User(
+                username=row['username'],
+                email=row.get('email') or '',
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                password=row.get('password') or self.unusable_password,
+            ))
+        users = User.objects.bulk_create(users)
+        if users and users[0].pk is None:
+            users = User.objects.filter(
+                username__in=[user.username for user in users])
+        self.users.update((user.username, user.pk) for user in users)
+
+        return len(users)
+
+    def create_groups(self, rows):
+        groups = []
+        for row in rows:
+            if row['slug'] in self.groups:
+                continue
+            self.groups[row['slug']] = None
+            groups.append(Group(
+                slug=row['slug'],
+                title=row['title'],
+                description=row.get('description') or '',
+            ))
+        groups = Group.objects.bulk_create(groups)
+        if groups and groups[0].pk is None:
+            groups = Group.objects.filter(
+                slug__in=[group.slug for group in groups])
+        self.groups.update((group.slug, group.pk) for group in groups)
+
+        return len(groups)
+
+    def create_posts(self, rows):
+        refs = []
+        posts = []
+        for row in rows:
+            author = self.users.get(row['author'])
+            group = self.groups.get(row.get('group') or '')
+            if author is None or (row.get('group') and group is None):
+                continue
+            refs.append(row.get('id'))
+            posts.append(Post(
+                author_id=author,
+                group_id=group,
+                text=row['text'],
+                image=row.get('image') or '',
+                created=self.parse_created(row.get('created')),
+            ))
+        posts = Post.objects.bulk_create(posts)
+        if posts and posts[0].pk is None:
+            raise CommandError(
+                'База данных не возвращает id при bulk_create, '
+                'импорт постов невозможен.')
+        for ref, post in zip(refs, posts):
+            if ref not in (None, ''):
+                self.posts[str(ref)] = post.pk
+            self.imported_posts.append(post.pk)
+
+        return len(posts)
+
+    def resolve_posts(self, rows):
+        """Находит pk постов по id из файла или по pk в БД."""
+        resolved = {}
+        unknown = set()
+        for row in rows:
+            ref = str(row['post'])
+            if ref in self.posts:
+                resolved[ref] = self.posts[ref]
+            elif ref.isdigit():
+                unknown.add(int(ref))
+        existing = Post.objects.filter(pk__in=unknown).values_list(
+            'pk', flat=True)
+        resolved.update((str(pk), pk) for pk in existing)
+
+        return resolved
+
+    def create_comments(self, rows):
+        posts = self.resolve_posts(rows)
+        comments = []
+        for row in rows:
+            author = self.users.get(row['author'])
+            post = posts.get(str(row['post']))
+            if author is None or post is None:
+                continue
+            comments.append(Comment(
+                author_id=author,
+                post_id=post,
+                text=row['text'],
+                created=self.parse_created(row.get('created')),
+            ))
+
+        return len(Comment.objects.bulk_create(comments))
+
+    def create_follows(self, rows):
+        """
+        Создаёт подписки, которых ещё нет. Повторы в файле и уже
+        существующие подписки не считаются загруженными.
+        """
+        pairs = set()
+        for row in rows:
+            user = self.users.get(row['user'])
+            author = self.users.get(row['author'])
+            if user is None or author is None or user == author:
+                continue
+            pairs.add((user, author))
+        existing = Follow.objects.filter(
+            user_id__in={user for user, _ in pairs},
+            author_id__in={author for _, author in pairs},
+        ).values_list('user_id', 'author_id')
+        pairs.difference_update(existing)
+        # ignore_conflicts остаётся на случай параллельной загрузки.
+        Follow.objects.bulk_create(
+            [Follow(user_id=user, author_id=author)
+             for user, author in sorted(pairs)],
+            ignore_conflicts=True)
+
+        return len(pairs)
+
+    def rebuild_side_effects(self):
+        """
+        bulk_create не отправляет сигналы, поэтому после загрузки
+        один раз пересобираются теги и упоминания загруженных постов
+        и сбрасывается индекс автодополнения этого процесса.
+        """
+        for start in range(0, len(self.imported_posts), self.batch_size):
+            ids = self.imported_posts[start:start + self.batch_size]
+            with transaction.atomic():
+                sync_tags_and_mentions(
+                    Post.objects.filter(pk__in=ids).only(
+                        'pk', 'text', 'created'))
+        autocomplete_index.clear()
+
+    def report(self, imported, elapsed):
+        total = sum(self.counts.values())
+        for kind in TYPES:
+            if self.counts[kind] or self.skipped[kind]:
+                self.stdout.write(
+                    f'{kind}: загружено {self.counts[kind]}, '
+                    f'пропущено {self.skipped[kind]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {total} за {elapsed:.2f} с '
+            f'({total / max(imported, 1e-9):.0f} записей/с, '
+            f'без учёта пересборки тегов).'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.constants import DELETION_BATCH_SIZE, DELETION_PAUSE
+from posts.deletion import process_deletions
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет пользователей и группы, помеченные '
+        'на удаление, вместе с их записями - пачками, не блокируя БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DELETION_BATCH_SIZE,
+            help='Сколько записей удалять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=DELETION_PAUSE,
+            help='Пауза между пачками, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        deletions = process_deletions(options['batch_size'],
+                                      options['pause'])
+        for deletion, count in deletions:
+            self.stdout.write(f'{deletion}: удалено записей {count}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
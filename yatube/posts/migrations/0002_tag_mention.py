@@ -0,0 +1,104 @@
+# Generated by Django 4.2.8 on 2026-10-19 09:52
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Копии разбора из posts.utils на момент миграции: миграция не должна
+# менять поведение вслед за кодом приложения.
+HASHTAG_RE = re.compile(r'(?<![\w#])#(\w+)')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]+)')
+TAG_MAX_LENGTH = 100
+
+
+def extract_hashtags(text):
+    return {tag.lower()[:TAG_MAX_LENGTH] for tag in HASHTAG_RE.findall(text)}
+
+
+def extract_mentions(text):
+    return {name.rstrip('.') for name in MENTION_RE.findall(text)}
+
+
+def parse_existing_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Tag = apps.get_model('posts', 'Tag')
+    TaggedPost = apps.get_model('posts', 'TaggedPost')
+    Mention = apps.get_model('posts', 'Mention')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    tags = {}
+    users = dict(User.objects.values_list('username', 'pk'))
+    for post in Post.objects.only('pk', 'text', 'created').iterator():
+        for name in extract_hashtags(post.text):
+            if name not in tags:
+                tags[name] = Tag.objects.get_or_create(name=name)[0].pk
+            TaggedPost.objects.create(
+                tag_id=tags[name], post_id=post.pk, created=post.created)
+        for username in extract_mentions(post.text):
+            if username in users:
+                Mention.objects.create(
+                    user_id=users[username], post_id=post.pk,
+                    created=post.created)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='имя тега')),
+            ],
+            options={
+                'verbose_name': 'тег',
+                'verbose_name_plural': 'теги',
+            },
+        ),
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='дата публикации поста')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.post', verbose_name='пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL, verbose_name='упомянутый пользователь')),
+            ],
+            options={
+                'verbose_name': 'упоминание',
+                'verbose_name_plural': 'упоминания',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaggedPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='дата публикации поста')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='posts.post', verbose_name='пост')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_links', to='posts.tag', verbose_name='тег')),
+            ],
+            options={
+                'verbose_name': 'пост с тегом',
+                'verbose_name_plural': 'посты с тегами',
+                'indexes': [models.Index(fields=['tag', '-created'], name='tagged_post_tag_created_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taggedpost',
+            constraint=models.UniqueConstraint(fields=('tag', 'post'), name='unique_tagged_post'),
+        ),
+        migrations.AddIndex(
+            model_name='mention',
+            index=models.Index(fields=['user', '-created'], name='mention_user_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mention',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_mention'),
+        ),
+        migrations.RunPython(parse_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.8 on 2026-10-19 09:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0003_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPost',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField(verbose_name='текст поста')),
+                ('image', models.ImageField(blank=True, upload_to='posts/', verbose_name='Картинка')),
+                ('created', models.DateTimeField(verbose_name='Дата создания')),
+                ('archived', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_posts', to=settings.AUTH_USER_MODEL, verbose_name='автор поста')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_posts', to='posts.group', verbose_name='группа поста')),
+            ],
+            options={
+                'verbose_name': 'архивный пост',
+                'verbose_name_plural': 'архивные посты',
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField(verbose_name='текст комментария')),
+                ('created', models.DateTimeField(verbose_name='Дата создания')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_comments', to=settings.AUTH_USER_MODEL, verbose_name='автор комментария')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='posts.archivedpost', verbose_name='пост, к которому относится комментарий')),
+            ],
+            options={
+                'verbose_name': 'архивный комментарий',
+                'verbose_name_plural': 'архивные комментарии',
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedpost',
+            index=models.Index(fields=['author', '-created'], name='archived_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['post', '-created'], name='archived_comment_post_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.8 on 2026-10-19 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0004_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingDeletion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('group', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pending_deletion', to='posts.group', verbose_name='группа')),
+                ('user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pending_deletion', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'ожидает удаления',
+                'verbose_name_plural': 'ожидают удаления',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pendingdeletion',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('group__isnull', True), ('user__isnull', False)), models.Q(('group__isnull', False), ('user__isnull', True)), _connector='OR'), name='pending_deletion_user_or_group'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.8 on 2026-10-19 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_pending_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='thumbnail',
+            field=models.CharField(blank=True, editable=False, help_text='Путь миниатюры картинки, его записывает make_thumbnails', max_length=255, verbose_name='Миниатюра'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail',
+            field=models.CharField(blank=True, editable=False, help_text='Путь миниатюры картинки, его записывает make_thumbnails', max_length=255, verbose_name='Миниатюра'),
+        ),
+    ]
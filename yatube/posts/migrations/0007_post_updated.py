@@ -0,0 +1,25 @@
+# Generated by Django 4.2.8 on 2026-10-19 11:14
+
+from django.db import migrations, models
+
+
+def copy_created(apps, schema_editor):
+    """У старых постов датой изменения считается дата создания."""
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=models.F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(copy_created, migrations.RunPython.noop),
+    ]
@@ -2,11 +2,17 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 from core.models import CreatedModel
-from .constants import CHARS_LIMIT
+from .constants import CHARS_LIMIT, TAG_MAX_LENGTH
 
 User = get_user_model()
 
 
+class AuthoredQuerySet(models.QuerySet):
+    def visible(self):
+        """Исключает записи авторов, ожидающих удаления."""
+        return self.filter(author__pending_deletion__isnull=True)
+
+
 class Group(models.Model):
     """Модель для групп. Имеет название, адрес, описание."""
     title = models.CharField(
@@ -59,9 +65,30 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True,
     )
+    thumbnail = models.CharField(
+        'Миниатюра',
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text='Путь миниатюры картинки, его записывает make_thumbnails'
+    )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+
+    objects = AuthoredQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['author', '-created'],
+                         name='post_author_created_idx'),
+            models.Index(fields=['group', '-created'],
+                         name='post_group_created_idx'),
+            models.Index(fields=['-created', 'id'],
+                         name='post_created_id_idx'),
+        ]
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
 
@@ -94,8 +121,14 @@ class Comment(CreatedModel):
         verbose_name='автор комментария'
     )
 
+    objects = AuthoredQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+        ]
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
 
@@ -123,9 +156,227 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique_follow')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
         verbose_name = 'подписка'
         verbose_name_plural = 'подписки'
 
     def __str__(self) -> str:
 
         return f'{self.user.username} подписан на {self.author.username}'
+
+
+class Tag(models.Model):
+    """Модель для хэштегов. Имеет имя тега в нижнем регистре."""
+    name = models.CharField(
+        'имя тега',
+        max_length=TAG_MAX_LENGTH,
+        unique=True
+    )
+
+    class Meta:
+        verbose_name = 'тег'
+        verbose_name_plural = 'теги'
+
+    def __str__(self) -> str:
+
+        return f'#{self.name}'
+
+
+class TaggedPost(models.Model):
+    """
+    Связь поста с хэштегом.
+    Хранит копию даты публикации поста, чтобы лента тега
+    читалась по индексу (tag, -created) без сортировки.
+    """
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_links',
+        verbose_name='тег'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='tag_links',
+        verbose_name='пост'
+    )
+    created = models.DateTimeField('дата публикации поста')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'post'],
+                                    name='unique_tagged_post')
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-created'],
+                         name='tagged_post_tag_created_idx'),
+        ]
+        verbose_name = 'пост с тегом'
+        verbose_name_plural = 'посты с тегами'
+
+    def __str__(self) -> str:
+
+        return f'{self.tag} в посте {self.post_id}'
+
+
+class Mention(models.Model):
+    """
+    Упоминание пользователя (@username) в посте.
+    Хранит копию даты публикации поста для индекса (user, -created).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='упомянутый пользователь'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='пост'
+    )
+    created = models.DateTimeField('дата публикации поста')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_mention')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created'],
+                         name='mention_user_created_idx'),
+        ]
+        verbose_name = 'упоминание'
+        verbose_name_plural = 'упоминания'
+
+    def __str__(self) -> str:
+
+        return f'@{self.user.username} в посте {self.post_id}'
+
+
+class ArchivedPost(models.Model):
+    """
+    Архивная копия поста, перенесённая командой archive_posts.
+    Сохраняет id исходного поста, поэтому старые ссылки продолжают работать.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('текст поста')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='автор поста'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        verbose_name='группа поста',
+        blank=True,
+        null=True
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True,
+    )
+    thumbnail = models.CharField(
+        'Миниатюра',
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text='Путь миниатюры картинки, его записывает make_thumbnails'
+    )
+    created = models.DateTimeField('Дата создания')
+    archived = models.DateTimeField('Дата архивации', auto_now_add=True)
+
+    objects = AuthoredQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['author', '-created'],
+                         name='archived_author_created_idx'),
+        ]
+        verbose_name = 'архивный пост'
+        verbose_name_plural = 'архивные посты'
+
+    def __str__(self) -> str:
+
+        return self.text[:CHARS_LIMIT]
+
+
+class ArchivedComment(models.Model):
+    """Архивная копия комментария к посту из ArchivedPost."""
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('текст комментария')
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='пост, к которому относится комментарий'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='автор комментария'
+    )
+    created = models.DateTimeField('Дата создания')
+
+    objects = AuthoredQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='archived_comment_post_idx'),
+        ]
+        verbose_name = 'архивный комментарий'
+        verbose_name_plural = 'архивные комментарии'
+
+    def __str__(self) -> str:
+
+        return self.text[:CHARS_LIMIT]
+
+
+class PendingDeletion(CreatedModel):
+    """
+    Отметка о мягком удалении пользователя или группы.
+    Контент помеченного пользователя сразу скрывается из лент,
+    а сами записи удаляются пачками задачей purge_deletion.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pending_deletion',
+        verbose_name='пользователь',
+        blank=True,
+        null=True
+    )
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='pending_deletion',
+        verbose_name='группа',
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=(models.Q(user__isnull=False, group__isnull=True)
+                       | models.Q(user__isnull=True, group__isnull=False)),
+                name='pending_deletion_user_or_group'),
+        ]
+        verbose_name = 'ожидает удаления'
+        verbose_name_plural = 'ожидают удаления'
+
+    def __str__(self) -> str:
+
+        return f'Удаление: {self.user or self.group}'
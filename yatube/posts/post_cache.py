@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .constants import POST_CACHE_SECONDS
+from .models import ArchivedPost, Post
+from .tasks import make_thumbnails, thumbnails_key
+
+# Поле кэшируемого поста: путь поля для values_list.
+CACHED_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'thumbnail': 'thumbnail',
+}
+
+
+def cache_key(post_id):
+    return f'post:{post_id}'
+
+
+def build_payload(row):
+    """
+    Готовит пост к кэшу: пути картинки и миниатюры превращаются в URL.
+    Путь миниатюры записывает задача make_thumbnails, так что промах
+    кэша не обращается к sorl-thumbnail.
+    """
+    post = dict(zip(CACHED_FIELDS, row))
+    for field in ('image', 'thumbnail'):
+        path = post[field]
+        post[field] = settings.MEDIA_URL + path if path else None
+
+    return post
+
+
+def get_posts(post_ids):
+    """
+    Возвращает словарь {id: пост} для найденных постов.
+    Попадания в кэш не трогают БД; промахи читаются одним запросом
+    к Post с автором и группой и ещё одним - к архиву,
+    затем кладутся в кэш одним set_many. Посты, чья миниатюра ещё
+    не нарезана, отдаются без неё и не кэшируются, а нарезка ставится
+    в очередь.
+    """
+    keys = {cache_key(post_id): post_id for post_id in post_ids}
+    posts = {keys[key]: post for key, post in cache.get_many(keys).items()}
+    missing = [post_id for post_id in post_ids if post_id not in posts]
+    found = {}
+    ready = {}
+    for model in (Post, ArchivedPost):
+        if not missing:
+            break
+        rows = (model.objects.visible().filter(pk__in=missing)
+                .values_list(*CACHED_FIELDS.values()))
+        for row in rows:
+            paths = dict(zip(CACHED_FIELDS, row))
+            post_id = paths['id']
+            found[post_id] = build_payload(row)
+            if paths['image'] and not paths['thumbnail']:
+                make_thumbnails.enqueue(
+                    [post_id], key=thumbnails_key(post_id, paths['image']))
+            else:
+                ready[cache_key(post_id)] = found[post_id]
+        missing = [post_id for post_id in missing if post_id not in found]
+    if ready:
+        cache.set_many(ready, POST_CACHE_SECONDS)
+
+    return posts | found
+
+
+def invalidate_posts(post_ids):
+    cache.delete_many([cache_key(post_id) for post_id in post_ids])
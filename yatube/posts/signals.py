@@ -0,0 +1,141 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .autocomplete import GROUP, USER, autocomplete_index
+from .events import publish_comment, publish_post
+from .models import (ArchivedPost, Comment, Group, PendingDeletion, Post,
+                     User)
+from .post_cache import invalidate_posts
+from .tasks import make_thumbnails, sync_post_tags, thumbnails_key
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, **kwargs):
+    """
+    Обновляет пользователя в индексе автодополнения. Помеченный
+    на удаление пользователь в индекс не возвращается.
+    """
+    if not autocomplete_index.is_built:
+        return
+    if PendingDeletion.objects.filter(user=instance).exists():
+        autocomplete_index.discard(USER, instance.pk)
+    else:
+        autocomplete_index.put_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    autocomplete_index.discard(USER, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def index_group(sender, instance, **kwargs):
+    """
+    Обновляет группу в индексе автодополнения. Помеченная
+    на удаление группа в индекс не возвращается.
+    """
+    if not autocomplete_index.is_built:
+        return
+    if PendingDeletion.objects.filter(group=instance).exists():
+        autocomplete_index.discard(GROUP, instance.pk)
+    else:
+        autocomplete_index.put_group(instance)
+
+
+@receiver(post_delete, sender=Group)
+def unindex_group(sender, instance, **kwargs):
+    autocomplete_index.discard(GROUP, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def parse_post_tags(sender, instance, raw=False, **kwargs):
+    """
+    Ставит в очередь разбор хэштегов и упоминаний сохранённого поста
+    и нарезку миниатюры его картинки.
+    """
+    if raw:
+        return
+    sync_post_tags.delay(instance.pk)
+    if instance.image:
+        make_thumbnails.enqueue(
+            [instance.pk], key=thumbnails_key(instance.pk, instance.image))
+
+
+@receiver(post_save, sender=Post)
+def announce_post(sender, instance, created, raw=False, **kwargs):
+    """После коммита сообщает открытым лентам о новом посте."""
+    if created and not raw:
+        transaction.on_commit(partial(publish_post, instance))
+
+
+@receiver(post_save, sender=Comment)
+def announce_comment(sender, instance, created, raw=False, **kwargs):
+    """После коммита рассылает новый комментарий открытым страницам поста."""
+    if created and not raw:
+        transaction.on_commit(partial(publish_comment, instance))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_cached_post(sender, instance, **kwargs):
+    """Сбрасывает пост в кэше постов после изменения или удаления."""
+    invalidate_posts([instance.pk])
+
+
+def invalidate_posts_where(**lookup):
+    """Сбрасывает в кэше постов актуальные и архивные посты по lookup."""
+    invalidate_posts([
+        *Post.objects.filter(**lookup).values_list('pk', flat=True),
+        *ArchivedPost.objects.filter(**lookup).values_list('pk', flat=True),
+    ])
+
+
+@receiver(post_save, sender=PendingDeletion)
+def invalidate_deleted_posts(sender, instance, **kwargs):
+    """
+    Посты автора, ожидающего удаления, не должны отдаваться из кэша,
+    а посты удаляемой группы - ссылаться на неё.
+    """
+    if instance.user_id is not None:
+        invalidate_posts_where(author_id=instance.user_id)
+    else:
+        invalidate_posts_where(group_id=instance.group_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_posts(sender, instance, created, raw=False,
+                            update_fields=None, **kwargs):
+    """
+    Сбрасывает кэш постов автора: в нём хранится его username.
+    Сохранения без username (например, last_login при входе) пропускаются.
+    """
+    if created or raw:
+        return
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    invalidate_posts_where(author_id=instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_posts(sender, instance, created, raw=False,
+                           update_fields=None, **kwargs):
+    """Сбрасывает кэш постов группы: в нём хранится её slug."""
+    if created or raw:
+        return
+    if update_fields is not None and 'slug' not in update_fields:
+        return
+    invalidate_posts_where(group_id=instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def forget_stale_thumbnail(sender, instance, raw=False, **kwargs):
+    """Если у поста сменилась картинка, забывает миниатюру прежней."""
+    if instance.pk is None or raw:
+        return
+    image = (Post.objects.filter(pk=instance.pk)
+             .values_list('image', flat=True).first())
+    if image != instance.image.name:
+        instance.thumbnail = ''
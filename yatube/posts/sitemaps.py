@@ -0,0 +1,227 @@
+from abc import ABC, abstractmethod
+
+from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps.views import sitemap
+from django.core.cache import cache
+from django.db.models import Count, F, Max
+from django.http import Http404, HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import reverse
+
+from .constants import (SITEMAP_CACHE_SECONDS, SITEMAP_SEGMENT_SIZE,
+                        SITEMAP_VERSIONS_SECONDS)
+from .models import ArchivedPost, Group, Post, User
+
+
+def segment_versions(queryset, *fields):
+    """
+    Версии сегментов одним запросом к БД: {сегмент: (число записей,
+    наибольшее из значений fields)}. Пустые сегменты в ответ не попадают.
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(segment=(F('pk') - 1) / SITEMAP_SEGMENT_SIZE + 1)
+        .values('segment')
+        .annotate(count=Count('pk', distinct=True),
+                  **{f'last_{field}': Max(field) for field in fields})
+        .values_list('segment', 'count',
+                     *(f'last_{field}' for field in fields))
+    )
+
+    return {
+        segment: (count, max(filter(None, lastmods), default=None))
+        for segment, count, *lastmods in rows
+    }
+
+
+def merge_versions(*versions):
+    merged = {}
+    for version in versions:
+        for segment, (count, lastmod) in version.items():
+            total, latest = merged.get(segment, (0, None))
+            merged[segment] = (
+                total + count,
+                max(filter(None, (latest, lastmod)), default=None))
+
+    return merged
+
+
+class SegmentSitemap(Sitemap, ABC):
+    """
+    Часть карты сайта: записи одного диапазона id.
+    Сегменты по id не сдвигаются при удалении записей,
+    поэтому изменение записи меняет только её сегмент.
+    """
+    limit = SITEMAP_SEGMENT_SIZE
+
+    def __init__(self, segment):
+        self.segment = segment
+
+    def id_range(self):
+        """Сегмент n - это записи с id от (n-1)*size+1 до n*size."""
+        start = (self.segment - 1) * SITEMAP_SEGMENT_SIZE + 1
+        return start, start + SITEMAP_SEGMENT_SIZE - 1
+
+    @classmethod
+    @abstractmethod
+    def versions(cls):
+        """
+        Версии непустых сегментов раздела по БД: {сегмент: (число записей,
+        время последнего изменения)}. Подклассы считают их через
+        segment_versions().
+        """
+
+
+class PostSitemap(SegmentSitemap):
+    """Страницы постов, включая архивные."""
+    changefreq = 'monthly'
+
+    def items(self):
+        posts = [
+            *Post.objects.visible().filter(pk__range=self.id_range())
+            .values_list('pk', 'updated'),
+            *ArchivedPost.objects.visible().filter(pk__range=self.id_range())
+            .values_list('pk', 'created'),
+        ]
+
+        return sorted(posts)
+
+    def location(self, item):
+        return reverse('posts:post_detail', args=[item[0]])
+
+    def lastmod(self, item):
+        return item[1]
+
+    @classmethod
+    def versions(cls):
+        return merge_versions(
+            segment_versions(Post.objects.visible(), 'updated'),
+            segment_versions(ArchivedPost.objects.visible(), 'created'),
+        )
+
+
+class ProfileSitemap(SegmentSitemap):
+    """Профили активных авторов; lastmod - дата последнего поста."""
+    changefreq = 'weekly'
+
+    def items(self):
+        return list(
+            User.objects.filter(pk__range=self.id_range(), is_active=True,
+                                pending_deletion__isnull=True)
+            .annotate(last_post=Max('posts__created'))
+            .order_by('pk')
+            .values_list('username', 'last_post', 'date_joined')
+        )
+
+    def location(self, item):
+        return reverse('posts:profile', args=[item[0]])
+
+    def lastmod(self, item):
+        return item[1] or item[2]
+
+    @classmethod
+    def versions(cls):
+        return segment_versions(
+            User.objects.filter(is_active=True,
+                                pending_deletion__isnull=True),
+            'posts__created', 'date_joined')
+
+
+class GroupSitemap(SegmentSitemap):
+    """Страницы групп; lastmod - дата последнего поста группы."""
+    changefreq = 'daily'
+
+    def items(self):
+        return list(
+            Group.objects.filter(pk__range=self.id_range(),
+                                 pending_deletion__isnull=True)
+            .annotate(last_post=Max('posts__created'))
+            .order_by('pk')
+            .values_list('slug', 'last_post')
+        )
+
+    def location(self, item):
+        return reverse('posts:group_list', args=[item[0]])
+
+    def lastmod(self, item):
+        return item[1]
+
+    @classmethod
+    def versions(cls):
+        return segment_versions(
+            Group.objects.filter(pending_deletion__isnull=True),
+            'posts__created')
+
+
+SECTIONS = {
+    'posts': PostSitemap,
+    'profiles': ProfileSitemap,
+    'groups': GroupSitemap,
+}
+
+
+def cached_versions(section):
+    """
+    Версии сегментов раздела. Агрегат идёт по всей таблице, поэтому
+    результат кэшируется на SITEMAP_VERSIONS_SECONDS: изменения
+    попадают в индекс и сегменты с такой задержкой, одинаковой
+    для всех процессов.
+    """
+    key = f'sitemap:versions:{section}'
+    versions = cache.get(key)
+    if versions is None:
+        versions = SECTIONS[section].versions()
+        cache.set(key, versions, SITEMAP_VERSIONS_SECONDS)
+
+    return versions
+
+
+def sitemap_index(request):
+    """
+    Индекс карты сайта: непустые сегменты всех разделов с lastmod -
+    временем последнего изменения записей сегмента по БД. Краулер
+    перечитывает только изменившиеся сегменты.
+    """
+    entries = [
+        {
+            'location': request.build_absolute_uri(
+                reverse('sitemap_segment', args=[section, segment])),
+            'last_mod': lastmod,
+        }
+        for section in SECTIONS
+        for segment, (_, lastmod) in sorted(cached_versions(section).items())
+    ]
+
+    return TemplateResponse(request, 'sitemap_index.xml',
+                            {'sitemaps': entries},
+                            content_type='application/xml')
+
+
+def sitemap_segment(request, section, segment):
+    """
+    Один сегмент карты сайта. Отрендеренный XML кэшируется под ключом
+    с версией сегмента (число записей и последнее изменение, см.
+    cached_versions), так что пересобираются только сегменты,
+    в которых что-то поменялось.
+    Правки, не меняющие версию (например, смена slug группы), видны
+    после SITEMAP_CACHE_SECONDS.
+    """
+    if section not in SECTIONS or segment < 1:
+        raise Http404('Нет такого раздела карты сайта.')
+    count, lastmod = cached_versions(section).get(segment, (0, None))
+    stamp = lastmod.timestamp() if lastmod else 0
+    key = f'sitemap:{request.get_host()}:{section}:{segment}:{count}:{stamp}'
+    cached = cache.get(key)
+    if cached is None:
+        response = sitemap(
+            request, {section: SECTIONS[section](segment)}, section=section)
+        response.render()
+        cached = (response.content, response.get('Last-Modified'))
+        cache.set(key, cached, SITEMAP_CACHE_SECONDS)
+    content, last_modified = cached
+    response = HttpResponse(content, content_type='application/xml')
+    response['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    if last_modified:
+        response['Last-Modified'] = last_modified
+
+    return response
@@ -0,0 +1,40 @@
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import task
+from .constants import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+from .models import ArchivedPost, Post
+from .utils import sync_tags_and_mentions
+
+
+@task()
+def sync_post_tags(post_id):
+    """Пересобирает хэштеги и упоминания поста."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        sync_tags_and_mentions([post])
+
+
+def thumbnails_key(post_id, image):
+    """Ключ, по которому нарезка картинки ставится в очередь один раз."""
+    return f'thumbnails:{post_id}:{image}'
+
+
+@task(queue='media')
+def make_thumbnails(post_id):
+    """
+    Заранее нарезает миниатюру картинки поста того же размера,
+    что и в шаблонах, чтобы первый просмотр ленты её не ждал,
+    и запоминает её путь в посте для API. Пока пути нет, пост
+    в кэш постов не попадает, так что сбрасывать его не нужно.
+    """
+    for model in (Post, ArchivedPost):
+        post = model.objects.filter(pk=post_id).first()
+        if post is None:
+            continue
+        if post.image:
+            thumbnail = get_thumbnail(post.image, THUMBNAIL_GEOMETRY,
+                                      **THUMBNAIL_OPTIONS)
+            # Картинку могли заменить, пока нарезалась миниатюра.
+            model.objects.filter(pk=post_id, image=post.image.name).update(
+                thumbnail=thumbnail.name)
+        return
@@ -0,0 +1,11 @@
+"""URL сайта в том виде, в каком они собираются под ASGI: с потоками SSE."""
+from django.urls import include, path
+
+from posts import urls as posts_urls
+from yatube.urls import urlpatterns as site_urlpatterns
+
+urlpatterns = [
+    path('', include((posts_urls.urlpatterns + posts_urls.sse_urlpatterns,
+                      posts_urls.app_name))),
+] + [pattern for pattern in site_urlpatterns
+     if getattr(pattern, 'namespace', None) != posts_urls.app_name]
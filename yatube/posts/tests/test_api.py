@@ -0,0 +1,283 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Task
+from core.tasks import execute
+from ..archive import archive_posts
+from ..deletion import (process_deletions, schedule_group_deletion,
+                        schedule_user_deletion)
+from ..models import Comment, Follow, Group, Post, User
+from ..tasks import make_thumbnails
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.user, group=cls.group,
+                                text=f'Пост {number}')
+            for number in range(5)
+        ]
+        # Одинаковая дата у части постов проверяет порядок по id.
+        moment = timezone.now()
+        Post.objects.filter(pk__in=[post.pk for post in cls.posts[:3]]
+                            ).update(created=moment)
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Коммент')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def walk(self, url, client=None):
+        """Проходит все страницы ленты по ссылкам next."""
+        client = client or self.client
+        ids = []
+        while url:
+            data = client.get(url).json()
+            ids += [post['id'] for post in data['results']]
+            url = data['next']
+
+        return ids
+
+    def test_cursor_pagination_walks_feed_once(self):
+        """Курсор проходит ленту без пропусков и повторов."""
+        expected = list(Post.objects.order_by('-created', 'id')
+                        .values_list('id', flat=True))
+        self.assertEqual(
+            self.walk(reverse('posts:api_index') + '?limit=2'), expected)
+
+    def test_feeds(self):
+        """Ленты группы, профиля и подписок отдают посты автора."""
+        urls = [
+            reverse('posts:api_group_posts', args=[self.group.slug]),
+            reverse('posts:api_profile', args=[self.user.username]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(len(self.walk(url + '?limit=3')), 5)
+        self.assertEqual(len(self.walk(reverse('posts:api_follow_index'),
+                                       self.reader_client)), 5)
+        response = self.client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_sparse_fields(self):
+        """fields= ограничивает поля ответа, неизвестное поле - 400."""
+        url = reverse('posts:api_index')
+        data = self.client.get(url + '?fields=id,author').json()
+        self.assertEqual(data['results'][0].keys(), {'id', 'author'})
+        self.assertEqual(data['results'][0]['author'], 'writer')
+        response = self.client.get(url + '?fields=password')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(url + '?cursor=broken')
+        self.assertEqual(response.status_code, 400)
+
+    def test_compact_json(self):
+        """Ответ без пробелов-разделителей и с кириллицей как есть."""
+        content = self.client.get(
+            reverse('posts:api_index') + '?fields=text&limit=1'
+        ).content.decode()
+        self.assertTrue(content.startswith('{"results":[{"text":"Пост'))
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся с первой страницей комментариев."""
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=[self.posts[0].pk])).json()
+        self.assertEqual(data['text'], 'Пост 0')
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertIsNone(data['image'])
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']['results']],
+            ['Коммент'])
+        response = self.client.get(
+            reverse('posts:api_post_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_profile_continues_into_archive(self):
+        """Лента профиля после живых постов продолжается архивом."""
+        Post.objects.filter(pk=self.posts[4].pk).update(
+            created=timezone.now() - timedelta(days=400))
+        list(archive_posts(timezone.now() - timedelta(days=365)))
+        ids = self.walk(reverse('posts:api_profile',
+                                args=[self.user.username]) + '?limit=2')
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(ids[-1], self.posts[4].pk)
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=[self.posts[4].pk])).json()
+        self.assertEqual(data['text'], 'Пост 4')
+
+    def test_feed_does_not_build_models(self):
+        """Лента читается одним запросом без загрузки моделей."""
+        with self.assertNumQueries(1):
+            self.client.get(reverse('posts:api_index'))
+
+    def batch(self, *ids, fields='id,text'):
+        url = reverse('posts:api_posts_batch')
+        return self.client.get(
+            f'{url}?ids={",".join(map(str, ids))}&fields={fields}')
+
+    def test_batch_keeps_order_and_reports_missing(self):
+        """Посты отдаются в порядке ids, ненайденные - в missing."""
+        ids = [self.posts[3].pk, 0, self.posts[1].pk]
+        data = self.batch(*ids).json()
+        self.assertEqual([post['id'] for post in data['results']],
+                         [self.posts[3].pk, self.posts[1].pk])
+        self.assertEqual(data['missing'], [0])
+        self.assertEqual(self.batch(*range(1, 102)).status_code, 400)
+        self.assertEqual(self.batch('x').status_code, 400)
+
+    def test_batch_fixed_queries_then_cache(self):
+        """Промахи читаются одним запросом, попадания - без БД."""
+        ids = [post.pk for post in self.posts]
+        with self.assertNumQueries(1):
+            data = self.batch(*ids, fields='author,group,thumbnail').json()
+        self.assertEqual(data['results'][0],
+                         {'author': 'writer', 'group': self.group.slug,
+                          'thumbnail': None})
+        with self.assertNumQueries(0):
+            self.batch(*ids)
+
+    def test_cache_invalidated(self):
+        """Правка поста и удаление автора сбрасывают кэш."""
+        post = self.posts[0]
+        self.batch(post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        data = self.batch(post.pk).json()
+        self.assertEqual(data['results'][0]['text'], 'Исправленный пост')
+        schedule_user_deletion(self.user)
+        self.assertEqual(self.batch(post.pk).json()['missing'], [post.pk])
+
+    def test_cache_follows_author_and_group(self):
+        """
+        Смена username и slug, мягкое и окончательное удаление группы
+        сбрасывают кэш постов.
+        """
+        post = self.posts[0]
+
+        def cached():
+            return self.batch(post.pk, fields='author,group').json()[
+                'results'][0]
+
+        user = User.objects.get(pk=self.user.pk)
+        group = Group.objects.get(pk=self.group.pk)
+        cached()
+        user.username = 'renamed'
+        user.save()
+        group.slug = 'renamed-slug'
+        group.save()
+        self.assertEqual(cached(), {'author': 'renamed',
+                                    'group': 'renamed-slug'})
+        user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            cached()
+        schedule_group_deletion(group)
+        with self.assertNumQueries(1):
+            cached()
+        list(process_deletions(pause=0))
+        self.assertEqual(cached(), {'author': 'renamed', 'group': None})
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_ALWAYS_EAGER=True)
+class ApiImagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='photographer')
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.posts = [
+                Post.objects.create(
+                    author=cls.user, text=f'Пост {number}',
+                    image=SimpleUploadedFile(
+                        f'small_{number}.gif', SMALL_GIF,
+                        content_type='image/gif'))
+                for number in range(5)
+            ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def batch(self, *posts):
+        url = reverse('posts:api_posts_batch')
+        ids = ','.join(str(post.pk) for post in posts)
+
+        return self.client.get(f'{url}?ids={ids}&fields=id,image,thumbnail')
+
+    def test_thumbnails_without_extra_queries(self):
+        """
+        Миниатюры уже нарезаны задачей, поэтому промах кэша по постам
+        с картинками - тот же один запрос, сколько бы их ни было.
+        """
+        with self.assertNumQueries(1):
+            self.batch(self.posts[0])
+        cache.clear()
+        with self.assertNumQueries(1):
+            data = self.batch(*self.posts).json()
+        for post, result in zip(self.posts, data['results']):
+            post.refresh_from_db()
+            with self.subTest(post=post.pk):
+                self.assertTrue(post.thumbnail)
+                self.assertEqual(result['thumbnail'],
+                                 settings.MEDIA_URL + post.thumbnail)
+                self.assertEqual(result['image'], post.image.url)
+
+    def test_missing_thumbnail_made_and_not_cached(self):
+        """Пост без миниатюры не кэшируется, а нарезка ставится в очередь."""
+        post = self.posts[0]
+        Post.objects.filter(pk=post.pk).update(thumbnail='')
+        with self.settings(TASKS_ALWAYS_EAGER=False):
+            data = self.batch(post).json()
+            self.assertIsNone(data['results'][0]['thumbnail'])
+            self.assertTrue(Task.objects.filter(
+                name=make_thumbnails.name, args=[post.pk]).exists())
+        execute(Task.objects.get(name=make_thumbnails.name, args=[post.pk]))
+        data = self.batch(post).json()
+        self.assertIsNotNone(data['results'][0]['thumbnail'])
+
+    def test_new_image_forgets_thumbnail(self):
+        """Замена картинки сбрасывает миниатюру прежней."""
+        post = self.posts[1]
+        post.refresh_from_db()
+        old_thumbnail = post.thumbnail
+        with self.settings(TASKS_ALWAYS_EAGER=False):
+            post.image = SimpleUploadedFile('other.gif', SMALL_GIF,
+                                            content_type='image/gif')
+            post.save()
+        post.refresh_from_db()
+        self.assertTrue(old_thumbnail)
+        self.assertEqual(post.thumbnail, '')
@@ -0,0 +1,85 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..constants import POSTS_LIMIT
+from ..models import ArchivedComment, ArchivedPost, Comment, Post, User
+
+
+class ArchiveTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='archive_test')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Старый пост {number}')
+            for number in range(POSTS_LIMIT)
+        )
+        cls.old_post = Post.objects.create(
+            author=cls.user, text='Самый старый')
+        Comment.objects.create(
+            post=cls.old_post, author=cls.user, text='Старый коммент')
+        Post.objects.update(created=timezone.now() - timedelta(days=400))
+        cls.old_post.refresh_from_db()
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            created=cls.old_post.created - timedelta(days=1))
+        cls.new_post = Post.objects.create(author=cls.user, text='Новый пост')
+
+    def archive(self):
+        call_command('archive_posts', days=365, batch_size=4,
+                     stdout=StringIO())
+
+    def test_command_moves_old_posts_and_comments(self):
+        """Команда переносит старые посты с комментариями в архив."""
+        self.archive()
+        self.assertEqual(list(Post.objects.all()), [self.new_post])
+        self.assertEqual(ArchivedPost.objects.count(), POSTS_LIMIT + 1)
+        self.assertFalse(Comment.objects.exists())
+        comment = ArchivedComment.objects.get()
+        self.assertEqual(comment.post_id, self.old_post.pk)
+
+    def test_archived_ids_not_reused(self):
+        """Новый пост не получает id архивного поста."""
+        Post.objects.filter(pk=self.new_post.pk).update(
+            created=timezone.now() - timedelta(days=400))
+        self.archive()
+        self.assertEqual(list(Post.objects.all()), [self.new_post])
+        Post.objects.filter(pk=self.new_post.pk).delete()
+        post = Post.objects.create(author=self.user, text='Свежий пост')
+        self.assertGreater(post.pk, self.new_post.pk)
+        self.assertFalse(ArchivedPost.objects.filter(pk=post.pk).exists())
+        response = self.client.get(
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.old_post.pk}))
+        self.assertTrue(response.context['is_archived'])
+        self.assertEqual(response.context['post'].text, self.old_post.text)
+
+    def test_post_detail_falls_back_to_archive(self):
+        """Архивный пост доступен по старому адресу с комментариями."""
+        self.archive()
+        response = self.client.get(
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.old_post.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_archived'])
+        self.assertEqual(response.context['post'].text, self.old_post.text)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Старый коммент'])
+        self.assertEqual(response.context['posts_count'], POSTS_LIMIT + 2)
+
+    def test_profile_pages_through_archive(self):
+        """Профиль после постов из Post выводит архивные посты."""
+        self.archive()
+        url = reverse('posts:profile',
+                      kwargs={'username': self.user.username})
+        first_page = self.client.get(url).context['page_obj']
+        self.assertEqual(first_page.paginator.count, POSTS_LIMIT + 2)
+        self.assertEqual(first_page[0], self.new_post)
+        self.assertIsInstance(first_page[1], ArchivedPost)
+        last_page = self.client.get(url, {'page': 2}).context['page_obj']
+        self.assertEqual(list(last_page)[-1].pk, self.old_post.pk)
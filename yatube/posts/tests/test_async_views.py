@@ -0,0 +1,68 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from .. import async_views
+from ..models import Comment, Follow, Group, Post, User
+
+
+class AsyncViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='async_test')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Асинхронный пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.follower, text='Асинхронный коммент')
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, view, user=None, **kwargs):
+        request = RequestFactory().get('/')
+        request.user = user or AnonymousUser()
+
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_feeds_render_posts(self):
+        """Асинхронные ленты выводят посты."""
+        views_and_kwargs = [
+            (async_views.index, {}),
+            (async_views.group_posts, {'slug': self.group.slug}),
+            (async_views.profile, {'username': self.user.username}),
+        ]
+        for view, kwargs in views_and_kwargs:
+            with self.subTest(view=view.__name__):
+                response = self.get(view, **kwargs)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, self.post.text)
+
+    def test_profile_counters_and_following(self):
+        """Профиль выводит счётчики и кнопку отписки подписчику."""
+        with self.assertTemplateUsed('posts/profile.html'):
+            response = self.get(async_views.profile, user=self.follower,
+                                username=self.user.username)
+        self.assertContains(response, '<td>1</td>', count=2)
+        self.assertContains(response, 'Отписаться')
+
+    def test_post_detail(self):
+        """Страница поста выводит пост и комментарии."""
+        response = self.get(async_views.post_detail, post_id=self.post.pk)
+        self.assertContains(response, self.post.text)
+        self.assertContains(response, 'Асинхронный коммент')
+
+    def test_follow_index(self):
+        """Лента подписок доступна только авторизованному юзеру."""
+        response = self.get(async_views.follow_index)
+        self.assertEqual(response.status_code, 302)
+        response = self.get(async_views.follow_index, user=self.follower)
+        self.assertContains(response, self.post.text)
@@ -0,0 +1,111 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from ..autocomplete import GROUP, USER, PrefixIndex, autocomplete_index
+from ..deletion import schedule_group_deletion, schedule_user_deletion
+from ..models import Group, User
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Литература',
+            slug='books',
+            description='Описание группы',
+        )
+
+    def setUp(self):
+        super().setUp()
+        autocomplete_index.clear()
+
+    def tearDown(self):
+        autocomplete_index.clear()
+        super().tearDown()
+
+    def test_search_by_username_full_name_and_group(self):
+        """Индекс находит объекты по любому из их ключей."""
+        queries_and_expected = {
+            'le': (USER, 'leo'),
+            'лев т': (USER, 'leo'),
+            'ТОЛ': (USER, 'leo'),
+            'лит': (GROUP, 'books'),
+            'boo': (GROUP, 'books'),
+        }
+        for query, (kind, value) in queries_and_expected.items():
+            with self.subTest(query=query):
+                results = autocomplete_index.search(query)
+                self.assertEqual(len(results), 1)
+                self.assertEqual(results[0]['type'], kind)
+                self.assertEqual(results[0]['value'], value)
+
+    def test_search_does_not_query_db_after_build(self):
+        """После построения индекса поиск не обращается к БД."""
+        autocomplete_index.build()
+        with self.assertNumQueries(0):
+            autocomplete_index.search('l')
+
+    def test_index_updated_by_signals(self):
+        """Сохранение и удаление объектов обновляет индекс."""
+        autocomplete_index.build()
+        new_user = User.objects.create_user(username='leonid')
+        self.assertEqual(len(autocomplete_index.search('leon')), 1)
+        self.group.title = 'Поэзия'
+        self.group.save()
+        self.assertEqual(autocomplete_index.search('лит'), [])
+        self.assertEqual(len(autocomplete_index.search('поэ')), 1)
+        new_user.delete()
+        self.assertEqual(autocomplete_index.search('leon'), [])
+
+    def test_pending_deletions_not_indexed(self):
+        """
+        Помеченные на удаление объекты не попадают в индекс ни при
+        построении, ни при повторном сохранении.
+        """
+        user = User.objects.create_user(username='leonid')
+        group = Group.objects.create(title='Поэзия', slug='poetry')
+        schedule_user_deletion(user)
+        schedule_group_deletion(group)
+        autocomplete_index.build()
+        self.assertEqual(autocomplete_index.search('leon'), [])
+        self.assertEqual(autocomplete_index.search('поэ'), [])
+        user.save()
+        group.save()
+        self.assertEqual(autocomplete_index.search('leon'), [])
+        self.assertEqual(autocomplete_index.search('поэ'), [])
+
+    def test_index_respects_max_entries(self):
+        """Индекс не растёт больше max_entries ключей."""
+        index = PrefixIndex(max_entries=3)
+        self.assertTrue(index.put(USER, 1, 'a', 'a', ['a1', 'a2']))
+        self.assertFalse(index.put(USER, 2, 'b', 'b', ['b1', 'b2']))
+        self.assertEqual(len(index), 2)
+
+    def test_put_over_limit_keeps_old_entry(self):
+        """Обновление сверх лимита не удаляет прежнюю запись объекта."""
+        index = PrefixIndex(max_entries=3)
+        index.is_built = True
+        self.assertTrue(index.put(USER, 1, 'a', 'a', ['a1', 'a2']))
+        self.assertTrue(index.put(USER, 1, 'a', 'a', ['a3', 'a4', 'a5']))
+        self.assertEqual([item['value'] for item in index.search('a3')],
+                         ['a'])
+        self.assertFalse(
+            index.put(USER, 1, 'a', 'a', ['a6', 'a7', 'a8', 'a9']))
+        self.assertEqual(len(index), 3)
+        self.assertEqual([item['value'] for item in index.search('a3')],
+                         ['a'])
+
+    def test_autocomplete_view(self):
+        """Эндпоинт возвращает подсказки со ссылками."""
+        response = self.client.get(reverse('posts:autocomplete'),
+                                   {'q': 'Le'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{
+            'type': USER,
+            'value': 'leo',
+            'label': 'Лев Толстой',
+            'url': reverse('posts:profile', args=['leo']),
+        }])
@@ -0,0 +1,56 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..models import Comment, Post
+
+
+class BenchmarkCommandTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        call_command('generate_load_data', users=20, groups=3, posts=60,
+                     comments=30, follows=40, stdout=StringIO())
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = Path(directory.name) / 'baseline.json'
+
+    def benchmark(self, **options):
+        out = StringIO()
+        call_command('benchmark', requests=3, warmup=1, stdout=out,
+                     stderr=StringIO(), **options)
+
+        return out.getvalue()
+
+    def test_reports_all_scenarios(self):
+        """Отчёт по каждому сценарию, записи идут от вошедшего юзера."""
+        posts = Post.objects.count()
+        comments = Comment.objects.count()
+        output = self.benchmark(json=str(self.baseline))
+        results = json.loads(self.baseline.read_text())
+        self.assertEqual(list(results), [
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create', 'add_comment'])
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertIn(name, output)
+                self.assertEqual(result['errors'], 0)
+        self.assertEqual(Post.objects.count(), posts + 4)
+        self.assertEqual(Comment.objects.count(), comments + 4)
+
+    def test_baseline_regression(self):
+        """Рост запросов к БД против --baseline - ошибка команды."""
+        self.baseline.write_text(json.dumps(
+            {'index': {'p95_ms': 10 ** 6, 'queries': 0.1}}))
+        with self.assertRaisesMessage(CommandError, 'index'):
+            self.benchmark(scenarios=['index'], baseline=str(self.baseline))
+        self.baseline.write_text(json.dumps(
+            {'index': {'p95_ms': 10 ** 6, 'queries': 100}}))
+        self.assertIn('Регрессий нет', self.benchmark(
+            scenarios=['index'], baseline=str(self.baseline)))
@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Task
+from core.tasks import execute
+from ..deletion import schedule_group_deletion, schedule_user_deletion
+from ..models import (Comment, Follow, Group, PendingDeletion, Post, Tag,
+                      User)
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class DeletionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='prolific')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {number}')
+            for number in range(5)
+        )
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text='Пост #тег @reader')
+        cls.reader_post = Post.objects.create(
+            author=cls.reader, group=cls.group, text='Пост читателя')
+        Comment.objects.create(
+            post=cls.reader_post, author=cls.author, text='Коммент автора')
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Коммент читателя')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def process(self):
+        call_command('process_deletions', batch_size=2, pause=0,
+                     stdout=StringIO())
+
+    def test_soft_deleted_user_hidden_immediately(self):
+        """Контент помеченного на удаление автора сразу скрыт."""
+        schedule_user_deletion(self.author)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.reader_post])
+        response = self.client.get(
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.reader_post.pk}))
+        self.assertEqual(list(response.context['comments']), [])
+        urls = [
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 6)
+
+    def test_process_deletes_user_content_in_batches(self):
+        """Команда удаляет пользователя и все его записи."""
+        schedule_user_deletion(self.author)
+        self.process()
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.reader_post])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(PendingDeletion.objects.exists())
+        self.assertTrue(Tag.objects.filter(name='тег').exists())
+
+    def test_deletion_queued_as_task(self):
+        """
+        Пометка ставит удаление в очередь даже в eager-режиме,
+        и задача удаляет пользователя с его записями.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_user_deletion(self.author)
+            schedule_user_deletion(self.author)
+        task = Task.objects.get(name='posts.deletion.purge_deletion')
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(execute(task), Task.DONE)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.reader_post])
+
+    def test_group_deletion(self):
+        """Группа сразу недоступна, посты остаются без группы."""
+        schedule_group_deletion(self.group)
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}))
+        self.assertEqual(response.status_code, 404)
+        self.process()
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group__isnull=True).count(), 7)
+
+    def test_admin_delete_schedules_deletion(self):
+        """Удаление в админке только помечает пользователя."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.post(
+            reverse('admin:auth_user_delete', args=[self.author.pk]),
+            {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+        self.assertTrue(
+            PendingDeletion.objects.filter(user=self.author).exists())
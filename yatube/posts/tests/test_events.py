@@ -0,0 +1,183 @@
+import asyncio
+import json
+import socket
+import tempfile
+import threading
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import NoReverseMatch, reverse
+
+from core.pubsub import Broker, broker
+from .. import async_views
+from ..events import POSTS_TOPIC, comments_topic
+from ..models import Comment, Follow, Post, User
+
+
+class BrokerTest(TestCase):
+    def test_publish_from_other_thread(self):
+        """Сообщение из другого потока доходит до всех подписчиков темы."""
+        local_broker = Broker()
+
+        async def scenario():
+            async with local_broker.subscribe('topic') as first, \
+                    local_broker.subscribe('topic') as second:
+                thread = threading.Thread(target=local_broker.publish,
+                                          args=('topic', 'event', 1))
+                thread.start()
+                thread.join()
+                return await asyncio.gather(
+                    asyncio.wait_for(first.get(), 1),
+                    asyncio.wait_for(second.get(), 1),
+                )
+
+        self.assertEqual(async_to_sync(scenario)(),
+                         [('event', 1), ('event', 1)])
+        self.assertEqual(local_broker.subscribers_count('topic'), 0)
+
+    def test_full_queue_drops_messages(self):
+        """Переполненная очередь медленного клиента не растёт."""
+        local_broker = Broker(queue_size=2)
+
+        async def scenario():
+            async with local_broker.subscribe('topic') as queue:
+                for number in range(5):
+                    local_broker.publish('topic', 'event', number)
+                await asyncio.sleep(0)
+                return queue.qsize()
+
+        self.assertEqual(async_to_sync(scenario)(), 2)
+
+    def test_publish_across_processes(self):
+        """
+        С общим каталогом сообщение доходит до подписчиков брокера,
+        который сам ничего не публиковал, а сокет умершего процесса
+        удаляется.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            subscriber = Broker(directory=directory)
+            publisher = Broker(directory=directory)
+            stale = Path(directory) / 'stale.sock'
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as dead:
+                dead.bind(str(stale))
+
+            async def scenario():
+                async with subscriber.subscribe('topic') as queue:
+                    self.assertTrue(publisher.has_subscribers('topic'))
+                    publisher.publish('topic', 'event', {'id': 1})
+                    return await asyncio.wait_for(queue.get(), 1)
+
+            self.assertEqual(async_to_sync(scenario)(),
+                             ('event', {'id': 1}))
+            self.assertFalse(stale.exists())
+
+
+class EventsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def stream(self, view, user=None, **kwargs):
+        request = RequestFactory().get('/')
+        request.user = user or AnonymousUser()
+        response = async_to_sync(view)(request, **kwargs)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        return response.streaming_content
+
+    def create_post(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=author, text='Новый пост')
+
+    def create_comment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Comment.objects.create(
+                post=self.post, author=self.reader, text='Живой коммент')
+
+    def read_events(self, stream, action, count):
+        """Подключается к потоку, выполняет action и читает count событий."""
+        async def scenario():
+            chunks = [await anext(stream)]
+            await sync_to_async(action)()
+            for _ in range(count):
+                chunks.append(await asyncio.wait_for(anext(stream), 1))
+            await stream.aclose()
+            return [chunk.decode() for chunk in chunks]
+
+        return async_to_sync(scenario)()
+
+    def test_comment_fragment_pushed(self):
+        """Новый комментарий приходит на страницу поста готовым HTML."""
+        stream = self.stream(async_views.post_events, post_id=self.post.pk)
+        retry, event = self.read_events(stream, self.create_comment, 1)
+        self.assertTrue(retry.startswith('retry: '))
+        self.assertTrue(event.startswith('event: comment\n'))
+        data = json.loads(event.split('data: ', 1)[1])
+        self.assertIn('Живой коммент', data['html'])
+        self.assertIn('reader', data['html'])
+        self.assertEqual(broker.subscribers_count(
+            comments_topic(self.post.pk)), 0)
+
+    def test_feed_announces_new_posts(self):
+        """Главная получает уведомление о каждом новом посте."""
+        stream = self.stream(async_views.feed_events)
+        _, event = self.read_events(
+            stream, lambda: self.create_post(self.reader), 1)
+        self.assertTrue(event.startswith('event: post\n'))
+
+    def test_follow_feed_filters_authors(self):
+        """Лента подписок пропускает посты чужих авторов."""
+        stream = self.stream(async_views.follow_events, user=self.reader)
+
+        def create_posts():
+            self.create_post(self.reader)
+            self.create_post(self.author)
+
+        _, event = self.read_events(stream, create_posts, 1)
+        data = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(data['author'], self.author.pk)
+        self.assertEqual(broker.subscribers_count(POSTS_TOPIC), 0)
+
+    @override_settings(SSE_KEEPALIVE_SECONDS=0.01)
+    def test_keepalive_ping(self):
+        """Без событий поток шлёт пинги."""
+        stream = self.stream(async_views.feed_events)
+        _, ping = self.read_events(stream, lambda: None, 1)
+        self.assertEqual(ping, ': ping\n\n')
+
+    @override_settings(SSE_KEEPALIVE_SECONDS=0.01, SSE_MAX_SECONDS=0.05)
+    def test_stream_closes_after_max_seconds(self):
+        """Поток закрывается через SSE_MAX_SECONDS и снимает подписку."""
+        stream = self.stream(async_views.feed_events)
+
+        async def scenario():
+            return [chunk async for chunk in stream]
+
+        chunks = async_to_sync(scenario)()
+        self.assertTrue(chunks[0].decode().startswith('retry: '))
+        self.assertEqual(broker.subscribers_count(POSTS_TOPIC), 0)
+
+    @override_settings(ASGI=True, ROOT_URLCONF='posts.tests.asgi_urls')
+    def test_post_detail_subscribes_to_comments(self):
+        """Страница поста подключается к потоку комментариев."""
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        response = async_to_sync(async_views.post_detail)(
+            request, post_id=self.post.pk)
+        self.assertContains(response, f'/posts/{self.post.pk}/events/')
+
+    def test_no_streams_under_wsgi(self):
+        """Под WSGI маршрутов SSE нет, и страница к ним не подключается."""
+        with self.assertRaises(NoReverseMatch):
+            reverse('posts:events')
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        response = async_to_sync(async_views.post_detail)(
+            request, post_id=self.post.pk)
+        self.assertNotContains(response, 'data-events-url')
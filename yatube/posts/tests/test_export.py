@@ -0,0 +1,98 @@
+import csv
+import gzip
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..deletion import schedule_user_deletion
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ExportContentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост в группе')
+        Post.objects.create(author=cls.reader, text='Пост читателя')
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Коммент')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def export(self, **options):
+        out = StringIO()
+        call_command('export_content', stdout=out, **options)
+
+        return out.getvalue()
+
+    def test_command_exports_jsonl(self):
+        """Выгрузка содержит все типы записей в формате import_content."""
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(
+            [row['type'] for row in rows],
+            ['post', 'post', 'comment', 'follow'])
+        self.assertEqual(rows[0]['author'], 'writer')
+        self.assertEqual(rows[0]['group'], 'test-slug')
+        self.assertEqual(rows[2]['post'], self.post.pk)
+        self.assertEqual(rows[3], {'type': 'follow', 'user': 'reader',
+                                   'author': 'writer'})
+
+    def test_soft_deleted_user_not_exported(self):
+        """
+        Посты, комментарии и подписки пользователя, ожидающего удаления,
+        и комментарии к его постам не выгружаются.
+        """
+        schedule_user_deletion(self.user)
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([(row['type'], row['author']) for row in rows],
+                         [('post', 'reader')])
+
+    def test_command_filters_and_csv(self):
+        """Фильтр по группе и выгрузка в CSV."""
+        content = self.export(kind=['post'], format='csv', group='test-slug')
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0], ['id', 'author', 'group', 'text',
+                                   'image', 'created'])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][3], self.post.text)
+
+    def test_endpoint_for_staff_only(self):
+        """Выгрузка по HTTP доступна только персоналу."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+        response = self.staff_client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+
+    def test_endpoint_streams_gzip(self):
+        """Выгрузка по HTTP сжимается gzip и фильтруется по автору."""
+        response = self.staff_client.get(
+            reverse('posts:export'),
+            {'kind': 'post', 'author': 'reader', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['text'] for row in rows], ['Пост читателя'])
+
+    def test_endpoint_rejects_bad_params(self):
+        """Неверные параметры выгрузки возвращают 400."""
+        response = self.staff_client.get(
+            reverse('posts:export'), {'since': 'вчера'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,125 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..deletion import schedule_user_deletion
+from ..models import Group, Post, User
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост для ленты')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_feeds_render(self):
+        """Ленты сайта, группы и автора в RSS и Atom выводят пост."""
+        urls_and_types = [
+            (reverse('posts:feed_rss'), 'application/rss+xml'),
+            (reverse('posts:feed_atom'), 'application/atom+xml'),
+            (reverse('posts:group_feed_rss', args=[self.group.slug]),
+             'application/rss+xml'),
+            (reverse('posts:group_feed_atom', args=[self.group.slug]),
+             'application/atom+xml'),
+            (reverse('posts:author_feed_rss', args=[self.user.username]),
+             'application/rss+xml'),
+            (reverse('posts:author_feed_atom', args=[self.user.username]),
+             'application/atom+xml'),
+        ]
+        for url, content_type in urls_and_types:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type))
+                self.assertContains(response, 'Пост для ленты')
+        response = self.client.get(
+            reverse('posts:group_feed_rss', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get_and_cache(self):
+        """
+        Повторный опрос получает 304, а кэш отдаётся после двух
+        запросов к БД: группа и версия ленты, без рендеринга постов.
+        """
+        url = reverse('posts:group_feed_atom', args=[self.group.slug])
+        response = self.client.get(url)
+        etag = response['ETag']
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_validators_shared_between_processes(self):
+        """
+        Версия ленты берётся из БД, а не из кэша процесса: правка,
+        о которой процесс не знает (пустой кэш), всё равно меняет ETag.
+        """
+        url = reverse('posts:feed_rss')
+        etag = self.client.get(url)['ETag']
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Правка из другого процесса', updated=timezone.now())
+        cache.clear()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка поста'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Правка поста')
+
+    def test_unknown_group_leaves_no_cache_keys(self):
+        """Адрес несуществующей группы даёт 404 и ничего не кэширует."""
+        response = self.client.get(
+            reverse('posts:group_feed_rss', args=['bogus']))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(cache._cache), 0)
+
+    def test_post_changes_invalidate_feeds(self):
+        """Новый пост меняет ETag и попадает в ленты."""
+        urls = [
+            reverse('posts:feed_rss'),
+            reverse('posts:group_feed_rss', args=[self.group.slug]),
+            reverse('posts:author_feed_rss', args=[self.user.username]),
+        ]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        Post.objects.create(
+            author=self.user, group=self.group, text='Свежий пост')
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Свежий пост')
+
+    def test_group_change_invalidates_old_group(self):
+        """Перенос поста в другую группу обновляет ленту прежней."""
+        url = reverse('posts:group_feed_rss', args=[self.group.slug])
+        self.client.get(url)
+        other = Group.objects.create(title='Другая', slug='other',
+                                     description='Другая группа')
+        self.post.group = other
+        self.post.save()
+        self.assertNotContains(self.client.get(url), 'Пост для ленты')
+
+    def test_deleted_author_feed_gone(self):
+        """Лента автора, ожидающего удаления, недоступна."""
+        url = reverse('posts:author_feed_rss', args=[self.user.username])
+        self.client.get(url)
+        schedule_user_deletion(self.user)
+        self.assertEqual(self.client.get(url).status_code, 404)
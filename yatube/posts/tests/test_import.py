@@ -0,0 +1,83 @@
+import json
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, TaggedPost, User
+
+
+class ImportContentTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        User.objects.create_user(username='existing')
+
+    def write(self, name, content):
+        path = Path(self.temp_dir.name) / name
+        path.write_text(content, encoding='utf-8')
+
+        return str(path)
+
+    def test_import_jsonl(self):
+        """Загружает все типы записей и связывает их по ключам из файла."""
+        rows = [
+            {'type': 'post', 'id': 'p1', 'author': 'leo', 'group': 'books',
+             'text': 'Пост про #книги', 'created': '2020-01-02T03:04:05Z'},
+            {'type': 'user', 'username': 'leo', 'first_name': 'Лев'},
+            {'type': 'group', 'slug': 'books', 'title': 'Книги'},
+            {'type': 'comment', 'post': 'p1', 'author': 'existing',
+             'text': 'Коммент'},
+            {'type': 'follow', 'user': 'existing', 'author': 'leo'},
+            {'type': 'follow', 'user': 'leo', 'author': 'leo'},
+            {'type': 'post', 'author': 'nobody', 'text': 'Без автора'},
+        ]
+        path = self.write('content.jsonl',
+                          '\n'.join(json.dumps(row) for row in rows))
+        out = StringIO()
+        call_command('import_content', path, batch_size=2, stdout=out)
+
+        post = Post.objects.get()
+        self.assertEqual(post.author.username, 'leo')
+        self.assertEqual(post.group, Group.objects.get(slug='books'))
+        self.assertEqual(post.created,
+                         datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc))
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertTrue(Follow.objects.filter(
+            user__username='existing', author__username='leo').exists())
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(TaggedPost.objects.get().tag.name, 'книги')
+        self.assertIn('записей/с', out.getvalue())
+
+    def test_import_csv(self):
+        """Загружает пользователей из CSV, не дублируя существующих."""
+        path = self.write(
+            'users.csv',
+            'username,email\nexisting,old@example.com\nnew,new@example.com\n'
+        )
+        call_command('import_content', path, type='user', stdout=StringIO())
+        self.assertEqual(User.objects.count(), 2)
+        user = User.objects.get(username='new')
+        self.assertEqual(user.email, 'new@example.com')
+        self.assertFalse(user.has_usable_password())
+
+    def test_follow_count_excludes_duplicates(self):
+        """Повторные и уже существующие подписки не считаются загруженными."""
+        author = User.objects.create_user(username='leo')
+        Follow.objects.create(user=author, author=User.objects.get(
+            username='existing'))
+        rows = [
+            {'type': 'follow', 'user': 'existing', 'author': 'leo'},
+            {'type': 'follow', 'user': 'existing', 'author': 'leo'},
+            {'type': 'follow', 'user': 'leo', 'author': 'existing'},
+        ]
+        path = self.write('follows.jsonl',
+                          '\n'.join(json.dumps(row) for row in rows))
+        out = StringIO()
+        call_command('import_content', path, stdout=out)
+        self.assertEqual(Follow.objects.count(), 2)
+        self.assertIn('follow: загружено 1, пропущено 2', out.getvalue())
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+
+from ..models import Comment, Follow, Mention, Post, TaggedPost, User
+from ..utils import extract_hashtags, extract_mentions
+
+
+class GenerateLoadDataTest(TestCase):
+    def generate(self, **options):
+        options = {'users': 50, 'groups': 5, 'posts': 400, 'comments': 300,
+                   'follows': 200, 'end': '2024-01-01', **options}
+        call_command('generate_load_data', stdout=StringIO(), **options)
+
+    def test_generates_requested_counts(self):
+        """Создаёт заданное число записей с датами до --end."""
+        self.generate()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Post.objects.count(), 400)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(Follow.objects.count(), 200)
+        self.assertEqual(Post.objects.earliest('created').created,
+                         datetime(2022, 1, 1, tzinfo=timezone.utc))
+        self.assertLess(Post.objects.latest('created').created,
+                        datetime(2024, 1, 1, tzinfo=timezone.utc))
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')).exists())
+
+    def test_power_law_followers(self):
+        """Самого популярного автора читают намного чаще среднего."""
+        self.generate()
+        counts = list(User.objects.annotate(followers=Count('following'))
+                      .order_by('-followers')
+                      .values_list('followers', flat=True))
+        self.assertGreater(counts[0], 4 * sum(counts) / len(counts))
+
+    def test_tags_and_mentions_match_text(self):
+        """Связи с тегами и упоминаниями совпадают с текстом постов."""
+        self.generate(posts=1000)
+        posts = Post.objects.all()
+        self.assertEqual(
+            TaggedPost.objects.count(),
+            sum(len(extract_hashtags(post.text)) for post in posts))
+        self.assertEqual(
+            Mention.objects.count(),
+            sum(len(extract_mentions(post.text)) for post in posts))
+
+    def test_refuses_to_run_twice(self):
+        self.generate()
+        with self.assertRaises(CommandError):
+            self.generate()
+        post = Post.objects.create(author=User.objects.first(), text='Новый')
+        self.assertGreater(post.pk, 400)
@@ -0,0 +1,275 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+
+from ..constants import POSTS_LIMIT
+from ..models import Comment, Follow, Group, Post, User
+
+# Число постов, комментариев и подписчиков в двух прогонах:
+# неполная страница и больше одной страницы.
+SMALL_SIZE = 2
+LARGE_SIZE = POSTS_LIMIT + 2
+
+# Бюджет запросов к БД на одну страницу: (аноним, вошедший юзер).
+# Кэш перед каждым запросом очищается, так что это холодный путь.
+# Страницы, которые смотрят на request.user, тратят у вошедшего юзера
+# два запроса на сессию и пользователя. Вошедший юзер - сотрудник,
+# чтобы выгрузка export отдавала данные.
+BUDGETS = {
+    'posts:index': (2, 4),
+    'posts:group_list': (3, 5),
+    'posts:profile': (6, 9),
+    'posts:mentions': (3, 5),
+    'posts:tag_posts': (3, 5),
+    'posts:post_detail': (4, 6),
+    'posts:post_create': (0, 3),
+    'posts:post_edit': (0, 3),
+    'posts:follow_index': (0, 4),
+    'posts:feed_rss': (2, 2),
+    'posts:feed_atom': (2, 2),
+    'posts:group_feed_rss': (3, 3),
+    'posts:group_feed_atom': (3, 3),
+    'posts:author_feed_rss': (3, 3),
+    'posts:author_feed_atom': (3, 3),
+    'posts:export': (0, 5),
+    'posts:api_index': (1, 1),
+    'posts:api_group_posts': (2, 2),
+    'posts:api_profile': (3, 3),
+    'posts:api_follow_index': (0, 3),
+    'posts:api_post_detail': (3, 3),
+    'posts:api_post_comments': (2, 2),
+    'posts:api_posts_batch': (1, 1),
+    'posts:autocomplete': (2, 2),
+    'sitemap_index': (4, 4),
+    'sitemap_segment': (4, 4),
+    'about:author': (0, 2),
+    'about:tech': (0, 2),
+}
+
+# Бюджет на один POST-запрос: (аноним, вошедший юзер).
+# Анонима login_required сразу перенаправляет на вход.
+WRITE_BUDGETS = {
+    'posts:post_create': (0, 5),
+    'posts:post_edit': (0, 8),
+    'posts:add_comment': (0, 4),
+    'posts:profile_follow': (0, 5),
+    'posts:profile_unfollow': (0, 3),
+}
+
+# Пространства имён url, страницы которых должны иметь бюджет.
+BUDGETED_NAMESPACES = ('posts', 'about')
+
+# Url без бюджета: служебные страницы и потоки Server-Sent Events,
+# которые держат соединение открытым (есть только под ASGI).
+UNBUDGETED = {
+    'metrics',
+    'sampling_profile',
+    'posts:events',
+    'posts:follow_events',
+    'posts:post_events',
+}
+
+
+def url_names():
+    """
+    Имена url страниц BUDGETED_NAMESPACES и корневых url проекта,
+    кроме UNBUDGETED.
+    """
+    names = set()
+    for pattern in get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace in BUDGETED_NAMESPACES:
+                names.update(f'{pattern.namespace}:{child.name}'
+                             for child in pattern.url_patterns)
+        elif pattern.name:
+            names.add(pattern.name)
+
+    return names - UNBUDGETED
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class QueryBudgetTest(TestCase):
+    """
+    Проверяет, что число запросов к БД у каждой страницы укладывается
+    в бюджет из BUDGETS и не растёт вместе с числом строк на странице.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='budget_reader',
+                                              is_staff=True)
+        cls.author = User.objects.create_user(username='budget_author')
+        cls.followed = User.objects.create_user(username='budget_followed')
+        cls.own_post = Post.objects.create(author=cls.reader,
+                                           text='Пост читателя')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def seed(self, size):
+        """
+        Дополняет данные до size постов автора (с группой, хэштегом
+        и упоминанием), комментариев к первому посту и подписчиков.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(self.author.posts.count(), size):
+                Post.objects.create(
+                    author=self.author,
+                    group=self.group,
+                    text=f'Пост {number} #бюджет для @budget_reader',
+                )
+        post = self.author.posts.earliest('created')
+        for number in range(post.comments.count(), size):
+            commenter = User.objects.create_user(
+                username=f'budget_commenter_{number}')
+            Comment.objects.create(post=post, author=commenter,
+                                   text=f'Комментарий {number}')
+            Follow.objects.create(user=commenter, author=self.author)
+
+        return post
+
+    def urls(self, post):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse('posts:group_list',
+                                        args=[self.group.slug]),
+            'posts:profile': reverse('posts:profile',
+                                     args=[self.author.username]),
+            'posts:mentions': reverse('posts:mentions',
+                                      args=[self.reader.username]),
+            'posts:tag_posts': reverse('posts:tag_posts', args=['бюджет']),
+            'posts:post_detail': reverse('posts:post_detail',
+                                         args=[post.pk]),
+            'posts:post_create': reverse('posts:post_create'),
+            'posts:post_edit': reverse('posts:post_edit', args=[post.pk]),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:feed_rss': reverse('posts:feed_rss'),
+            'posts:feed_atom': reverse('posts:feed_atom'),
+            'posts:group_feed_rss': reverse('posts:group_feed_rss',
+                                            args=[self.group.slug]),
+            'posts:group_feed_atom': reverse('posts:group_feed_atom',
+                                             args=[self.group.slug]),
+            'posts:author_feed_rss': reverse('posts:author_feed_rss',
+                                             args=[self.author.username]),
+            'posts:author_feed_atom': reverse('posts:author_feed_atom',
+                                              args=[self.author.username]),
+            'posts:export': reverse('posts:export'),
+            'posts:api_index': reverse('posts:api_index'),
+            'posts:api_group_posts': reverse('posts:api_group_posts',
+                                             args=[self.group.slug]),
+            'posts:api_profile': reverse('posts:api_profile',
+                                         args=[self.author.username]),
+            'posts:api_follow_index': reverse('posts:api_follow_index'),
+            'posts:api_post_detail': reverse('posts:api_post_detail',
+                                             args=[post.pk]),
+            'posts:api_post_comments': reverse('posts:api_post_comments',
+                                               args=[post.pk]),
+            'posts:api_posts_batch': '{}?ids={}'.format(
+                reverse('posts:api_posts_batch'),
+                ','.join(str(pk) for pk in
+                         self.author.posts.values_list('pk', flat=True))),
+            'posts:autocomplete': '{}?q=budget'.format(
+                reverse('posts:autocomplete')),
+            'sitemap_index': reverse('sitemap_index'),
+            'sitemap_segment': reverse('sitemap_segment', args=['posts', 1]),
+            'about:author': reverse('about:author'),
+            'about:tech': reverse('about:tech'),
+        }
+
+    def writes(self, post):
+        """POST-запросы: {имя url: (адрес, данные формы)}."""
+        return {
+            'posts:post_create': (reverse('posts:post_create'),
+                                  {'text': 'Новый пост',
+                                   'group': self.group.pk}),
+            'posts:post_edit': (reverse('posts:post_edit',
+                                        args=[self.own_post.pk]),
+                                {'text': 'Изменённый пост',
+                                 'group': self.group.pk}),
+            'posts:add_comment': (reverse('posts:add_comment',
+                                          args=[post.pk]),
+                                  {'text': 'Новый комментарий'}),
+            'posts:profile_follow': (reverse('posts:profile_follow',
+                                             args=[self.followed.username]),
+                                     None),
+            'posts:profile_unfollow': (
+                reverse('posts:profile_unfollow',
+                        args=[self.followed.username]),
+                None),
+        }
+
+    def measure(self, client, url, data=None, method='get'):
+        """Запросы к БД страницы с холодным кэшем."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertNotIn(response.status_code, (404, 500), url)
+
+        return [query['sql'] for query in queries.captured_queries]
+
+    def run_all(self, size):
+        """
+        Запросы всех страниц, затем POST-запросов:
+        {(имя url, метод, вошёл ли юзер): [sql]}.
+        """
+        post = self.seed(size)
+        anonymous = Client()
+        logged_in = Client()
+        logged_in.force_login(self.reader)
+        requests = [(name, 'get', url, None)
+                    for name, url in self.urls(post).items()]
+        requests += [(name, 'post', url, data)
+                     for name, (url, data) in self.writes(post).items()]
+        queries = {}
+        for name, method, url, data in requests:
+            for is_user, client in ((False, anonymous), (True, logged_in)):
+                queries[name, method, is_user] = self.measure(
+                    client, url, data, method)
+
+        return queries
+
+    def describe(self, name, method, is_user, queries):
+        who = 'вошедший юзер' if is_user else 'аноним'
+        listing = '\n'.join(f'{number}. {sql}'
+                            for number, sql in enumerate(queries, 1))
+
+        return (f'{method.upper()} {name} ({who}): '
+                f'{len(queries)} запросов\n{listing}')
+
+    def test_budgets_cover_all_pages(self):
+        """
+        Бюджет есть у каждого url из posts, about и корня проекта,
+        и каждый бюджет проверяется запросом.
+        """
+        post = self.seed(1)
+        self.assertEqual(set(BUDGETS), set(self.urls(post)))
+        self.assertEqual(set(WRITE_BUDGETS), set(self.writes(post)))
+        self.assertEqual(set(BUDGETS) | set(WRITE_BUDGETS), url_names())
+
+    def test_queries_within_budget(self):
+        """
+        Число запросов не больше бюджета и не растёт от неполной
+        страницы к полной.
+        """
+        small = self.run_all(SMALL_SIZE)
+        large = self.run_all(LARGE_SIZE)
+        for (name, method, is_user), queries in large.items():
+            budgets = BUDGETS if method == 'get' else WRITE_BUDGETS
+            budget = budgets[name][is_user]
+            key = name, method, is_user
+            with self.subTest(name=name, method=method, user=is_user):
+                for measured in (small[key], queries):
+                    self.assertLessEqual(
+                        len(measured), budget,
+                        'Превышен бюджет: '
+                        + self.describe(*key, measured))
+                self.assertLessEqual(
+                    len(queries), len(small[key]),
+                    'Число запросов растёт с числом строк: '
+                    + self.describe(*key, queries))
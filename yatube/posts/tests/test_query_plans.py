@@ -0,0 +1,92 @@
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class QueryPlanTest(TestCase):
+    """
+    Проверяет, что запросы view ленты и комментариев
+    используют индексы, а не полный проход таблицы с сортировкой.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='plan_test')
+        cls.author = User.objects.create_user(username='plan_author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text='Пост #план для @plan_test',
+            )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Комментарий',
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_no_full_scan_sort(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            plan = self.get_plan(sql)
+            full_scan = any(
+                step.startswith('SCAN ') and 'INDEX' not in step
+                for step in plan
+            )
+            temp_sort = any('TEMP B-TREE FOR ORDER BY' in step
+                            for step in plan)
+            self.assertFalse(
+                full_scan and temp_sort,
+                f'{url}: полный проход с сортировкой\n{sql}\n'
+                + '\n'.join(plan)
+            )
+
+    def test_views_use_indexes(self):
+        """Запросы view не сортируют полный проход по таблице."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+            reverse('posts:tag_posts', kwargs={'name': 'план'}),
+            reverse('posts:mentions',
+                    kwargs={'username': self.user.username}),
+            reverse('posts:api_index'),
+            reverse('posts:api_group_posts',
+                    kwargs={'slug': self.group.slug}),
+            reverse('posts:api_profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:api_follow_index'),
+            reverse('posts:api_post_detail',
+                    kwargs={'post_id': self.post.id}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assert_no_full_scan_sort(url)
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..deletion import schedule_user_deletion
+from ..models import Group, Post, User
+from ..sitemaps import SECTIONS
+
+
+@mock.patch('posts.sitemaps.SITEMAP_SEGMENT_SIZE', 2)
+class SitemapsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.user, group=cls.group,
+                                text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def segment_url(self, section, segment):
+        return reverse('sitemap_segment', args=[section, segment])
+
+    def expire_versions(self):
+        """Как будто истёк SITEMAP_VERSIONS_SECONDS."""
+        cache.delete_many(
+            [f'sitemap:versions:{section}' for section in SECTIONS])
+
+    def test_index_lists_segments(self):
+        """Индекс перечисляет сегменты всех разделов с lastmod."""
+        response = self.client.get(reverse('sitemap_index'))
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        last_post = max(post.pk for post in self.posts)
+        for segment in range(1, (last_post - 1) // 2 + 2):
+            self.assertContains(response, self.segment_url('posts', segment))
+        self.assertContains(response, self.segment_url('profiles', 1))
+        self.assertContains(response, '<lastmod>')
+
+    def test_segment_lists_own_range(self):
+        """Сегмент содержит только записи своего диапазона id."""
+        post = self.posts[0]
+        segment = (post.pk - 1) // 2 + 1
+        response = self.client.get(self.segment_url('posts', segment))
+        self.assertContains(
+            response, reverse('posts:post_detail', args=[post.pk]))
+        self.assertNotContains(
+            response, reverse('posts:post_detail', args=[self.posts[2].pk]))
+        response = self.client.get(self.segment_url('groups', 1))
+        self.assertContains(
+            response, reverse('posts:group_list', args=[self.group.slug]))
+        self.assertEqual(
+            self.client.get(self.segment_url('unknown', 1)).status_code, 404)
+
+    def test_cached_without_queries(self):
+        """
+        Версии сегментов и отрендеренные сегменты кэшируются:
+        повторные запросы индекса и сегмента не идут в БД.
+        """
+        url = self.segment_url('profiles', 1)
+        content = self.client.get(url).content
+        index = self.client.get(reverse('sitemap_index')).content
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content, content)
+            self.assertEqual(
+                self.client.get(reverse('sitemap_index')).content, index)
+
+    def test_change_updates_only_its_segment(self):
+        """
+        Правка поста, сделанная в обход кэша этого процесса, после
+        истечения версий меняет lastmod в индексе и содержимое только
+        его сегмента.
+        """
+        first, last = self.posts[0], self.posts[2]
+        first_url = self.segment_url('posts', (first.pk - 1) // 2 + 1)
+        last_url = self.segment_url('posts', (last.pk - 1) // 2 + 1)
+        first_content = self.client.get(first_url).content
+        last_content = self.client.get(last_url).content
+        index = self.client.get(reverse('sitemap_index')).content
+        Post.objects.filter(pk=last.pk).update(
+            updated=last.updated + timedelta(days=1))
+        self.assertEqual(
+            self.client.get(reverse('sitemap_index')).content, index)
+        self.expire_versions()
+        self.assertNotEqual(
+            self.client.get(reverse('sitemap_index')).content, index)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(first_url).content,
+                             first_content)
+        self.assertNotEqual(self.client.get(last_url).content, last_content)
+
+    def test_deleted_author_leaves_sitemap(self):
+        """Профиль и посты автора, ожидающего удаления, исчезают из карты."""
+        url = self.segment_url('profiles', (self.user.pk - 1) // 2 + 1)
+        self.assertContains(
+            self.client.get(url),
+            reverse('posts:profile', args=[self.user.username]))
+        schedule_user_deletion(self.user)
+        self.expire_versions()
+        self.assertNotContains(
+            self.client.get(url),
+            reverse('posts:profile', args=[self.user.username]))
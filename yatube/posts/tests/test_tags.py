@@ -0,0 +1,75 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Mention, Post, Tag, TaggedPost, User
+from ..utils import extract_hashtags, extract_mentions
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class TagsAndMentionsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.mentioned = User.objects.create_user(username='reader')
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.post = Post.objects.create(
+                author=cls.user,
+                text='Читаю #Python и #django вместе с @reader.',
+            )
+
+    def test_extract_hashtags_and_mentions(self):
+        """Хэштеги приводятся к нижнему регистру, e-mail не упоминание."""
+        text = '#Tag, #тег и #tag#no; пишите на mail@example.com или @leo_1.'
+        self.assertEqual(extract_hashtags(text), {'tag', 'тег'})
+        self.assertEqual(extract_mentions(text), {'leo_1'})
+
+    def test_post_save_creates_links(self):
+        """При сохранении поста создаются теги и упоминания."""
+        self.assertEqual(
+            set(self.post.tag_links.values_list('tag__name', flat=True)),
+            {'python', 'django'}
+        )
+        mention = Mention.objects.get(post=self.post)
+        self.assertEqual(mention.user, self.mentioned)
+        self.assertEqual(mention.created, self.post.created)
+
+    def test_post_edit_updates_links(self):
+        """Изменение текста поста пересобирает связи."""
+        self.post.text = 'Только #python'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        self.assertEqual(
+            list(self.post.tag_links.values_list('tag__name', flat=True)),
+            ['python']
+        )
+        self.assertFalse(Mention.objects.filter(post=self.post).exists())
+        self.assertTrue(Tag.objects.filter(name='django').exists())
+
+    def test_tag_feed(self):
+        """Лента тега выводит посты с тегом, новые первыми."""
+        with self.captureOnCommitCallbacks(execute=True):
+            newer = Post.objects.create(author=self.user,
+                                        text='Снова #PYTHON')
+            Post.objects.create(author=self.user, text='Без тегов')
+        response = self.client.get(
+            reverse('posts:tag_posts', kwargs={'name': 'Python'}))
+        self.assertTemplateUsed(response, 'posts/tag_list.html')
+        self.assertEqual(list(response.context['page_obj']),
+                         [newer, self.post])
+        self.assertEqual(TaggedPost.objects.count(), 3)
+
+    def test_mention_feed(self):
+        """Лента упоминаний выводит посты, где упомянут пользователь."""
+        response = self.client.get(
+            reverse('posts:mentions',
+                    kwargs={'username': self.mentioned.username}))
+        self.assertTemplateUsed(response, 'posts/mentions.html')
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        self.assertEqual(response.context['profile'], self.mentioned)
+
+    def test_unknown_tag_not_found(self):
+        """Несуществующий тег возвращает 404."""
+        response = self.client.get(
+            reverse('posts:tag_posts', kwargs={'name': 'nothing'}))
+        self.assertEqual(response.status_code, 404)
@@ -1,21 +1,30 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import api, async_views, feeds, views
 
 app_name = 'posts'
 
+feed_views = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     path('',
-         views.index,
+         feed_views.index,
          name='index'),
     path('group/<slug:slug>/',
-         views.group_posts,
+         feed_views.group_posts,
          name='group_list'),
     path('profile/<str:username>/',
-         views.profile,
+         feed_views.profile,
          name='profile'),
+    path('profile/<str:username>/mentions/',
+         views.mention_posts,
+         name='mentions'),
+    path('tags/<str:name>/',
+         views.tag_posts,
+         name='tag_posts'),
     path('posts/<int:post_id>/',
-         views.post_detail,
+         feed_views.post_detail,
          name='post_detail'),
     path('create/',
          views.post_create,
@@ -27,7 +36,7 @@ urlpatterns = [
          views.add_comment,
          name='add_comment'),
     path('follow/',
-         views.follow_index,
+         feed_views.follow_index,
          name='follow_index'),
     path('profile/<str:username>/follow/',
          views.profile_follow,
@@ -35,4 +44,66 @@ urlpatterns = [
     path('profile/<str:username>/unfollow/',
          views.profile_unfollow,
          name='profile_unfollow'),
+    path('feeds/rss/',
+         feeds.site_rss,
+         name='feed_rss'),
+    path('feeds/atom/',
+         feeds.site_atom,
+         name='feed_atom'),
+    path('group/<slug:slug>/rss/',
+         feeds.group_rss,
+         name='group_feed_rss'),
+    path('group/<slug:slug>/atom/',
+         feeds.group_atom,
+         name='group_feed_atom'),
+    path('profile/<str:username>/rss/',
+         feeds.author_rss,
+         name='author_feed_rss'),
+    path('profile/<str:username>/atom/',
+         feeds.author_atom,
+         name='author_feed_atom'),
+    path('export/',
+         views.export_content,
+         name='export'),
+    path('api/posts/',
+         api.index,
+         name='api_index'),
+    path('api/group/<slug:slug>/posts/',
+         api.group_posts,
+         name='api_group_posts'),
+    path('api/profile/<str:username>/posts/',
+         api.profile,
+         name='api_profile'),
+    path('api/follow/posts/',
+         api.follow_index,
+         name='api_follow_index'),
+    path('api/posts/batch/',
+         api.posts_batch,
+         name='api_posts_batch'),
+    path('api/posts/<int:post_id>/',
+         api.post_detail,
+         name='api_post_detail'),
+    path('api/posts/<int:post_id>/comments/',
+         api.post_comments,
+         name='api_post_comments'),
+    path('autocomplete/',
+         views.autocomplete,
+         name='autocomplete'),
+]
+
+# Потоки Server-Sent Events держат соединение открытым, под WSGI каждый
+# занимал бы поток сервера, поэтому они есть только под ASGI.
+sse_urlpatterns = [
+    path('events/',
+         async_views.feed_events,
+         name='events'),
+    path('follow/events/',
+         async_views.follow_events,
+         name='follow_events'),
+    path('posts/<int:post_id>/events/',
+         async_views.post_events,
+         name='post_events'),
 ]
+
+if settings.ASGI:
+    urlpatterns += sse_urlpatterns
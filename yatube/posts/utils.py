@@ -1,6 +1,11 @@
+import re
+
 from django.core.paginator import Paginator
 
-from .constants import POSTS_LIMIT
+from .constants import POSTS_LIMIT, TAG_MAX_LENGTH
+
+HASHTAG_RE = re.compile(r'(?<![\w#])#(\w+)')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]+)')
 
 
 def create_page_obj(request, posts):
@@ -13,3 +18,72 @@ def create_page_obj(request, posts):
     page_number = request.GET.get('page')
 
     return paginator.get_page(page_number)
+
+
+async def acreate_page_obj(request, posts, count):
+    """
+    Асинхронный аналог create_page_obj для async views.
+    Число постов count считается заранее (например, одновременно
+    с другими запросами view), страница загружается через async ORM.
+    posts - QuerySet или объект с методом aslice(start, stop).
+    """
+    paginator = Paginator(range(count), POSTS_LIMIT)
+    page = paginator.get_page(request.GET.get('page'))
+    start = (page.number - 1) * POSTS_LIMIT
+    stop = start + POSTS_LIMIT
+    if hasattr(posts, 'aslice'):
+        page.object_list = await posts.aslice(start, stop)
+    else:
+        page.object_list = [post async for post in posts[start:stop]]
+
+    return page
+
+
+def extract_hashtags(text):
+    """Возвращает множество хэштегов из текста в нижнем регистре."""
+    return {tag.lower()[:TAG_MAX_LENGTH] for tag in HASHTAG_RE.findall(text)}
+
+
+def extract_mentions(text):
+    """Возвращает множество юзернеймов, упомянутых в тексте через @."""
+    return {name.rstrip('.') for name in MENTION_RE.findall(text)}
+
+
+def sync_tags_and_mentions(posts):
+    """
+    Пересобирает связи постов с хэштегами (TaggedPost)
+    и упоминаниями (Mention) по текущему тексту постов.
+    Число запросов не зависит от количества постов.
+    """
+    from .models import Mention, Tag, TaggedPost, User
+
+    posts = [post for post in posts if post.pk]
+    if not posts:
+        return
+    post_tags = {post.pk: extract_hashtags(post.text) for post in posts}
+    post_mentions = {post.pk: extract_mentions(post.text) for post in posts}
+    names = set().union(*post_tags.values())
+    usernames = set().union(*post_mentions.values())
+
+    tags = {}
+    if names:
+        Tag.objects.bulk_create([Tag(name=name) for name in names],
+                                ignore_conflicts=True)
+        tags = dict(Tag.objects.filter(name__in=names)
+                    .values_list('name', 'pk'))
+    users = {}
+    if usernames:
+        users = dict(User.objects.filter(username__in=usernames)
+                     .values_list('username', 'pk'))
+
+    TaggedPost.objects.filter(post__in=posts).delete()
+    Mention.objects.filter(post__in=posts).delete()
+    TaggedPost.objects.bulk_create([
+        TaggedPost(tag_id=tags[name], post=post, created=post.created)
+        for post in posts for name in post_tags[post.pk]
+    ])
+    Mention.objects.bulk_create([
+        Mention(user_id=users[name], post=post, created=post.created)
+        for post in posts for name in post_mentions[post.pk]
+        if name in users
+    ])
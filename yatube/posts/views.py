@@ -1,8 +1,17 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import (HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 
+from core.routers import replica_reads
+from .archive import ChainedPosts, get_post_or_archived
+from .autocomplete import USER, autocomplete_index
+from .export import (FORMATS, KINDS, buffered, export_lines, gzip_stream,
+                     parse_bound)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Follow, Group, Post, Tag, User
 from .utils import create_page_obj
 
 
@@ -13,7 +22,7 @@ def check_author(func):
     """
     def check_user(request, *args, **kwargs):
         post = get_object_or_404(Post, id=kwargs['post_id'])
-        if request.user == post.author:
+        if request.user.pk == post.author_id:
             return func(request, *args, **kwargs)
 
         return redirect('posts:post_detail', kwargs['post_id'])
@@ -21,13 +30,14 @@ def check_author(func):
     return check_user
 
 
+@replica_reads
 def index(request):
     """
     Выводит по N (число из константы POSTS_LIMIT) последних постов из Post
     на страницу главной.
     """
     template = 'posts/index.html'
-    posts = Post.objects.select_related('group')
+    posts = Post.objects.visible().select_related('author', 'group')
     page_obj = create_page_obj(request, posts)
     context = {
         'page_obj': page_obj,
@@ -36,6 +46,7 @@ def index(request):
     return render(request, template, context)
 
 
+@replica_reads
 def group_posts(request, slug):
     """
     Выводит по N (число из константы POSTS_LIMIT) последних постов из Post,
@@ -43,8 +54,9 @@ def group_posts(request, slug):
     на страницу группы.
     """
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = get_object_or_404(
+        Group.objects.filter(pending_deletion__isnull=True), slug=slug)
+    posts = group.posts.visible().select_related('author')
     page_obj = create_page_obj(request, posts)
     context = {
         'group': group,
@@ -54,20 +66,26 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@replica_reads
 def profile(request, username):
     """
     Выводит по N (число из константы POSTS_LIMIT) последних постов из Post,
     опубликованных конкретным пользователем (username).
     """
     template = 'posts/profile.html'
-    profile = get_object_or_404(User, username=username)
-    posts = profile.posts.all()
+    profile = get_object_or_404(
+        User.objects.filter(pending_deletion__isnull=True),
+        username=username)
+    posts = ChainedPosts(profile.posts.select_related('group'),
+                         profile.archived_posts.select_related('group'))
     page_obj = create_page_obj(request, posts)
     following = (not request.user.is_anonymous
                  and Follow.objects.filter(user=request.user, author=profile)
                  .exists())
     context = {
         'following': following,
+        'follows_count': profile.follower.count(),
+        'followers_count': profile.following.count(),
         'profile': profile,
         'page_obj': page_obj,
     }
@@ -75,18 +93,66 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@replica_reads
+def tag_posts(request, name):
+    """
+    Выводит по N (число из константы POSTS_LIMIT) последних постов из Post,
+    отмеченных хэштегом name.
+    """
+    template = 'posts/tag_list.html'
+    tag = get_object_or_404(Tag, name=name.lower())
+    posts = (Post.objects.visible().filter(tag_links__tag=tag)
+             .select_related('author', 'group')
+             .order_by('-tag_links__created'))
+    page_obj = create_page_obj(request, posts)
+    context = {
+        'tag': tag,
+        'page_obj': page_obj,
+    }
+
+    return render(request, template, context)
+
+
+@replica_reads
+def mention_posts(request, username):
+    """
+    Выводит по N (число из константы POSTS_LIMIT) последних постов из Post,
+    в которых упомянут пользователь username.
+    """
+    template = 'posts/mentions.html'
+    profile = get_object_or_404(
+        User.objects.filter(pending_deletion__isnull=True),
+        username=username)
+    posts = (Post.objects.visible().filter(mentions__user=profile)
+             .select_related('author', 'group')
+             .order_by('-mentions__created'))
+    page_obj = create_page_obj(request, posts)
+    context = {
+        'profile': profile,
+        'page_obj': page_obj,
+    }
+
+    return render(request, template, context)
+
+
+@replica_reads
 def post_detail(request, post_id):
     """
     Выводит один пост из Post, выбранный по post_id,
     а также комментарии к посту и форму написания комментариев.
+    Если поста нет в Post, ищет его в архиве.
     """
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post, is_archived = get_post_or_archived(post_id)
+    comments = post.comments.visible().select_related('author')
+    posts_count = (post.author.posts.count()
+                   + post.author.archived_posts.count())
     context = {
         'post': post,
         'comments': comments,
         'form': CommentForm(),
+        'is_archived': is_archived,
+        'posts_count': posts_count,
     }
 
     return render(request, template, context)
@@ -153,11 +219,13 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
     """Выводит на страницу все посты авторов, на кого подписан юзер."""
     template = 'posts/follow.html'
-    user = get_object_or_404(User, username=request.user.username)
-    posts = Post.objects.filter(author__following__user=user)
+    posts = (Post.objects.visible()
+             .filter(author__following__user=request.user)
+             .select_related('author', 'group'))
     page_obj = create_page_obj(request, posts)
     context = {
         'page_obj': page_obj,
@@ -169,7 +237,9 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     """Добавляет запись в подписке в Follow."""
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.filter(pending_deletion__isnull=True),
+        username=username)
     already_followed = Follow.objects.filter(
         user=request.user, author=author).exists()
     if request.user != author and not already_followed:
@@ -185,3 +255,56 @@ def profile_unfollow(request, username):
         user=request.user, author__username=username).delete()
 
     return redirect('posts:profile', username=username)
+
+
+def autocomplete(request):
+    """
+    Подсказки по префиксу (параметр q) среди юзернеймов,
+    полных имён пользователей и названий групп.
+    Отвечает из индекса в памяти, без запросов к БД.
+    """
+    results = autocomplete_index.search(request.GET.get('q', ''))
+    for result in results:
+        if result['type'] == USER:
+            result['url'] = reverse('posts:profile', args=[result['value']])
+        else:
+            result['url'] = reverse('posts:group_list',
+                                    args=[result['value']])
+
+    return JsonResponse({'results': results})
+
+
+@staff_member_required
+def export_content(request):
+    """
+    Потоково отдаёт выгрузку постов, комментариев и подписок
+    в JSON Lines или CSV, при gzip=1 - сжатую на лету.
+    Фильтры: kind, author, group, since, until.
+    """
+    kinds = request.GET.getlist('kind') or list(KINDS)
+    file_format = request.GET.get('format', 'jsonl')
+    if (file_format not in FORMATS
+            or any(kind not in KINDS for kind in kinds)
+            or (file_format == 'csv' and len(kinds) != 1)):
+        return HttpResponseBadRequest('Неверный формат или тип записей.')
+    try:
+        filters = {
+            'author': request.GET.get('author'),
+            'group': request.GET.get('group'),
+            'since': parse_bound(request.GET.get('since')),
+            'until': parse_bound(request.GET.get('until'), end=True),
+        }
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    content = buffered(export_lines(kinds, file_format, **filters))
+    filename = f'yatube.{file_format}'
+    content_type = ('text/csv' if file_format == 'csv'
+                    else 'application/x-ndjson')
+    if request.GET.get('gzip') == '1':
+        content = gzip_stream(content)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    return response
@@ -0,0 +1,18 @@
+// Живые обновления по Server-Sent Events.
+// Элемент с data-events-url подписывается на поток: для лент
+// показывается счётчик новых постов, на странице поста новые
+// комментарии дописываются в конец списка.
+document.querySelectorAll('[data-events-url]').forEach(function (element) {
+  var source = new EventSource(element.dataset.eventsUrl);
+  var count = 0;
+
+  source.addEventListener('post', function () {
+    count += 1;
+    element.querySelector('[data-count]').textContent = count;
+    element.hidden = false;
+  });
+
+  source.addEventListener('comment', function (event) {
+    element.insertAdjacentHTML('beforeend', JSON.parse(event.data).html);
+  });
+});
@@ -0,0 +1,9 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+os.environ['ASGI'] = 'True'
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+
+application = get_asgi_application()
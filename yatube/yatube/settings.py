@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
@@ -34,6 +35,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.TracingMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SamplingProfilerMiddleware',
+    'core.middleware.SlowQueryMiddleware',
+    'core.middleware.TemplateProfilerMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -52,7 +59,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = BASE_DIR / 'templates'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -68,13 +75,106 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
 
+# Процесс запущен через yatube/asgi.py: только тогда доступны SSE.
+ASGI = os.getenv('ASGI', default='False') == 'True'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Асинхронные версии лент и страницы поста (posts.async_views).
+# Под ASGI включаются по умолчанию (см. yatube/asgi.py).
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', default='False') == 'True'
+if ASYNC_VIEWS:
+    # django-debug-toolbar 4.2 умеет только синхронный режим: под ASGI
+    # Django из-за него выполнял бы всю цепочку middleware в потоке.
+    INSTALLED_APPS.remove('debug_toolbar')
+    MIDDLEWARE.remove('debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# Server-Sent Events (только под ASGI): пинг, время жизни потока
+# и пауза перед переподключением браузера. Без PUBSUB_DIR события
+# доходят только до клиентов процесса, где произошла запись; с ним
+# процессы обмениваются событиями через Unix-сокеты в этом каталоге
+# (core.pubsub), и каталог должен быть общим для всех процессов сайта.
+# Django 4.2 не следит за отключением клиента во время потока: закрытую
+# вкладку видно только по неудачной записи пинга, поэтому пинг частый,
+# а поток живёт недолго и браузер переподключается.
+SSE_KEEPALIVE_SECONDS = int(os.getenv('SSE_KEEPALIVE_SECONDS', default=10))
+SSE_MAX_SECONDS = int(os.getenv('SSE_MAX_SECONDS', default=60))
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', default=3000))
+PUBSUB_DIR = os.getenv('PUBSUB_DIR', default='')
+
+# Фоновые задачи (core.tasks, команда run_workers): очереди с числом
+# потоков, блокировка задачи, пауза перед повтором и опрос пустой очереди.
+# В режиме TASKS_ALWAYS_EAGER задачи выполняются без воркера, сразу после
+# коммита транзакции, поставившей задачу (удобно для разработки без
+# run_workers). Выполненные и упавшие задачи хранятся TASK_RETENTION_DAYS
+# дней, воркер удаляет старые раз в TASK_PURGE_SECONDS.
+TASKS_ALWAYS_EAGER = os.getenv(
+    'TASKS_ALWAYS_EAGER', default='False') == 'True'
+TASK_QUEUES = {
+    'default': int(os.getenv('TASK_DEFAULT_THREADS', default=4)),
+    'media': int(os.getenv('TASK_MEDIA_THREADS', default=2)),
+    'email': int(os.getenv('TASK_EMAIL_THREADS', default=1)),
+}
+TASK_LOCK_SECONDS = int(os.getenv('TASK_LOCK_SECONDS', default=300))
+TASK_BACKOFF_SECONDS = int(os.getenv('TASK_BACKOFF_SECONDS', default=10))
+TASK_BACKOFF_MAX_SECONDS = int(
+    os.getenv('TASK_BACKOFF_MAX_SECONDS', default=3600))
+TASK_POLL_SECONDS = float(os.getenv('TASK_POLL_SECONDS', default=1))
+TASK_RETENTION_DAYS = int(os.getenv('TASK_RETENTION_DAYS', default=7))
+TASK_PURGE_SECONDS = int(os.getenv('TASK_PURGE_SECONDS', default=3600))
+
+
+DB_ENGINE = os.getenv('DB_ENGINE', default='sqlite')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', default=60))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', default='yatube'),
+            'USER': os.getenv('POSTGRES_USER', default='yatube'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', default=''),
+            'HOST': os.getenv('DB_HOST', default='localhost'),
+            'PORT': os.getenv('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', default=BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+
+# Реплики только для чтения: файлы SQLite или хосты PostgreSQL через запятую.
+DB_REPLICAS = [replica for replica in
+               os.getenv('DB_REPLICAS', default='').split(',') if replica]
+DATABASE_REPLICAS = []
+for number, replica in enumerate(DB_REPLICAS, start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if DB_ENGINE == 'sqlite' else 'HOST': replica,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_COOKIE = 'db_pin'
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+
+# Выполняются при каждом новом подключении к SQLite (core.db).
+SQLITE_PRAGMAS = {
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', default=5000)),
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', default='wal'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', default='normal'),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', default=268435456)),
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', default=-65536)),
+    'temp_store': 'memory',
 }
 
 
@@ -95,14 +195,64 @@ AUTH_PASSWORD_VALIDATORS = [
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.backends.LocMemCache',
     }
 }
 
+# Метрики для Prometheus (core.metrics). Если задан METRICS_DIR, каждый
+# процесс пишет туда свои значения не чаще раза в METRICS_FLUSH_SECONDS,
+# и /metrics складывает файлы всех процессов; без него отдаются метрики
+# одного процесса. Доступ к /metrics - только с METRICS_ALLOWED_IPS.
+METRICS_DIR = os.getenv('METRICS_DIR', default='')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', default=5))
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', default='127.0.0.1').split(',')
+
+# Запросы к БД дольше SLOW_QUERY_MS пишутся в лог core.slow_queries,
+# а если задан SLOW_QUERY_LOG - ещё и в этот файл JSON-строками
+# (сводка: manage.py slow_queries).
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', default=100))
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', default='')
+
+# Профиль шаблонов (core.template_profiler) у доли запросов
+# TEMPLATE_PROFILE_RATE от 0 до 1: время шаблонов, тегов и фильтров
+# в заголовке Server-Timing (TEMPLATE_PROFILE_TOP самых долгих), в логе
+# и в /metrics. 0 - выключено.
+TEMPLATE_PROFILE_RATE = float(os.getenv('TEMPLATE_PROFILE_RATE', default=0))
+TEMPLATE_PROFILE_TOP = int(os.getenv('TEMPLATE_PROFILE_TOP', default=10))
+
+# Сэмплирующий профилировщик (core.sampling_profiler): шаг выборки
+# и предельная длительность. Если задан PROFILER_DIR, процесс по SIGUSR2
+# профилирует себя и пишет туда свёрнутые стеки (manage.py profile_workers).
+PROFILER_INTERVAL_MS = float(os.getenv('PROFILER_INTERVAL_MS', default=5))
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', default=60))
+PROFILER_DIR = os.getenv('PROFILER_DIR', default='')
+
+# Трассировка (core.tracing): если задан TRACE_FILE, доля TRACE_RATE
+# запросов получает trace id, а спаны запроса, запросов к БД, кэша,
+# шаблонов и порождённых им задач дописываются туда JSON-строками
+# (разбор трассы: manage.py show_trace). Входящий заголовок traceparent
+# учитывается только с TRACE_TRUST_TRACEPARENT, то есть когда его ставит
+# свой прокси или сервис, а не клиент: иначе клиент мог бы включить
+# трассировку любого запроса в обход TRACE_RATE.
+TRACE_FILE = os.getenv('TRACE_FILE', default='')
+TRACE_RATE = float(os.getenv('TRACE_RATE', default=1))
+TRACE_TRUST_TRACEPARENT = os.getenv(
+    'TRACE_TRUST_TRACEPARENT', default='False') == 'True'
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь (core.mail) и отправляются задачей
+# deliver_emails через EMAIL_DELIVERY_BACKEND: пачками по EMAIL_BATCH_SIZE
+# в одном подключении, не чаще EMAIL_RATE_LIMIT писем в секунду.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+EMAIL_DELIVERY_BACKEND = os.getenv(
+    'EMAIL_DELIVERY_BACKEND',
+    default='django.core.mail.backends.filebased.EmailBackend')
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', default=50))
+EMAIL_RATE_LIMIT = float(os.getenv('EMAIL_RATE_LIMIT', default=5))
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', default=5))
 
 LANGUAGE_CODE = 'ru'
 
@@ -120,5 +270,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# manage.py test пишет картинки и миниатюры во временный MEDIA_ROOT.
+TEST_RUNNER = 'core.test_runner.TempMediaRunner'
+
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static', ]
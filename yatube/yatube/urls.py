@@ -3,6 +3,9 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import metrics, sampling_profile
+from posts import sitemaps
+
 urlpatterns = [
     path('',
          include('posts.urls', namespace='posts')),
@@ -14,6 +17,14 @@ urlpatterns = [
          include('django.contrib.auth.urls')),
     path('about/',
          include('about.urls', namespace='about')),
+    path('metrics',
+         metrics, name='metrics'),
+    path('debug/profile/',
+         sampling_profile, name='sampling_profile'),
+    path('sitemap.xml',
+         sitemaps.sitemap_index, name='sitemap_index'),
+    path('sitemap-<str:section>-<int:segment>.xml',
+         sitemaps.sitemap_segment, name='sitemap_segment'),
 ]
 
 handler403 = 'core.views.permission_denied'
@@ -21,8 +32,9 @@ handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 
 if settings.DEBUG:
-    import debug_toolbar
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )
+if settings.DEBUG and 'debug_toolbar' in settings.INSTALLED_APPS:
+    import debug_toolbar
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)